@@ -1,10 +1,174 @@
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+import os
+import secrets
+import time
+from contextlib import asynccontextmanager, suppress
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from watchfiles import awatch
 
-from database.initialize import init_db
+from database import config
+from database.initialize import create_tables, get_menu_markets, import_market
 from menu import router as menu_router
+from menu.crud import lookups
+from menu.snapshot import get_snapshot, refresh_snapshot
+from parser import config as parser_config
+from monitoring import config as monitoring_config
+from monitoring.metrics import registry
+from monitoring.middleware import MetricsMiddleware
+
+logger = logging.getLogger(__name__)
+
+import_lock = asyncio.Lock()
+
+MENU_FILE_MARKETS = {
+    parser_config.MENU_FILE_NAME.format(market=market): market
+    for market in parser_config.MARKETS
+}
+
+
+async def refresh_market(market: str) -> None:
+    """
+    Clears the lookup cache of a market and swaps in a new snapshot of it.
+
+    Args:
+        market (str): The market code.
+    """
+    lookups[market].clear()
+    await refresh_snapshot(market)
+
+
+async def import_menu(app: FastAPI) -> None:
+    """
+    Imports the menu files, rebuilds the snapshot of every market and records
+    the outcome in the application state.
+
+    Markets are imported one at a time. A market whose import fails keeps
+    serving its stored menu, and the other markets are still imported.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+
+    Raises:
+        Exception: The first import error, once every market was imported
+            and refreshed.
+    """
+    app.state.import_status = "running"
+    errors = []
+    try:
+        async with import_lock:
+            await create_tables()
+            menu_markets = get_menu_markets()
+            for market in parser_config.MARKETS:
+                if market in menu_markets:
+                    try:
+                        await import_market(market)
+                    except Exception as error:
+                        logger.exception("Menu import of %s failed", market)
+                        errors.append(error)
+                await refresh_market(market)
+    except Exception:
+        app.state.import_status = "failed"
+        logger.exception("Menu import failed")
+        raise
+    if errors:
+        app.state.import_status = "failed"
+        raise errors[0]
+    app.state.import_status = "done"
+
+
+async def reload_menu(force: bool = False, markets: list[str] | None = None) -> dict:
+    """
+    Imports changed menu files into the running application.
+
+    Markets are reloaded one at a time: each file is imported in one
+    transaction, then the lookup cache of its market is cleared and a new
+    snapshot replaces the old one as a whole. Requests already holding the old
+    snapshot finish with it. A market that fails to reload keeps its current
+    menu and the other markets are still reloaded. Reloads never run
+    concurrently.
+
+    Args:
+        force (bool): Import the files even if they have not changed.
+        markets (list[str] | None): The markets to reload, all by default.
+
+    Returns:
+        dict: The duration, and for each market the row diff and menu version
+            after the reload, or the error that kept it from reloading.
+    """
+    start = time.perf_counter()
+    results = {}
+    errors = {}
+    async with import_lock:
+        await create_tables()
+        for market in get_menu_markets(markets):
+            try:
+                results[market] = await import_market(market, force)
+                if not results[market].skipped:
+                    await refresh_market(market)
+            except Exception as error:
+                logger.exception("Menu reload of %s failed, keeping its menu", market)
+                errors[market] = error
+
+    report = {"duration": time.perf_counter() - start, "markets": {}}
+    for market, error in errors.items():
+        report["markets"][market] = {"error": str(error)}
+    for market, result in results.items():
+        if market in errors:
+            continue
+        snapshot = get_snapshot(market)
+        report["markets"][market] = {
+            "skipped": result.skipped,
+            "inserted": result.inserted,
+            "updated": result.updated,
+            "removed": result.removed,
+            "version": snapshot.version if snapshot is not None else None,
+        }
+    logger.info("Menu reloaded: %s", report)
+    return report
+
+
+def is_menu_file(change, path: str) -> bool:
+    """
+    Filters file changes down to the menu files.
+
+    Args:
+        change (watchfiles.Change): The kind of change.
+        path (str): The path of the changed file.
+
+    Returns:
+        bool: True if the menu file of a market changed.
+    """
+    return os.path.basename(path) in MENU_FILE_MARKETS
+
+
+async def watch_menu_file(stop_event: asyncio.Event) -> None:
+    """
+    Reloads the menu of a market whenever its menu file changes.
+
+    Changes are debounced, so a file written in several steps, or replaced
+    through a temporary file, is reloaded once. A failed reload keeps the
+    current menu and the watcher keeps running.
+
+    Args:
+        stop_event (asyncio.Event): Stops the watcher when set.
+    """
+    async for changes in awatch(
+        parser_config.FILE_PATH,
+        watch_filter=is_menu_file,
+        debounce=config.RELOAD_DEBOUNCE,
+        stop_event=stop_event,
+    ):
+        markets = sorted(
+            {MENU_FILE_MARKETS[os.path.basename(path)] for _, path in changes}
+        )
+        try:
+            await reload_menu(markets=markets)
+        except Exception:
+            logger.exception("Menu reload failed, keeping the current menu")
 
 
 @asynccontextmanager
@@ -12,7 +176,10 @@ async def lifespan(app: FastAPI):
     """
     Async context manager for managing the lifespan of a FastAPI application.
 
-    Initializes the database when the application starts.
+    Initializes the database when the application starts. With background import
+    enabled, the server starts accepting traffic right away and serves the
+    previously imported data until the import finishes. With the menu file
+    watched, later changes of the file are reloaded while the server runs.
 
     Args:
         app (FastAPI): The FastAPI application instance.
@@ -20,14 +187,36 @@ async def lifespan(app: FastAPI):
     Yields:
         None
     """
-    await init_db()
+    tasks = []
+    if config.BACKGROUND_IMPORT:
+        await create_tables()
+        for market in parser_config.MARKETS:
+            await refresh_snapshot(market)
+        tasks.append(asyncio.create_task(import_menu(app)))
+    else:
+        await import_menu(app)
+
+    stop_event = asyncio.Event()
+    if config.WATCH_MENU_FILE:
+        tasks.append(asyncio.create_task(watch_menu_file(stop_event)))
+
     yield
 
+    stop_event.set()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await task
+
 
 app = FastAPI(lifespan=lifespan)
+app.state.import_status = "pending"
 
 app.include_router(menu_router.router)
 
+if monitoring_config.ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/")
 async def index() -> str:
@@ -43,5 +232,79 @@ async def index() -> str:
     return message
 
 
+@app.get("/health")
+async def health() -> JSONResponse:
+    """
+    Reports whether the menu import has finished.
+
+    Returns:
+        JSONResponse: The import status, with status code 503 until the import
+            has finished.
+    """
+    status = app.state.import_status
+    return JSONResponse(
+        {"ready": status == "done", "import": status},
+        status_code=200 if status == "done" else 503,
+    )
+
+
+@app.post("/admin/reload", include_in_schema=bool(config.RELOAD_TOKEN))
+async def reload(
+    force: bool = False,
+    market: str | None = None,
+    x_reload_token: str | None = Header(default=None),
+) -> JSONResponse:
+    """
+    Reloads the menu files into the running application.
+
+    The endpoint is disabled unless a reload token is configured, and then
+    requires it in the X-Reload-Token header.
+
+    Args:
+        force (bool, optional): Import the files even if they have not changed.
+        market (str | None, optional): Reload only the menu of this market.
+        x_reload_token (str | None, optional): The reload token.
+
+    Returns:
+        JSONResponse: The duration in seconds and, for every market, whether
+            the import was skipped, the inserted/updated/removed counts and the
+            new menu version. Markets whose menu file is missing or invalid
+            keep their current menu and list the error instead, with status
+            code 422.
+
+    Raises:
+        HTTPException: With status code 404 if the endpoint is disabled, 401 if
+            the token is wrong, or 400 if the market is unknown.
+    """
+    if not config.RELOAD_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_reload_token is None or not secrets.compare_digest(
+        x_reload_token.encode(), config.RELOAD_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid reload token")
+    if market is not None and market not in parser_config.MARKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown market: {market}")
+    report = await reload_menu(
+        force=force, markets=None if market is None else [market]
+    )
+    failed = any("error" in result for result in report["markets"].values())
+    return JSONResponse(report, status_code=422 if failed else 200)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """
+    Exposes the metrics in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics, or 404 if metrics are disabled.
+    """
+    if not monitoring_config.ENABLED:
+        return PlainTextResponse("Metrics are disabled", status_code=404)
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
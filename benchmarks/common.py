@@ -0,0 +1,201 @@
+import random
+import statistics
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+import httpx
+from fastapi import FastAPI
+from starlette.types import ASGIApp
+
+from menu import schemas
+
+# The upper bound of every nutrient of a synthetic product.
+NUTRIENT_RANGES = {
+    "calories": 900.0,
+    "fats": 50.0,
+    "carbs": 100.0,
+    "proteins": 45.0,
+    "unsaturated_fats": 20.0,
+    "sugar": 60.0,
+    "salt": 4.0,
+    "portion": 500.0,
+}
+
+
+@dataclass(frozen=True)
+class Timing:
+    """
+    Latencies of repeated calls.
+
+    Attributes:
+        count (int): The number of timed calls.
+        median (float): The median latency in milliseconds.
+        p95 (float): The 95th percentile latency in milliseconds.
+        rate (float): Calls per second, one call at a time.
+    """
+
+    count: int
+    median: float
+    p95: float
+    rate: float
+
+    def __str__(self) -> str:
+        return (
+            f"median {self.median:8.3f} ms  p95 {self.p95:8.3f} ms  "
+            f"{self.rate:9.0f}/s"
+        )
+
+
+def summarize(durations: list[float]) -> Timing:
+    """
+    Summarizes call durations.
+
+    Args:
+        durations (list[float]): The duration of every call in seconds.
+
+    Returns:
+        Timing: The latencies in milliseconds and the call rate.
+    """
+    durations = sorted(durations)
+    return Timing(
+        count=len(durations),
+        median=statistics.median(durations) * 1000,
+        p95=durations[min(int(len(durations) * 0.95), len(durations) - 1)] * 1000,
+        rate=len(durations) / sum(durations),
+    )
+
+
+def measure(call: Callable[[], object], count: int, warmup: int = 20) -> Timing:
+    """
+    Times a function called over and over.
+
+    Args:
+        call (Callable[[], object]): The function.
+        count (int): The number of timed calls.
+        warmup (int): The number of calls made before timing.
+
+    Returns:
+        Timing: The latencies.
+    """
+    for _ in range(warmup):
+        call()
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+async def measure_async(
+    call: Callable[[], Awaitable], count: int, warmup: int = 20
+) -> Timing:
+    """
+    Times a coroutine function awaited over and over, one call at a time.
+
+    Args:
+        call (Callable[[], Awaitable]): The coroutine function.
+        count (int): The number of timed calls.
+        warmup (int): The number of calls made before timing.
+
+    Returns:
+        Timing: The latencies.
+    """
+    for _ in range(warmup):
+        await call()
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await call()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def asgi_client(app: ASGIApp) -> httpx.AsyncClient:
+    """
+    Creates a client sending requests to an application in-process.
+
+    Requests go through the ASGI interface without a network, so timings
+    cover routing, the endpoint and serialization only.
+
+    Args:
+        app (ASGIApp): The application.
+
+    Returns:
+        httpx.AsyncClient: The client.
+    """
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://benchmark"
+    )
+
+
+@asynccontextmanager
+async def serve(app: FastAPI) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Runs the lifespan of an application and sends requests to it in-process.
+
+    Args:
+        app (FastAPI): The application.
+
+    Yields:
+        httpx.AsyncClient: A client sending requests to the application, see
+            `asgi_client`.
+    """
+    async with app.router.lifespan_context(app):
+        async with asgi_client(app) as client:
+            yield client
+
+
+SYLLABLES = (
+    "мак", "бур", "гер", "чіз", "фрі", "ко", "ла", "сі", "ке", "то",
+    "ра", "ні", "по", "да", "ше",
+)
+DESCRIPTION_WORDS = (
+    "соковитий", "яловичий", "біфштекс", "курка", "сир", "соус", "булочка",
+    "салат", "цибуля", "огірок", "картопля", "морозиво", "шоколад", "кава",
+)
+
+
+def synthetic_products(count: int, seed: int = 0) -> list[schemas.Product]:
+    """
+    Generates a deliberately repetitive menu: names built from a few syllables
+    share most of their trigrams, and descriptions from a small vocabulary
+    share most of their words. Nutrients are random, a few of them NULL.
+
+    Args:
+        count (int): The number of products.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        list[schemas.Product]: The products, with unique names.
+    """
+    generator = random.Random(seed)
+    names: set[str] = set()
+    products = []
+    while len(products) < count:
+        name = " ".join(
+            "".join(generator.choices(SYLLABLES, k=generator.randint(2, 4))).title()
+            for _ in range(generator.randint(2, 3))
+        )
+        if name in names:
+            continue
+        names.add(name)
+        products.append(
+            schemas.Product.model_construct(
+                id=len(products) + 1,
+                market="ua",
+                name=name,
+                description=" ".join(generator.choices(DESCRIPTION_WORDS, k=8)),
+                **{
+                    field: (
+                        None
+                        if generator.random() < 0.02
+                        else round(generator.uniform(0, high), 1)
+                    )
+                    for field, high in NUTRIENT_RANGES.items()
+                },
+            )
+        )
+    return products
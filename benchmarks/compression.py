@@ -0,0 +1,87 @@
+"""
+Compares precompressed menu responses with compressing on every request.
+
+Run from the repository root, after the parser has written the menu file:
+
+    python -m benchmarks.compression
+"""
+
+import argparse
+import asyncio
+
+from fastapi import FastAPI, Response
+from starlette.middleware.gzip import GZipMiddleware
+
+from app import app
+from benchmarks.common import asgi_client, measure_async, serve
+from menu import config, schemas
+from menu.snapshot import MenuSnapshot, get_snapshot
+
+
+def per_request_app(snapshot: MenuSnapshot) -> GZipMiddleware:
+    """
+    Builds an application that compresses the menu on every request with
+    GZipMiddleware, as generic middleware would.
+
+    Args:
+        snapshot (MenuSnapshot): The snapshot to serve.
+
+    Returns:
+        GZipMiddleware: The application.
+    """
+    baseline = FastAPI()
+    body = snapshot.menu_response.body
+
+    @baseline.get("/menu/serialized")
+    async def read_serialized_menu() -> Response:
+        return Response(body, media_type="application/json")
+
+    @baseline.get("/menu", response_model=list[schemas.Product])
+    async def read_menu() -> list[schemas.Product]:
+        return list(snapshot.products)
+
+    return GZipMiddleware(baseline, minimum_size=1024, compresslevel=9)
+
+
+async def run(count: int) -> None:
+    """
+    Times /menu precompressed, and compressed per request with and without
+    serializing the menu per request.
+
+    Args:
+        count (int): The number of timed requests per variant.
+    """
+    async with serve(app) as client:
+        snapshot = get_snapshot(config.DEFAULT_MARKET)
+        if snapshot is None:
+            raise SystemExit("Snapshots are disabled in config.ini")
+        print(
+            f"{len(snapshot.products)} products, /menu body "
+            f"{len(snapshot.menu_response.body) / 1024:.0f} KiB, "
+            f"gzip {len(snapshot.menu_response.encodings['gzip']) / 1024:.0f} KiB, "
+            f"{count} requests each"
+        )
+
+        async with asgi_client(per_request_app(snapshot)) as baseline_client:
+            variants = {
+                "precompressed /menu": (client, "/menu"),
+                "gzip per request": (baseline_client, "/menu/serialized"),
+                "serialize + gzip per request": (baseline_client, "/menu"),
+            }
+            for label, (variant_client, path) in variants.items():
+
+                async def get() -> None:
+                    response = await variant_client.get(
+                        path, headers={"Accept-Encoding": "gzip"}
+                    )
+                    response.raise_for_status()
+                    assert response.headers["Content-Encoding"] == "gzip"
+                    assert response.json()[0]["id"] == snapshot.products[0].id
+
+                print(f"  {label:<30}{await measure_async(get, count)}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--count", type=int, default=500)
+    asyncio.run(run(arg_parser.parse_args().count))
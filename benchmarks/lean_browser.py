@@ -0,0 +1,114 @@
+"""
+Compares the time per product page of regular and lean Chrome scrapers.
+
+Requires Chrome. Run from the repository root; the pages are served from
+tests/fixtures unless a menu page is given:
+
+    python -m benchmarks.lean_browser
+    python -m benchmarks.lean_browser --base-url <menu page URL>
+"""
+
+import argparse
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+# The parser modules import each other as top-level modules.
+sys.path.insert(0, "parser")
+
+from parse import ProductScraper  # noqa: E402
+from profiling import ScrapeProfiler  # noqa: E402
+
+FIXTURES = os.path.join("tests", "fixtures")
+
+
+class QuietRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves files without logging every request.
+    """
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@contextmanager
+def serve_fixtures() -> Iterator[str]:
+    """
+    Serves the fixture pages on a free local port.
+
+    Yields:
+        str: The URL of the menu page.
+    """
+    handler = functools.partial(QuietRequestHandler, directory=FIXTURES)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/menu.html"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def time_scraper(base_url: str, lean: bool, rounds: int) -> None:
+    """
+    Scrapes every product of the menu page several times with one browser and
+    prints the time per page and its slowest phases.
+
+    Args:
+        base_url (str): The URL of the menu page.
+        lean (bool): Whether the browser runs lean.
+        rounds (int): How many times every page is scraped.
+    """
+    start = time.perf_counter()
+    profiler = ScrapeProfiler()
+    scraper = ProductScraper(base_url=base_url, profiler=profiler, lean=lean)
+    startup = time.perf_counter() - start
+    try:
+        urls = scraper.get_product_detail_urls()
+        durations = []
+        for _ in range(rounds):
+            for url in urls:
+                page_start = time.perf_counter()
+                scraper.scrape_product(url)
+                durations.append(time.perf_counter() - page_start)
+    finally:
+        scraper.close()
+
+    phases = profiler.report()["phases"]
+    print(
+        f"{'lean' if lean else 'regular':<8}startup {startup:.2f} s, "
+        f"{len(durations)} pages, median {statistics.median(durations):.3f} s, "
+        f"max {max(durations):.3f} s per page"
+    )
+    for name, stats in sorted(phases.items(), key=lambda item: -item[1]["p50"])[:4]:
+        print(f"  {name:<20}p50 {stats['p50']:.3f} s  p90 {stats['p90']:.3f} s")
+
+
+def run(base_url: str | None, rounds: int) -> None:
+    """
+    Times a regular and a lean scraper on the same pages.
+
+    Args:
+        base_url (str | None): The URL of the menu page, the fixture pages if
+            None.
+        rounds (int): How many times every page is scraped.
+    """
+    pages = serve_fixtures() if base_url is None else nullcontext(base_url)
+    with pages as menu_url:
+        for lean in (False, True):
+            time_scraper(menu_url, lean, rounds)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--base-url")
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    arguments = arg_parser.parse_args()
+    run(arguments.base_url, arguments.rounds)
@@ -0,0 +1,66 @@
+"""
+Times /products/lookup queries on the trigram index of a synthetic menu.
+
+Run from the repository root:
+
+    python -m benchmarks.lookup --products 100000
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import measure, synthetic_products
+from menu.lookup import TrigramIndex
+
+
+def make_typo(name: str, generator: random.Random) -> str:
+    """
+    Swaps two neighbouring letters of a name.
+
+    Args:
+        name (str): The name.
+        generator (random.Random): The random generator.
+
+    Returns:
+        str: The misspelled name.
+    """
+    position = generator.randrange(len(name) - 1)
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def run(count: int, queries: int) -> None:
+    """
+    Builds the index and times every kind of query.
+
+    Args:
+        count (int): The number of products.
+        queries (int): The number of timed queries per kind.
+    """
+    products = synthetic_products(count)
+    start = time.perf_counter()
+    index = TrigramIndex(products)
+    print(f"{count} products, index built in {time.perf_counter() - start:.2f} s")
+
+    generator = random.Random(1)
+    names = [product.name for product in generator.sample(products, queries)]
+    kinds = {
+        "exact name": names,
+        "lowercase name": [name.lower() for name in names],
+        "misspelled name": [make_typo(name, generator) for name in names],
+        "first word": [name.split()[0] for name in names],
+        "3-letter prefix": [name[:3] for name in names],
+        "description word": ["яловичий біфштекс"] * queries,
+    }
+    for kind, texts in kinds.items():
+        texts = iter(texts * 2)
+        timing = measure(lambda: index.search(next(texts), limit=10), queries, warmup=0)
+        print(f"  {kind:<18}{timing}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--products", type=int, default=100000)
+    arg_parser.add_argument("--queries", type=int, default=500)
+    arguments = arg_parser.parse_args()
+    run(arguments.products, arguments.queries)
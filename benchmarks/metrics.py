@@ -0,0 +1,161 @@
+"""
+Measures the overhead of the metrics: the middleware per request and the
+cursor events per SQL statement.
+
+Run from the repository root, after the parser has written the menu file:
+
+    python -m benchmarks.metrics
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+from urllib.parse import quote
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import app
+from benchmarks.common import Timing, asgi_client, serve, summarize
+from database import config as database_config
+from database.engine import instrument_engine
+from menu import config
+from menu import router as menu_router
+from menu.snapshot import get_snapshot
+from monitoring.middleware import MetricsMiddleware
+
+
+async def compare(
+    calls: dict[str, Callable[[], Awaitable]], count: int, warmup: int = 200
+) -> dict[str, Timing]:
+    """
+    Times coroutine functions called in turns, so that drift over the run
+    affects all of them alike.
+
+    Args:
+        calls (dict[str, Callable[[], Awaitable]]): The functions by label.
+        count (int): The number of timed calls per function.
+        warmup (int): The number of calls per function made before timing.
+
+    Returns:
+        dict[str, Timing]: The latencies of every function.
+    """
+    for _ in range(warmup):
+        for call in calls.values():
+            await call()
+    durations: dict[str, list[float]] = {label: [] for label in calls}
+    for _ in range(count):
+        for label, call in calls.items():
+            start = time.perf_counter()
+            await call()
+            durations[label].append(time.perf_counter() - start)
+    return {label: summarize(times) for label, times in durations.items()}
+
+
+def report(timings: dict[str, Timing], unit: str) -> None:
+    """
+    Prints the latencies with and without metrics, and the difference of
+    their medians.
+
+    Args:
+        timings (dict[str, Timing]): The latencies by "with" and "without".
+        unit (str): What one call is, e.g. "request".
+    """
+    for label, timing in timings.items():
+        print(f"  {label:<9}{timing}")
+    overhead = (timings["with"].median - timings["without"].median) * 1000
+    print(f"  overhead {overhead:.1f} us per {unit}")
+
+
+async def time_middleware(count: int) -> None:
+    """
+    Times read endpoints served from the snapshot with and without
+    MetricsMiddleware.
+
+    Args:
+        count (int): The number of timed requests per endpoint and variant.
+    """
+    snapshot = get_snapshot(config.DEFAULT_MARKET)
+    if snapshot is None:
+        raise SystemExit("Snapshots are disabled in config.ini")
+    name = snapshot.products[len(snapshot.products) // 2].name
+    paths = {
+        "/product/{name}/": f"/product/{quote(name)}/",
+        "/all_products/?limit=50": "/all_products/?limit=50",
+    }
+
+    bare = FastAPI()
+    bare.include_router(menu_router.router)
+    async with (
+        asgi_client(bare) as client,
+        asgi_client(MetricsMiddleware(bare)) as instrumented_client,
+    ):
+        for label, path in paths.items():
+
+            def get(variant_client) -> Callable[[], Awaitable]:
+                async def call() -> None:
+                    response = await variant_client.get(path)
+                    response.raise_for_status()
+
+                return call
+
+            print(f"{label}, {count} requests each")
+            timings = await compare(
+                {"without": get(client), "with": get(instrumented_client)}, count
+            )
+            report(timings, "request")
+
+
+async def time_statements(count: int) -> None:
+    """
+    Times a point query on engines with and without the cursor events.
+
+    Args:
+        count (int): The number of timed statements per variant.
+    """
+    snapshot = get_snapshot(config.DEFAULT_MARKET)
+    name = snapshot.products[len(snapshot.products) // 2].name
+    statement = text("SELECT * FROM products WHERE name = :name")
+    print(f"SELECT by name, {count} statements each")
+    engine = create_async_engine(database_config.DATABASE_URL)
+    instrumented_engine = create_async_engine(database_config.DATABASE_URL)
+    instrument_engine(instrumented_engine, "benchmark")
+    async with (
+        engine.connect() as connection,
+        instrumented_engine.connect() as instrumented_connection,
+    ):
+
+        def execute(variant_connection) -> Callable[[], Awaitable]:
+            async def call() -> None:
+                result = await variant_connection.execute(statement, {"name": name})
+                result.fetchall()
+
+            return call
+
+        timings = await compare(
+            {"without": execute(connection), "with": execute(instrumented_connection)},
+            count,
+        )
+    await engine.dispose()
+    await instrumented_engine.dispose()
+    report(timings, "statement")
+
+
+async def run(count: int) -> None:
+    """
+    Imports the menu and runs both measurements.
+
+    Args:
+        count (int): The number of timed calls per variant.
+    """
+    async with serve(app):
+        await time_middleware(count)
+        await time_statements(count)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--count", type=int, default=5000)
+    asyncio.run(run(arg_parser.parse_args().count))
@@ -0,0 +1,103 @@
+"""
+Times meal optimization on the real menu and on a synthetic menu, including
+constraints no meal can meet, with the limits of the endpoint.
+
+Run from the repository root, after the parser has written the menu file:
+
+    python -m benchmarks.optimize --products 10000
+"""
+
+import argparse
+import time
+
+from benchmarks.common import measure, synthetic_products
+from database.initialize import load_json_data
+from menu import config, schemas
+from menu.nutrition import Bound, NutrientMatrix, SearchLimitExceeded
+from parser.config import MENU_FILE_NAME
+
+# Name, objective, bounds and meal size of every timed query.
+QUERIES = (
+    (
+        "proteins, <=700 kcal, <=2 g salt",
+        "proteins",
+        (Bound("calories", maximum=700), Bound("salt", maximum=2)),
+        3,
+    ),
+    ("least sugar, >=60 g proteins", "sugar", (Bound("proteins", minimum=60),), 3),
+    (
+        "proteins, >=1500 kcal, <=2 g salt",
+        "proteins",
+        (Bound("calories", minimum=1500), Bound("salt", maximum=2)),
+        4,
+    ),
+    (
+        "least sugar, >=150 g proteins, 6 items",
+        "sugar",
+        (Bound("proteins", minimum=150),),
+        6,
+    ),
+    ("infeasible >=100000 kcal", "proteins", (Bound("calories", minimum=100000),), 4),
+    ("infeasible, 6 items", "proteins", (Bound("calories", minimum=100000),), 6),
+)
+
+
+def real_menu() -> NutrientMatrix:
+    """
+    Loads the menu of the default market from the parser output.
+
+    Returns:
+        NutrientMatrix: The nutrients of the menu.
+    """
+    records = load_json_data(MENU_FILE_NAME.format(market=config.DEFAULT_MARKET))
+    return NutrientMatrix(
+        [
+            schemas.Product(id=position, market=config.DEFAULT_MARKET, **record)
+            for position, record in enumerate(records, start=1)
+        ]
+    )
+
+
+def run(count: int, products: int) -> None:
+    """
+    Times every query on both menus.
+
+    Args:
+        count (int): The number of timed calls per query.
+        products (int): The number of products of the synthetic menu.
+    """
+    menus = {"real menu": real_menu()}
+    menus["synthetic menu"] = NutrientMatrix(
+        synthetic_products(products)
+    )
+    for label, nutrients in menus.items():
+        print(f"{label}, {len(nutrients.names)} products")
+        for name, objective, bounds, max_items in QUERIES:
+
+            def optimize() -> list:
+                return nutrients.optimize(
+                    objective,
+                    maximize=objective != "sugar",
+                    bounds=bounds,
+                    max_items=max_items,
+                    max_nodes=config.OPTIMIZE_MAX_NODES,
+                    timeout=config.OPTIMIZE_TIMEOUT,
+                )
+
+            start = time.perf_counter()
+            try:
+                meals = optimize()
+            except SearchLimitExceeded as error:
+                duration = time.perf_counter() - start
+                print(f"  {name:<40}rejected after {duration:.2f} s: {error}")
+                continue
+            timing = measure(optimize, count, warmup=0)
+            print(f"  {name:<40}{len(meals)} meals  {timing}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--count", type=int, default=20)
+    arg_parser.add_argument("--products", type=int, default=10000)
+    arguments = arg_parser.parse_args()
+    run(arguments.count, arguments.products)
@@ -0,0 +1,73 @@
+"""
+Compares menu reads served from the in-memory snapshot with the SQLite path.
+
+Run from the repository root, after the parser has written the menu file:
+
+    python -m benchmarks.snapshot
+"""
+
+import argparse
+import asyncio
+from urllib.parse import quote
+
+from app import app
+from benchmarks.common import measure_async, serve
+from menu import config
+from menu.crud import lookups
+from menu.snapshot import _snapshots, get_snapshot
+
+
+async def run(count: int) -> None:
+    """
+    Times the snapshot and the database path of the read endpoints.
+
+    The database path is timed by taking the snapshot out of service, and
+    clearing the lookup cache before every request, so every request queries
+    SQLite.
+
+    Args:
+        count (int): The number of timed requests per endpoint and path.
+    """
+    market = config.DEFAULT_MARKET
+    async with serve(app) as client:
+        snapshot = get_snapshot(market)
+        if snapshot is None:
+            raise SystemExit("Snapshots are disabled in config.ini")
+        name = snapshot.products[len(snapshot.products) // 2].name
+        paths = {
+            "/product/{name}/": f"/product/{quote(name)}/",
+            "/all_products/?limit=50": "/all_products/?limit=50",
+        }
+        print(f"{len(snapshot.products)} products, {count} requests each")
+
+        for label, path in paths.items():
+
+            async def get() -> bytes:
+                response = await client.get(path)
+                response.raise_for_status()
+                return response.content
+
+            async def get_from_db() -> bytes:
+                lookups[market].clear()
+                return await get()
+
+            snapshot_body = await get()
+            snapshot_timing = await measure_async(get, count)
+            del _snapshots[market]
+            try:
+                db_body = await get_from_db()
+                db_timing = await measure_async(get_from_db, count)
+            finally:
+                _snapshots[market] = snapshot
+            assert snapshot_body == db_body, f"{label}: responses differ"
+
+            print(f"{label}")
+            print(f"  snapshot  {snapshot_timing}")
+            print(f"  sqlite    {db_timing}")
+            print(f"  speedup   {db_timing.median / snapshot_timing.median:.1f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--count", type=int, default=2000)
+    asyncio.run(run(arg_parser.parse_args().count))
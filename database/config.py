@@ -0,0 +1,23 @@
+import configparser
+
+config = configparser.ConfigParser()
+config.read("config.ini")
+
+DATABASE_URL = config.get(
+    "database", "url", fallback="sqlite+aiosqlite:///./mcdonalds_products.db"
+)
+POOL_SIZE = config.getint("database", "pool_size", fallback=5)
+MAX_OVERFLOW = config.getint("database", "max_overflow", fallback=10)
+
+JOURNAL_MODE = config.get("database", "journal_mode", fallback="WAL")
+SYNCHRONOUS = config.get("database", "synchronous", fallback="NORMAL")
+CACHE_SIZE = config.getint("database", "cache_size", fallback=-16000)
+MMAP_SIZE = config.getint("database", "mmap_size", fallback=268435456)
+BUSY_TIMEOUT = config.getint("database", "busy_timeout", fallback=5000)
+
+BACKGROUND_IMPORT = config.getboolean("database", "background_import", fallback=False)
+
+WATCH_MENU_FILE = config.getboolean("database", "watch_menu_file", fallback=False)
+RELOAD_DEBOUNCE = config.getint("database", "reload_debounce", fallback=1000)
+# The token the /admin/reload endpoint requires, the endpoint is disabled if empty.
+RELOAD_TOKEN = config.get("database", "reload_token", fallback="")
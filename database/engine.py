@@ -1,11 +1,145 @@
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
+import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncAttrs,
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database import config
+from monitoring import config as monitoring_config
+from monitoring.metrics import registry
+
+PLACEHOLDER_LISTS = re.compile(r"\(\?(?:, \?)*\)(?:, \(\?(?:, \?)*\))*")
+
+query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Time spent executing SQL statements, by engine and statement shape.",
+    labels=("engine", "statement"),
+)
+session_duration = registry.histogram(
+    "db_session_duration_seconds",
+    "Time request sessions stay open, by outcome.",
+    labels=("session", "phase", "outcome"),
+)
+
+
+@lru_cache(maxsize=1024)
+def get_statement_shape(statement: str) -> str:
+    """
+    Reduces a SQL statement to its shape, so that `IN` lists and multi-row
+    `VALUES` of any length are counted as one statement.
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        str: The statement with single spaces and placeholder lists collapsed.
+    """
+    return PLACEHOLDER_LISTS.sub("(?, ...)", " ".join(statement.split()))
+
 
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./mcdonalds_products.db"
+@contextmanager
+def observe_session(session: str, phase: str) -> Iterator[None]:
+    """
+    Records the duration of a session phase, whether it succeeds or raises.
 
+    Args:
+        session (str): The value of the `session` label.
+        phase (str): The value of the `phase` label.
 
-engine = create_async_engine(url=SQLALCHEMY_DATABASE_URL)
-async_session = async_sessionmaker(engine)
+    Yields:
+        None
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        session_duration.labels(session, phase, outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+def instrument_engine(new_engine: AsyncEngine, name: str) -> None:
+    """
+    Records the duration of every statement executed by an engine.
+
+    Args:
+        new_engine (AsyncEngine): The engine to instrument.
+        name (str): The value of the `engine` label.
+    """
+
+    @event.listens_for(new_engine.sync_engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(new_engine.sync_engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        query_duration.labels(name, get_statement_shape(statement)).observe(
+            time.perf_counter() - conn.info["query_start"].pop()
+        )
+
+    @event.listens_for(new_engine.sync_engine, "handle_error")
+    def fail_query(exception_context):
+        connection = exception_context.connection
+        if connection is not None and (starts := connection.info.get("query_start")):
+            starts.pop()
+
+
+def create_engine(read_only: bool = False) -> AsyncEngine:
+    """
+    Creates an async engine configured from config.ini.
+
+    Connections are pooled, instead of the aiosqlite default of opening one
+    per session, and every new connection gets the configured PRAGMAs.
+    Read-only engines also set `query_only`, so their connections can never
+    write.
+
+    Args:
+        read_only (bool): Whether the engine is used for reads only.
+
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+    new_engine = create_async_engine(
+        url=config.DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=config.POOL_SIZE,
+        max_overflow=config.MAX_OVERFLOW,
+    )
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {config.BUSY_TIMEOUT:d}")
+        if not read_only:
+            cursor.execute(f"PRAGMA journal_mode = {config.JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {config.SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size = {config.CACHE_SIZE:d}")
+        cursor.execute(f"PRAGMA mmap_size = {config.MMAP_SIZE:d}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+    if monitoring_config.ENABLED:
+        instrument_engine(new_engine, "read" if read_only else "write")
+    return new_engine
+
+
+engine = create_engine()
+
+read_engine = create_engine(read_only=True)
+async_read_session = async_sessionmaker(read_engine)
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -27,13 +161,17 @@ class Base(AsyncAttrs, DeclarativeBase):
     __abstract__ = True
 
 
-async def get_db() -> None:
+async def get_read_db() -> None:
     """
-    Provides an async database session generator.
+    Provides a read-only async database session generator.
+
+    The session runs on the read-only engine and is never committed, so reads
+    do not open write transactions and are not blocked by a menu import.
+    A connection is only checked out once the session runs a query.
 
     Yields:
-        An asynchronous database session.
+        An asynchronous read-only database session.
     """
-    async with async_session() as session:
-        yield session
-        await session.commit()
+    with observe_session("read", "open"):
+        async with async_read_session() as session:
+            yield session
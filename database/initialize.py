@@ -1,82 +1,589 @@
+import asyncio
+import hashlib
 import json
+import logging
 import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, Mapping, Sequence
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Connection, delete, func, inspect, literal, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
 
 from parser import config
+from parser.columnar import ColumnarMenu
 from database.engine import Base, engine
-from menu.models import Product
+from menu.models import (
+    MenuCheckpoint,
+    MenuMetadata,
+    MenuVersion,
+    Product,
+    ProductChange,
+)
+from monitoring.metrics import registry
 
+logger = logging.getLogger(__name__)
 
-def load_json_data(file_name: str) -> dict:
+import_duration = registry.gauge(
+    "menu_import_duration_seconds",
+    "Duration of the last menu import.",
+    labels=("market",),
+)
+imports = registry.counter(
+    "menu_imports_total", "Menu imports by outcome.", labels=("market", "outcome")
+)
+imported_rows = registry.counter(
+    "menu_import_rows_total",
+    "Products changed by menu imports.",
+    labels=("market", "change"),
+)
+
+BATCH_SIZE = 1000
+# A checkpoint is written once the changes to replay since the previous one
+# outnumber the products of the menu this many times.
+CHECKPOINT_RATIO = 2
+PRODUCT_FIELDS = (
+    "name",
+    "description",
+    "calories",
+    "fats",
+    "carbs",
+    "proteins",
+    "unsaturated_fats",
+    "sugar",
+    "salt",
+    "portion",
+)
+NUMERIC_FIELDS = PRODUCT_FIELDS[2:]
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    """
+    Summary of a menu import.
+
+    Attributes:
+        inserted (int): The number of products that were added.
+        updated (int): The number of existing products whose fields changed.
+        removed (int): The number of products that disappeared from the menu.
+        skipped (bool): Whether the import was skipped because the menu file
+            did not change since the last import.
+        version (int | None): The menu version recorded by the import, None if
+            the menu did not change.
+    """
+
+    inserted: int
+    updated: int
+    removed: int
+    skipped: bool = False
+    version: int | None = None
+
+
+def load_json_data(file_name: str) -> Iterator[dict]:
     """
-    Loads JSON data from a file.
+    Loads product records from a JSON array or an NDJSON file.
+
+    Files ending in `.ndjson` are read one line at a time, so memory use does
+    not grow with the size of the file. Blank lines are skipped.
 
     Args:
         file_name (str): The name of the file to load.
 
-    Returns:
-        dict: The JSON data from the file.
+    Yields:
+        dict: The next product record.
     """
     file_path = os.path.join(config.FILE_PATH, file_name)
-    with open(file_path, "r") as file:
-        return json.load(file)
+    with open(file_path, "r", encoding="utf-8") as file:
+        if not file_name.endswith(".ndjson"):
+            yield from json.load(file)
+            return
 
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
 
-async def update_product(db: AsyncSession, product_data: dict) -> None:
+
+def load_menu_data(market: str, file_hash: str) -> Iterator[dict]:
     """
-    Updates or creates a product in the database.
+    Loads the product records of a market, from its columnar file if it was
+    written from the current menu file.
+
+    The columnar file is read row by row from a memory map, so the menu file
+    does not have to be parsed. A missing, outdated or unreadable columnar file
+    falls back to the menu file.
 
     Args:
-        db (AsyncSession): The database session.
-        product_data (dict): The product data to update or create.
+        market (str): The market code.
+        file_hash (str): The SHA-256 digest of the menu file.
+
+    Yields:
+        dict: The next product record.
     """
-    query = await db.execute(
-        select(Product).where(Product.name == product_data.get("name"))
+    columnar_path = os.path.join(
+        config.FILE_PATH, config.COLUMNAR_FILE_NAME.format(market=market)
     )
+    if os.path.exists(columnar_path):
+        try:
+            menu = ColumnarMenu(columnar_path)
+        except ValueError:
+            logger.warning("Ignoring unreadable columnar file of %s", market)
+        else:
+            with menu:
+                if menu.metadata.get("source_sha256") == file_hash:
+                    yield from menu.records()
+                    return
+
+    yield from load_json_data(config.MENU_FILE_NAME.format(market=market))
+
+
+def validate_products(products_data: Iterable[dict]) -> Iterator[dict]:
+    """
+    Checks product records while they are being imported.
+
+    Raising inside the import transaction rolls it back, so an invalid or
+    truncated menu file never replaces the current menu.
+
+    Args:
+        products_data (Iterable[dict]): The product records.
+
+    Yields:
+        dict: The next valid record.
+
+    Raises:
+        ValueError: If a record has no name or a non-numeric nutrient, or if
+            there are no records at all.
+    """
+    count = 0
+    for count, product_data in enumerate(products_data, start=1):
+        name = product_data.get("name") if isinstance(product_data, dict) else None
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"Product #{count} has no name")
+        for field in NUMERIC_FIELDS:
+            value = product_data.get(field)
+            if value is not None and (
+                isinstance(value, bool) or not isinstance(value, (int, float))
+            ):
+                raise ValueError(f"Product {name!r} has a non-numeric {field}")
+        yield product_data
+
+    if count == 0:
+        raise ValueError("The menu file has no products")
+
+
+def get_file_hash(file_path: str) -> str:
+    """
+    Computes the SHA-256 digest of a file.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(1 << 16):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
-    if product := query.scalar_one_or_none():
-        product.description = product_data.get("description")
-        product.calories = product_data.get("calories")
-        product.fats = product_data.get("fats")
-        product.carbs = product_data.get("carbs")
-        product.proteins = product_data.get("proteins")
-        product.unsaturated_fats = product_data.get("unsaturated_fats")
-        product.sugar = product_data.get("sugar")
-        product.salt = product_data.get("salt")
-        product.portion = product_data.get("portion")
-    else:
-        product = Product(
-            name=product_data["name"],
-            description=product_data["description"],
-            calories=product_data.get("calories"),
-            fats=product_data.get("fats"),
-            carbs=product_data.get("carbs"),
-            proteins=product_data.get("proteins"),
-            unsaturated_fats=product_data.get("unsaturated_fats"),
-            sugar=product_data.get("sugar"),
-            salt=product_data.get("salt"),
-            portion=product_data.get("portion"),
+async def _batched(rows: Iterable[dict], size: int) -> AsyncIterator[list[dict]]:
+    """
+    Splits rows into consecutive batches, each read in a worker thread.
+
+    Reading, parsing and validating the menu file happen while the rows are
+    consumed, so they do not block the event loop.
+
+    Args:
+        rows (Iterable[dict]): The rows to split, consumed lazily.
+        size (int): The maximum size of a batch.
+
+    Yields:
+        list[dict]: The next batch.
+    """
+    rows = iter(rows)
+    while batch := await asyncio.to_thread(list, islice(rows, size)):
+        yield batch
+
+
+async def get_latest_version(conn: AsyncConnection, market: str) -> int:
+    """
+    Returns the latest menu version of a market.
+
+    Args:
+        conn (AsyncConnection): The connection.
+        market (str): The market code.
+
+    Returns:
+        int: The version, 0 if no version was recorded yet.
+    """
+    version = await conn.scalar(
+        select(func.max(MenuVersion.version)).where(MenuVersion.market == market)
+    )
+    return version or 0
+
+
+def _diff_product(old: Mapping | None, new: dict) -> dict:
+    """
+    Finds the fields of a product that differ from its previous values.
+
+    Args:
+        old (Mapping | None): The previous row, None for a new product.
+        new (dict): The new row.
+
+    Returns:
+        dict: The new values of the changed fields, all fields of a new product.
+    """
+    return {
+        field: new[field]
+        for field in PRODUCT_FIELDS[1:]
+        if old is None or old[field] != new[field]
+    }
+
+
+async def _record_checkpoint(conn: AsyncConnection, market: str, version: int) -> None:
+    """
+    Stores the whole menu of a market once enough changes were recorded since
+    the previous checkpoint.
+
+    A checkpoint is written when replaying the changes since the previous one
+    would cost more than CHECKPOINT_RATIO times reading the whole menu. Every
+    checkpoint thus follows at least that many changes, and checkpoints take
+    less space than the changes themselves.
+
+    Args:
+        conn (AsyncConnection): The connection, inside a transaction.
+        market (str): The market code.
+        version (int): The version just recorded.
+    """
+    checkpoint_version = await conn.scalar(
+        select(func.max(MenuCheckpoint.version)).where(
+            MenuCheckpoint.market == market
+        )
+    )
+    pending_changes = await conn.scalar(
+        select(func.sum(MenuVersion.changes)).where(
+            MenuVersion.market == market,
+            MenuVersion.version > (checkpoint_version or 0),
         )
+    )
+    product_count = await conn.scalar(
+        select(func.count()).select_from(Product).where(Product.market == market)
+    )
+    if pending_changes < CHECKPOINT_RATIO * max(product_count, 1):
+        return
 
-    db.add(product)
+    # Copied inside SQLite, so the menu is never loaded into memory.
+    await conn.execute(
+        insert(MenuCheckpoint).from_select(
+            ["market", "version", "product_id", *PRODUCT_FIELDS],
+            select(
+                Product.market,
+                literal(version),
+                Product.id,
+                *(getattr(Product, field) for field in PRODUCT_FIELDS),
+            ).where(Product.market == market),
+        )
+    )
+    logger.info("Menu checkpoint of %s written at version %d", market, version)
 
 
-async def init_db() -> None:
+async def upsert_products(
+    conn: AsyncConnection,
+    market: str,
+    products_data: Iterable[dict],
+    batch_size: int = BATCH_SIZE,
+) -> ImportResult:
     """
-    Initializes the database by creating all tables and loading initial data.
+    Synchronizes the products of a market with its menu in batches and records
+    the changes as a new menu version.
 
-    This function sets up the database schema and populates it with initial product data
-    from a JSON file.
+    Each batch is compared with the stored rows of the same products. Only new
+    and changed products are written, with `INSERT ... ON CONFLICT(market,
+    name) DO UPDATE`, and products that are no longer in the menu are deleted.
+    The changed fields of every product are stored in product_changes, so the
+    history grows with the number of changes. The first version of a market
+    stores all fields of every product. The product data is consumed one batch
+    at a time, only the names are kept until the end. The products of other
+    markets are not touched.
+
+    Args:
+        conn (AsyncConnection): The connection, inside a transaction.
+        market (str): The market code.
+        products_data (Iterable[dict]): The product data from the menu file.
+        batch_size (int): The number of rows written per statement.
+
+    Returns:
+        ImportResult: The inserted/updated/removed counts and the new version.
+    """
+    version = await get_latest_version(conn, market) + 1
+    existing_names = set(
+        (
+            await conn.execute(select(Product.name).where(Product.market == market))
+        ).scalars()
+    )
+    names = set()
+    inserted = updated = changes = 0
+
+    statement = insert(Product)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Product.market, Product.name],
+        set_={field: statement.excluded[field] for field in PRODUCT_FIELDS[1:]},
+    )
+    columns = [getattr(Product, field) for field in PRODUCT_FIELDS]
+    async for batch in _batched(products_data, batch_size):
+        rows = {
+            product_data["name"]: {
+                "market": market,
+                **{field: product_data.get(field) for field in PRODUCT_FIELDS},
+            }
+            for product_data in batch
+        }
+        names.update(rows)
+
+        stored = {
+            row["name"]: row
+            for row in (
+                await conn.execute(
+                    select(*columns).where(
+                        Product.market == market, Product.name.in_(rows)
+                    )
+                )
+            ).mappings()
+        }
+        deltas = {}
+        for name, row in rows.items():
+            delta = _diff_product(stored.get(name), row)
+            if name not in stored:
+                inserted += 1
+            elif delta:
+                updated += 1
+            if delta or version == 1:
+                deltas[name] = _diff_product(None, row) if version == 1 else delta
+        if not deltas:
+            continue
+
+        await conn.execute(statement, [rows[name] for name in deltas])
+        ids = await conn.execute(
+            select(Product.name, Product.id).where(
+                Product.market == market, Product.name.in_(deltas)
+            )
+        )
+        await conn.execute(
+            insert(ProductChange),
+            [
+                {
+                    "market": market,
+                    "version": version,
+                    "name": name,
+                    "product_id": product_id,
+                    "fields": deltas[name],
+                }
+                for name, product_id in ids
+            ],
+        )
+        changes += len(deltas)
+
+    removed_names = list(existing_names.difference(names))
+    for start in range(0, len(removed_names), batch_size):
+        removed = (
+            await conn.execute(
+                delete(Product)
+                .where(
+                    Product.market == market,
+                    Product.name.in_(removed_names[start:start + batch_size]),
+                )
+                .returning(Product.name, Product.id)
+            )
+        ).all()
+        if version > 1:
+            await conn.execute(
+                insert(ProductChange),
+                [
+                    {
+                        "market": market,
+                        "version": version,
+                        "name": name,
+                        "product_id": product_id,
+                        "fields": None,
+                    }
+                    for name, product_id in removed
+                ],
+            )
+            changes += len(removed)
+
+    if not changes:
+        logger.info("Menu of %s did not change, no version recorded", market)
+        return ImportResult(inserted=0, updated=0, removed=0)
+
+    await conn.execute(
+        insert(MenuVersion).values(
+            market=market, version=version, imported_at=datetime.now(), changes=changes
+        )
+    )
+    await _record_checkpoint(conn, market, version)
+    return ImportResult(
+        inserted=inserted,
+        updated=updated,
+        removed=len(removed_names),
+        version=version,
+    )
+
+
+def _drop_outdated_tables(conn: Connection) -> None:
+    """
+    Drops the products table if it was created before products had a market.
+
+    The table only holds data imported from the menu files, so it is dropped
+    together with the import metadata and imported again.
+
+    Args:
+        conn (Connection): The connection, inside a transaction.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(Product.__tablename__):
+        return
+    if any(column["name"] == "market" for column in inspector.get_columns("products")):
+        return
+
+    logger.info("Products table has no market column, recreating it")
+    Product.__table__.drop(conn)
+    MenuMetadata.__table__.drop(conn, checkfirst=True)
+
+
+async def create_tables() -> None:
+    """
+    Creates all tables that do not exist yet.
     """
     async with engine.begin() as conn:
+        await conn.run_sync(_drop_outdated_tables)
         await conn.run_sync(Base.metadata.create_all)
 
-    async with AsyncSession(engine) as db:
-        products_data = load_json_data(file_name=config.MENU_FILE_NAME)
 
-        for product_data in products_data:
-            await update_product(db, product_data)
+def get_menu_markets(markets: Sequence[str] | None = None) -> list[str]:
+    """
+    Lists the markets whose menu files are imported.
+
+    Args:
+        markets (Sequence[str] | None): The requested markets. Defaults to all
+            configured markets, skipping those without a menu file.
+
+    Returns:
+        list[str]: The market codes.
+    """
+    if markets is not None:
+        return list(markets)
+
+    found = []
+    for market in config.MARKETS:
+        file_name = config.MENU_FILE_NAME.format(market=market)
+        if os.path.exists(os.path.join(config.FILE_PATH, file_name)):
+            found.append(market)
+        else:
+            logger.warning("No menu file for market %s, import skipped", market)
+    return found
+
+
+async def import_market(market: str, force: bool = False) -> ImportResult:
+    """
+    Imports the menu file of a market and records the import as metrics.
+
+    Every market is imported in a transaction of its own, the tables must
+    exist, see `create_tables`.
+
+    Args:
+        market (str): The market code.
+        force (bool): Import the file even if it has not changed.
+
+    Returns:
+        ImportResult: The inserted/updated/removed counts of the import.
+
+    Raises:
+        FileNotFoundError: If the menu file of the market does not exist.
+        ValueError: If the menu file is invalid, see `validate_products`.
+    """
+    start = time.perf_counter()
+    try:
+        result = await _import_menu_file(market, force)
+    except Exception:
+        imports.labels(market, "failed").inc()
+        raise
+    finally:
+        import_duration.labels(market).set(time.perf_counter() - start)
+
+    imports.labels(market, "skipped" if result.skipped else "imported").inc()
+    imported_rows.labels(market, "inserted").inc(result.inserted)
+    imported_rows.labels(market, "updated").inc(result.updated)
+    imported_rows.labels(market, "removed").inc(result.removed)
+    return result
+
+
+async def _import_menu_file(market: str, force: bool) -> ImportResult:
+    """
+    Imports the menu file of a market unless it has not changed since the last
+    import.
+
+    Only the contents decide, the modification time is not enough: a file
+    rewritten within the resolution of its timestamp, or copied with its
+    timestamp preserved, keeps the modification time of other contents.
+
+    Args:
+        market (str): The market code.
+        force (bool): Import the file even if it has not changed.
+
+    Returns:
+        ImportResult: The inserted/updated/removed counts of the import.
+    """
+    file_name = config.MENU_FILE_NAME.format(market=market)
+    file_path = os.path.join(config.FILE_PATH, file_name)
+    file_mtime = os.stat(file_path).st_mtime
+
+    async with engine.begin() as conn:
+        metadata = (
+            await conn.execute(
+                select(MenuMetadata).where(MenuMetadata.file_name == file_name)
+            )
+        ).one_or_none()
+        # A menu imported before versions were recorded is imported once more
+        # to record its first version.
+        if metadata is not None and not await get_latest_version(conn, market):
+            metadata = None
+
+        file_hash = await asyncio.to_thread(get_file_hash, file_path)
+        if not force and metadata and metadata.file_hash == file_hash:
+            result = ImportResult(inserted=0, updated=0, removed=0, skipped=True)
+            logger.info(
+                "Menu file contents of %s are unchanged, import skipped", market
+            )
+        else:
+            products_data = validate_products(load_menu_data(market, file_hash))
+            result = await upsert_products(conn, market, products_data)
+            logger.info(
+                "Menu of %s imported: %d inserted, %d updated, %d removed",
+                market,
+                result.inserted,
+                result.updated,
+                result.removed,
+            )
+
+        statement = insert(MenuMetadata).values(
+            file_name=file_name,
+            file_hash=file_hash,
+            file_mtime=file_mtime,
+            imported_at=datetime.now(),
+        )
+        await conn.execute(
+            statement.on_conflict_do_update(
+                index_elements=[MenuMetadata.file_name],
+                set_={
+                    "file_hash": statement.excluded.file_hash,
+                    "file_mtime": statement.excluded.file_mtime,
+                    "imported_at": statement.excluded.imported_at,
+                },
+            )
+        )
 
-        await db.commit()
+    return result
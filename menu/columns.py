@@ -0,0 +1,293 @@
+import asyncio
+import glob
+import logging
+import operator
+import os
+from typing import Iterator, Mapping, Sequence
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from menu import config, schemas
+from menu.crud import get_version_imported_at, stream_products
+from menu.models import PRODUCT_COLUMNS
+from menu.search import NUMERIC_FIELDS
+from parser.columnar import ColumnarMenu, write_columns
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_BATCH_SIZE = 10000
+
+
+class ColumnarProducts(Sequence[schemas.Product]):
+    """
+    The products of a memory-mapped snapshot file as a read-only sequence.
+
+    A product is built from the mapped columns each time it is accessed, so
+    only the products a request returns are ever held as objects.
+
+    Attributes:
+        market (str): The market code.
+        menu (ColumnarMenu): The mapped file, one product per row in id order.
+    """
+
+    __slots__ = ("market", "menu")
+
+    def __init__(self, market: str, menu: ColumnarMenu) -> None:
+        """
+        Initializes a ColumnarProducts instance.
+
+        Args:
+            market (str): The market code.
+            menu (ColumnarMenu): The mapped file.
+        """
+        self.market = market
+        self.menu = menu
+
+    def __len__(self) -> int:
+        return len(self.menu)
+
+    def __getitem__(
+        self, index: int | slice
+    ) -> schemas.Product | list[schemas.Product]:
+        """
+        Builds the product at a position, or a list of them for a slice.
+
+        Args:
+            index (int | slice): The position or slice.
+
+        Returns:
+            schemas.Product | list[schemas.Product]: The products.
+
+        Raises:
+            IndexError: If the position is out of range.
+        """
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(len(self)))]
+
+        row = operator.index(index)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("product index out of range")
+        # The values were validated when they were written.
+        return schemas.Product.model_construct(
+            market=self.market, **self.menu.record(row)
+        )
+
+
+class ColumnarNames(Sequence[str]):
+    """
+    The product names of a memory-mapped snapshot file as a read-only sequence.
+    """
+
+    __slots__ = ("_menu",)
+
+    def __init__(self, menu: ColumnarMenu) -> None:
+        """
+        Initializes a ColumnarNames instance.
+
+        Args:
+            menu (ColumnarMenu): The mapped file.
+        """
+        self._menu = menu
+
+    def __len__(self) -> int:
+        return len(self._menu)
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        """
+        Reads the name at a position, or a list of them for a slice.
+
+        Args:
+            index (int | slice): The position or slice.
+
+        Returns:
+            str | list[str]: The names.
+
+        Raises:
+            IndexError: If the position is out of range.
+        """
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(len(self)))]
+
+        row = operator.index(index)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("name index out of range")
+        return self._menu.string("name", row)
+
+
+class ColumnarRows(Mapping[str, int]):
+    """
+    The position of every product name, looked up in the hash index of a
+    memory-mapped snapshot file.
+    """
+
+    __slots__ = ("_menu",)
+
+    def __init__(self, menu: ColumnarMenu) -> None:
+        """
+        Initializes a ColumnarRows instance.
+
+        Args:
+            menu (ColumnarMenu): The mapped file.
+        """
+        self._menu = menu
+
+    def __getitem__(self, name: str) -> int:
+        row = self._menu.find(name) if isinstance(name, str) else None
+        if row is None:
+            raise KeyError(name)
+        return row
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ColumnarNames(self._menu))
+
+    def __len__(self) -> int:
+        return len(self._menu)
+
+
+class ProductsByName(Mapping[str, schemas.Product]):
+    """
+    The products of a sequence keyed by name, through a mapping of names to
+    positions.
+    """
+
+    __slots__ = ("_rows", "_products")
+
+    def __init__(
+        self, rows: Mapping[str, int], products: Sequence[schemas.Product]
+    ) -> None:
+        """
+        Initializes a ProductsByName instance.
+
+        Args:
+            rows (Mapping[str, int]): The position of every product name.
+            products (Sequence[schemas.Product]): The products.
+        """
+        self._rows = rows
+        self._products = products
+
+    def __getitem__(self, name: str) -> schemas.Product:
+        return self._products[self._rows[name]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def get_snapshot_path(market: str, version: int) -> str:
+    """
+    Builds the path of the snapshot file of a menu version.
+
+    Args:
+        market (str): The market code.
+        version (int): The menu version.
+
+    Returns:
+        str: The path.
+    """
+    return os.path.join(config.SNAPSHOT_PATH, f"{market}.v{version}.columns")
+
+
+async def write_snapshot_file(
+    db: AsyncSession, market: str, version: int, imported_at: str
+) -> None:
+    """
+    Writes the products of a market to the snapshot file of its menu version.
+
+    Rows are streamed from the database in id order and collected per column,
+    numbers straight into NumPy arrays. The file is built and synced to disk
+    in a worker thread.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        version (int): The current menu version of the market.
+        imported_at (str): When the version was imported, stored in the file
+            to tell it from a version of the same number in another database.
+    """
+    positions = {column: position for position, column in enumerate(PRODUCT_COLUMNS)}
+    ids, names, descriptions = [], [], []
+    numbers: dict[str, list[np.ndarray]] = {field: [] for field in NUMERIC_FIELDS}
+    async for batch in stream_products(db, market, SNAPSHOT_BATCH_SIZE):
+        columns = list(zip(*batch))
+        ids.append(np.array(columns[positions["id"]], dtype=np.int64))
+        names.extend(columns[positions["name"]])
+        descriptions.extend(columns[positions["description"]])
+        for field, chunks in numbers.items():
+            chunks.append(np.array(columns[positions[field]], dtype=np.float64))
+
+    os.makedirs(config.SNAPSHOT_PATH, exist_ok=True)
+    await asyncio.to_thread(
+        write_columns,
+        get_snapshot_path(market, version),
+        rows=len(names),
+        numbers={
+            field: np.concatenate(chunks) if chunks else np.empty(0)
+            for field, chunks in numbers.items()
+        },
+        strings={"name": names, "description": descriptions},
+        integers={"id": np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)},
+        metadata={"market": market, "version": version, "imported_at": imported_at},
+    )
+
+
+def remove_snapshot_files(market: str, keep: str) -> None:
+    """
+    Deletes the snapshot files of the other versions of a market.
+
+    Snapshots already mapped by running requests keep working, since a mapped
+    file stays readable after it is deleted.
+
+    Args:
+        market (str): The market code.
+        keep (str): The path of the file to keep.
+    """
+    for path in glob.glob(os.path.join(config.SNAPSHOT_PATH, f"{market}.v*.columns")):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                logger.warning("Could not delete outdated snapshot file %s", path)
+
+
+async def load_snapshot_file(
+    db: AsyncSession, market: str, version: int
+) -> ColumnarMenu:
+    """
+    Maps the snapshot file of the current menu version of a market, writing it
+    first if it does not exist yet.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        version (int): The current menu version of the market.
+
+    Returns:
+        ColumnarMenu: The mapped file.
+    """
+    path = get_snapshot_path(market, version)
+    imported_at = (await get_version_imported_at(db, market, version)).isoformat()
+
+    if os.path.exists(path):
+        try:
+            menu = ColumnarMenu(path)
+        except ValueError:
+            logger.warning("Rewriting unreadable snapshot file %s", path)
+        else:
+            if (
+                menu.metadata.get("imported_at") == imported_at
+                and menu.numeric_fields == NUMERIC_FIELDS
+            ):
+                return menu
+            menu.close()
+
+    await write_snapshot_file(db, market, version, imported_at)
+    await asyncio.to_thread(remove_snapshot_files, market, keep=path)
+    logger.info("Snapshot file of %s written for version %d", market, version)
+    return ColumnarMenu(path)
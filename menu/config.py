@@ -0,0 +1,20 @@
+import configparser
+
+config = configparser.ConfigParser()
+config.read("config.ini")
+
+USE_SNAPSHOT = config.getboolean("menu", "snapshot", fallback=True)
+RESPONSE_CACHE_SIZE = config.getint("menu", "response_cache_size", fallback=1024)
+CACHE_MAX_AGE = config.getint("menu", "cache_max_age", fallback=60)
+LOOKUP_CACHE_SIZE = config.getint("menu", "lookup_cache_size", fallback=1024)
+LOOKUP_CACHE_TTL = config.getfloat("menu", "lookup_cache_ttl", fallback=5.0)
+
+# The markets served by the API, the first one when no market is requested.
+MARKETS = tuple(config.options("markets")) if config.has_section("markets") else ("ua",)
+DEFAULT_MARKET = MARKETS[0]
+HISTORY_CACHE_SIZE = config.getint("menu", "history_cache_size", fallback=8)
+MAPPED_SNAPSHOT = config.getboolean("menu", "mapped_snapshot", fallback=True)
+SNAPSHOT_PATH = config.get("menu", "snapshot_path", fallback="snapshots")
+# Meal optimizations visiting more branches or running longer are rejected.
+OPTIMIZE_MAX_NODES = config.getint("menu", "optimize_max_nodes", fallback=100000)
+OPTIMIZE_TIMEOUT = config.getfloat("menu", "optimize_timeout", fallback=1.0)
@@ -1,43 +1,438 @@
-from typing import Sequence
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from menu import models
+from database.engine import async_read_session
+from menu import config, models
+from menu.pagination import Cursor, parse_order_by
+from menu.search import Range, parse_sort_by
+from menu.singleflight import SingleFlight
+from monitoring.metrics import registry
+
+# One cache per market, so lookups in a busy market do not evict the others.
+lookups = {
+    market: SingleFlight(max_size=config.LOOKUP_CACHE_SIZE, ttl=config.LOOKUP_CACHE_TTL)
+    for market in config.MARKETS
+}
+registry.callback(
+    "menu_lookup_cache_hits_total",
+    "Product lookups answered from the lookup cache.",
+    "counter",
+    lambda: sum(cache.stats.hits for cache in lookups.values()),
+)
+registry.callback(
+    "menu_lookup_cache_misses_total",
+    "Product lookups that queried the database.",
+    "counter",
+    lambda: sum(cache.stats.misses for cache in lookups.values()),
+)
+registry.callback(
+    "menu_lookup_coalesced_total",
+    "Product lookups that joined a query already in flight.",
+    "counter",
+    lambda: sum(cache.stats.coalesced for cache in lookups.values()),
+)
+
+
+async def coalesced(
+    function: Callable[..., Awaitable], market: str, *args: Any
+) -> Any:
+    """
+    Runs a query function on a read session of its own, sharing the query with
+    concurrent calls with the same arguments and caching the result briefly
+    in the cache of the market.
+
+    Args:
+        function (Callable[..., Awaitable]): A function of this module taking
+            the session and the market as its first arguments.
+        market (str): The market code.
+        *args (Any): The other arguments, which must be hashable.
+
+    Returns:
+        Any: The result of the function.
+    """
+
+    async def run() -> Any:
+        async with async_read_session() as db:
+            return await function(db, market, *args)
+
+    return await lookups[market].call((function.__name__, *args), run)
+
+
+def _after_cursor(cursor: Cursor):
+    """
+    Builds the keyset condition selecting products after a cursor.
+
+    SQLite sorts NULLs first in ascending order, so they are handled apart
+    from the row-value comparison.
+
+    Args:
+        cursor (Cursor): The position after the last product of the previous page.
+
+    Returns:
+        The WHERE clause.
+    """
+    field, descending = parse_order_by(cursor.order_by)
+    column = getattr(models.Product, field)
+    key = tuple_(column, models.Product.id)
+
+    if descending:
+        if cursor.value is None:
+            return and_(column.is_(None), models.Product.id < cursor.id)
+        return or_(key < tuple_(cursor.value, cursor.id), column.is_(None))
+
+    if cursor.value is None:
+        return or_(
+            and_(column.is_(None), models.Product.id > cursor.id),
+            column.is_not(None),
+        )
+    return key > tuple_(cursor.value, cursor.id)
 
 
 async def get_all_products(
-    db: AsyncSession, skip: int, limit: int
+    db: AsyncSession,
+    market: str,
+    skip: int,
+    limit: int,
+    order_by: str = "id",
+    cursor: Cursor | None = None,
 ) -> Sequence[models.Product]:
     """
     Retrieves a list of products from the database with pagination.
 
+    Pages can be addressed with `skip` or, at a cost independent of the depth,
+    with a cursor pointing after the last product of the previous page.
+
     Args:
         db (AsyncSession): The database session.
+        market (str): The market code.
         skip (int): The number of records to skip.
         limit (int): The maximum number of records to return.
+        order_by (str): The field to order by, prefixed with `-` for descending.
+        cursor (Cursor | None): The position to continue from.
 
     Returns:
         Sequence[models.Product]: A list of products.
     """
-    query = select(models.Product).offset(skip).limit(limit)
-    products_list = await db.execute(query)
+    field, descending = parse_order_by(order_by)
+    column = getattr(models.Product, field)
+
+    query = select(models.Product).where(models.Product.market == market)
+    if cursor is not None:
+        query = query.where(_after_cursor(cursor))
+    if descending:
+        query = query.order_by(column.desc(), models.Product.id.desc())
+    else:
+        query = query.order_by(column, models.Product.id)
+
+    products_list = await db.execute(query.offset(skip).limit(limit))
 
     return products_list.scalars().all()
 
 
-async def get_single_product(db: AsyncSession, product_name: str) -> models.Product:
+async def get_menu(db: AsyncSession, market: str) -> Sequence[models.Product]:
+    """
+    Retrieves all products of a market from the database in id order.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+
+    Returns:
+        Sequence[models.Product]: All products of the market.
+    """
+    products_list = await db.execute(
+        select(models.Product)
+        .where(models.Product.market == market)
+        .order_by(models.Product.id)
+    )
+
+    return products_list.scalars().all()
+
+
+async def stream_products(
+    db: AsyncSession, market: str, batch_size: int
+) -> AsyncIterator[Sequence[tuple]]:
+    """
+    Streams all product rows of a market in id order over a server-side cursor.
+
+    Rows are fetched as plain tuples of PRODUCT_COLUMNS, without loading ORM
+    objects, so memory use depends on the batch size only.
+
+    Args:
+        db (AsyncSession): The database session, open until the stream ends.
+        market (str): The market code.
+        batch_size (int): The number of rows fetched at a time.
+
+    Yields:
+        Sequence[tuple]: The next batch of rows.
+    """
+    columns = [getattr(models.Product, column) for column in models.PRODUCT_COLUMNS]
+    query = (
+        select(*columns)
+        .where(models.Product.market == market)
+        .order_by(models.Product.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(query)
+    async for batch in result.partitions():
+        yield batch
+
+
+async def get_single_product(
+    db: AsyncSession, market: str, product_name: str
+) -> models.Product:
     """
     Retrieves a single product by name from the database.
 
     Args:
         db (AsyncSession): The database session.
+        market (str): The market code.
         product_name (str): The name of the product to retrieve.
 
     Returns:
         models.Product: The product with the specified name, or None if not found.
     """
-    query = select(models.Product).where(models.Product.name == product_name)
+    query = select(models.Product).where(
+        models.Product.market == market, models.Product.name == product_name
+    )
     product = await db.execute(query)
 
     return product.scalar()
+
+
+async def get_products_by_names(
+    db: AsyncSession, market: str, product_names: Sequence[str], fields: Sequence[str]
+) -> list[dict]:
+    """
+    Retrieves selected fields of the products with the given names in one query.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        product_names (Sequence[str]): The names of the products to retrieve.
+        fields (Sequence[str]): The columns to select, validated by the caller.
+
+    Returns:
+        list[dict]: The found products as dictionaries, always including `name`.
+    """
+    columns = [
+        getattr(models.Product, field) for field in dict.fromkeys(("name", *fields))
+    ]
+    query = select(*columns).where(
+        models.Product.market == market, models.Product.name.in_(product_names)
+    )
+    rows = await db.execute(query)
+
+    return [dict(row) for row in rows.mappings()]
+
+
+async def get_single_product_field(
+    db: AsyncSession, market: str, product_name: str, product_field: str
+) -> tuple[bool, object]:
+    """
+    Retrieves a single column of a product by name, without loading the ORM row.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        product_name (str): The name of the product to retrieve.
+        product_field (str): The column to select, validated by the caller.
+
+    Returns:
+        tuple[bool, object]: Whether the product exists and the value of the field.
+    """
+    column = getattr(models.Product, product_field)
+    query = select(column).where(
+        models.Product.market == market, models.Product.name == product_name
+    )
+    row = (await db.execute(query)).one_or_none()
+
+    return (False, None) if row is None else (True, row[0])
+
+
+async def search_products(
+    db: AsyncSession,
+    market: str,
+    ranges: Sequence[Range],
+    sort_by: str | None,
+    limit: int,
+) -> Sequence[models.Product]:
+    """
+    Retrieves products whose numeric fields lie in the given ranges.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        ranges (Sequence[Range]): The predicates, all of which must match.
+        sort_by (str | None): The field to sort by, prefixed with `-` for
+            descending order. NULLs are sorted last. Defaults to id order.
+        limit (int): The maximum number of records to return.
+
+    Returns:
+        Sequence[models.Product]: A list of products.
+    """
+    query = select(models.Product).where(models.Product.market == market)
+    for predicate in ranges:
+        column = getattr(models.Product, predicate.field)
+        query = query.where(column.is_not(None))
+        if predicate.minimum is not None:
+            query = query.where(column >= predicate.minimum)
+        if predicate.maximum is not None:
+            query = query.where(column <= predicate.maximum)
+
+    if sort_by:
+        field, descending = parse_sort_by(sort_by)
+        column = getattr(models.Product, field)
+        query = query.order_by(
+            column.is_(None), column.desc() if descending else column
+        )
+    query = query.order_by(models.Product.id)
+
+    products_list = await db.execute(query.limit(limit))
+
+    return products_list.scalars().all()
+
+
+async def get_menu_version(
+    db: AsyncSession, market: str, as_of: int | datetime | None = None
+) -> int | None:
+    """
+    Resolves a menu version of a market.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        as_of (int | datetime | None): A version number, a point in time for
+            the version current at that time, or None for the latest version.
+
+    Returns:
+        int | None: The version, or None if there is no such version.
+    """
+    query = select(func.max(models.MenuVersion.version)).where(
+        models.MenuVersion.market == market
+    )
+    if isinstance(as_of, datetime):
+        query = query.where(models.MenuVersion.imported_at <= as_of)
+    elif as_of is not None:
+        query = query.where(models.MenuVersion.version == as_of)
+
+    return await db.scalar(query)
+
+
+async def get_version_imported_at(
+    db: AsyncSession, market: str, version: int
+) -> datetime | None:
+    """
+    Retrieves when a menu version of a market was imported.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        version (int): The version.
+
+    Returns:
+        datetime | None: The import time, or None if there is no such version.
+    """
+    return await db.scalar(
+        select(models.MenuVersion.imported_at).where(
+            models.MenuVersion.market == market,
+            models.MenuVersion.version == version,
+        )
+    )
+
+
+async def get_menu_at(db: AsyncSession, market: str, version: int) -> list[dict]:
+    """
+    Rebuilds the menu of a market as it was at a version.
+
+    Starts from the latest checkpoint at or before the version and replays
+    the changes recorded after it, in one indexed range scan each.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        version (int): The version to rebuild.
+
+    Returns:
+        list[dict]: The products of the version in id order, as dictionaries
+            of the product columns without the market.
+    """
+    start = await db.scalar(
+        select(func.max(models.MenuCheckpoint.version)).where(
+            models.MenuCheckpoint.market == market,
+            models.MenuCheckpoint.version <= version,
+        )
+    ) or 0
+    columns = [
+        getattr(models.MenuCheckpoint, column)
+        for column in models.PRODUCT_COLUMNS
+        if column not in ("id", "market")
+    ]
+    products = await db.execute(
+        select(models.MenuCheckpoint.product_id.label("id"), *columns).where(
+            models.MenuCheckpoint.market == market,
+            models.MenuCheckpoint.version == start,
+        )
+    )
+    menu = {product["name"]: dict(product) for product in products.mappings()}
+
+    changes = await db.execute(
+        select(
+            models.ProductChange.name,
+            models.ProductChange.product_id,
+            models.ProductChange.fields,
+        )
+        .where(
+            models.ProductChange.market == market,
+            models.ProductChange.version > start,
+            models.ProductChange.version <= version,
+        )
+        .order_by(models.ProductChange.version, models.ProductChange.id)
+    )
+    for name, product_id, fields in changes:
+        if fields is None:
+            menu.pop(name, None)
+        else:
+            menu[name] = {**menu.get(name, {}), **fields, "id": product_id, "name": name}
+
+    return sorted(menu.values(), key=lambda product: product["id"])
+
+
+async def get_product_history(
+    db: AsyncSession, market: str, product_name: str
+) -> Sequence:
+    """
+    Retrieves the recorded changes of a product, oldest first.
+
+    Args:
+        db (AsyncSession): The database session.
+        market (str): The market code.
+        product_name (str): The name of the product.
+
+    Returns:
+        Sequence: Rows of the version, its import time and the changed fields,
+            None for the versions the product was removed in.
+    """
+    query = (
+        select(
+            models.ProductChange.version,
+            models.MenuVersion.imported_at,
+            models.ProductChange.fields,
+        )
+        .join(
+            models.MenuVersion,
+            and_(
+                models.MenuVersion.market == models.ProductChange.market,
+                models.MenuVersion.version == models.ProductChange.version,
+            ),
+        )
+        .where(
+            models.ProductChange.market == market,
+            models.ProductChange.name == product_name,
+        )
+        .order_by(models.ProductChange.version)
+    )
+    return (await db.execute(query)).all()
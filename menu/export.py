@@ -0,0 +1,101 @@
+import csv
+import io
+from typing import AsyncIterator, Sequence
+
+import orjson
+
+from database.engine import async_read_session
+from menu.crud import stream_products
+from menu.models import PRODUCT_COLUMNS
+from menu.snapshot import MenuSnapshot
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+}
+
+
+async def iter_product_rows(
+    snapshot: MenuSnapshot | None, market: str, batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[Sequence[tuple]]:
+    """
+    Iterates over all products of a market in id order as tuples of
+    PRODUCT_COLUMNS.
+
+    Without a snapshot the rows are streamed from a session of their own, since
+    the request session is closed before a streaming body is sent.
+
+    Args:
+        snapshot (MenuSnapshot | None): The current menu snapshot of the market.
+        market (str): The market code.
+        batch_size (int): The number of rows per batch.
+
+    Yields:
+        Sequence[tuple]: The next batch of rows.
+    """
+    if snapshot is not None:
+        for start in range(0, len(snapshot.products), batch_size):
+            yield [
+                tuple(getattr(product, column) for column in PRODUCT_COLUMNS)
+                for product in snapshot.products[start:start + batch_size]
+            ]
+        return
+
+    async with async_read_session() as db:
+        async for batch in stream_products(db, market, batch_size):
+            yield batch
+
+
+def _encode_csv(rows: Sequence[Sequence]) -> bytes:
+    """
+    Encodes rows as CSV lines.
+
+    Args:
+        rows (Sequence[Sequence]): The rows to encode.
+
+    Returns:
+        bytes: The UTF-8 encoded lines.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_products(
+    batches: AsyncIterator[Sequence[tuple]], export_format: str
+) -> AsyncIterator[bytes]:
+    """
+    Encodes batches of product rows as a stream of body chunks.
+
+    Every batch is encoded into one chunk, so the first chunk is sent as soon
+    as the first batch is read and no more than one batch is held in memory.
+
+    Args:
+        batches (AsyncIterator[Sequence[tuple]]): Rows of PRODUCT_COLUMNS.
+        export_format (str): One of EXPORT_MEDIA_TYPES.
+
+    Yields:
+        bytes: The next chunk of the body.
+    """
+    if export_format == "csv":
+        yield _encode_csv([PRODUCT_COLUMNS])
+    elif export_format == "json":
+        yield b"["
+
+    separator = b""
+    async for rows in batches:
+        if export_format == "csv":
+            yield _encode_csv(rows)
+            continue
+
+        records = [orjson.dumps(dict(zip(PRODUCT_COLUMNS, row))) for row in rows]
+        if export_format == "json":
+            yield separator + b",".join(records)
+            separator = b","
+        else:
+            yield b"\n".join(records) + b"\n"
+
+    if export_format == "json":
+        yield b"]"
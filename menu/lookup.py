@@ -0,0 +1,227 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Sequence
+
+import numpy as np
+
+from menu import schemas
+
+APOSTROPHES = re.compile("[`´ʼ’‘]")
+WORDS = re.compile(r"\w+")
+
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+SUBSTRING_SCORE = 1.5
+DESCRIPTION_WEIGHT = 0.2
+MIN_SIMILARITY = 0.2
+# Bounds on the work per query, so common trigrams do not make a query scan
+# most of a large menu: how many trigram postings are counted, and how many of
+# the names sharing the most of them are scored.
+MAX_POSTINGS = 20000
+MAX_CANDIDATES = 32
+
+
+def normalize(text: str) -> str:
+    """
+    Normalizes text for matching: case-folded, one kind of apostrophe and
+    single spaces.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    return " ".join(APOSTROPHES.sub("'", text).casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Splits normalized text into trigrams, padded so short words have some.
+
+    Args:
+        text (str): The normalized text.
+
+    Returns:
+        set[str]: The trigrams of the text.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _contains(postings: list[int], position: int) -> bool:
+    """
+    Checks whether a sorted posting list holds a position.
+
+    Args:
+        postings (list[int]): The positions in ascending order.
+        position (int): The position to look for.
+
+    Returns:
+        bool: True if the list holds the position.
+    """
+    index = bisect_left(postings, position)
+    return index < len(postings) and postings[index] == position
+
+
+class TrigramIndex:
+    """
+    Case-insensitive, prefix and typo-tolerant index over product names.
+
+    Names are indexed by trigram and kept sorted for prefix lookups, and
+    description words are indexed to rank products mentioning the query.
+    Posting lists hold positions in ascending order.
+    """
+
+    def __init__(self, products: Sequence[schemas.Product]) -> None:
+        """
+        Builds the index.
+
+        Args:
+            products (Sequence[schemas.Product]): The products to index.
+        """
+        self._products = products
+        self._names = [normalize(product.name) for product in products]
+        name_postings: dict[str, list[int]] = {}
+        self._exact: dict[str, list[int]] = {}
+        self._description_postings: dict[str, list[int]] = {}
+
+        for position, (name, product) in enumerate(zip(self._names, products)):
+            self._exact.setdefault(name, []).append(position)
+            for trigram in trigrams(name):
+                name_postings.setdefault(trigram, []).append(position)
+            for word in set(WORDS.findall(normalize(product.description or ""))):
+                self._description_postings.setdefault(word, []).append(position)
+
+        self._postings = {
+            trigram: np.array(postings, dtype=np.int32)
+            for trigram, postings in name_postings.items()
+        }
+        self._sorted_names = sorted(
+            (name, position) for position, name in enumerate(self._names)
+        )
+
+    def _prefix_matches(self, query: str, limit: int) -> list[int]:
+        """
+        Finds names starting with the query.
+
+        Args:
+            query (str): The normalized query.
+            limit (int): The maximum number of matches.
+
+        Returns:
+            list[int]: The positions of matching products, alphabetically.
+        """
+        matches = []
+        start = bisect_left(self._sorted_names, (query, -1))
+        for name, position in self._sorted_names[start:start + limit]:
+            if not name.startswith(query):
+                break
+            matches.append(position)
+        return matches
+
+    def _candidates(self, query: str, query_trigrams: set[str]) -> list[int]:
+        """
+        Collects the names sharing the most trigrams with the query.
+
+        Shared trigrams are counted over the posting lists of the rarest
+        trigrams of the query, as many as fit in MAX_POSTINGS postings, since
+        common trigrams tell names apart the least. Only the MAX_CANDIDATES
+        names sharing the most of them are scored.
+
+        Args:
+            query (str): The normalized query.
+            query_trigrams (set[str]): The trigrams of the query.
+
+        Returns:
+            list[int]: The positions of the candidates, exact names first.
+        """
+        postings = sorted(
+            (
+                self._postings[trigram]
+                for trigram in query_trigrams
+                if trigram in self._postings
+            ),
+            key=len,
+        )
+        counted = []
+        budget = MAX_POSTINGS
+        for trigram_postings in postings:
+            if budget <= 0:
+                break
+            counted.append(trigram_postings[:budget])
+            budget -= len(trigram_postings)
+
+        candidates = dict.fromkeys(self._exact.get(query, ()))
+        if counted:
+            positions, counts = np.unique(np.concatenate(counted), return_counts=True)
+            if len(positions) > MAX_CANDIDATES:
+                positions = np.sort(
+                    positions[np.argpartition(-counts, MAX_CANDIDATES - 1)][
+                        :MAX_CANDIDATES
+                    ]
+                )
+            candidates.update(dict.fromkeys(positions.tolist()))
+        return list(candidates)
+
+    def search(self, query: str, limit: int = 10) -> list[schemas.Product]:
+        """
+        Finds the products best matching a query.
+
+        Exact names rank first, then name prefixes, names containing the query
+        and names similar to it by trigrams. Matching description words add a
+        small bonus. The work per query is bounded, see `_candidates`, so a
+        query on a large menu may miss names that share only common trigrams
+        with it.
+
+        Args:
+            query (str): The text to look up.
+            limit (int): The maximum number of products to return.
+
+        Returns:
+            list[schemas.Product]: The matching products, best first.
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        query_trigrams = trigrams(query)
+        scores: dict[int, float] = {}
+        for position in self._candidates(query, query_trigrams):
+            name = self._names[position]
+            name_trigrams = trigrams(name)
+            shared = len(query_trigrams & name_trigrams)
+            similarity = shared / (len(query_trigrams) + len(name_trigrams) - shared)
+            if name == query:
+                similarity += EXACT_SCORE
+            elif query in name:
+                similarity += SUBSTRING_SCORE
+            if similarity >= MIN_SIMILARITY:
+                scores[position] = similarity
+
+        for position in self._prefix_matches(query, limit):
+            scores[position] = max(
+                scores.get(position, 0.0),
+                PREFIX_SCORE + len(query) / len(self._names[position]),
+            )
+
+        query_words = set(WORDS.findall(query))
+        for word in query_words:
+            postings = self._description_postings.get(word, ())
+            # Common words only add to the products already found.
+            if len(postings) > MAX_CANDIDATES:
+                postings = [
+                    position for position in scores if _contains(postings, position)
+                ]
+            for position in postings:
+                scores[position] = scores.get(position, 0.0) + (
+                    DESCRIPTION_WEIGHT / len(query_words)
+                )
+
+        best = heapq.nsmallest(
+            limit, scores, key=lambda position: (-scores[position], position)
+        )
+        return [self._products[position] for position in best]
@@ -1,15 +1,23 @@
-from sqlalchemy import String, Float
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Float, Index, Integer, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database.engine import Base
+from menu.search import NUMERIC_FIELDS
 
 
 class Product(Base):
     """
     ORM model for the products table.
 
+    Product names are unique within a market. Every index starts with the
+    market, so queries for one market only read the index entries of that
+    market.
+
     Attributes:
         id (int): The primary key of the product.
+        market (str): The code of the market whose menu has the product.
         name (str): The name of the product.
         description (str): A description of the product.
         calories (float): The caloric content of the product.
@@ -23,9 +31,20 @@ class Product(Base):
     """
 
     __tablename__ = "products"
+    __table_args__ = (
+        UniqueConstraint("market", "name", name="uq_products_market_name"),
+        # SQLite appends the rowid, i.e. the id, to every index, so these also
+        # serve the (field, id) keyset order of the pagination.
+        Index("ix_products_market_id", "market", "id"),
+        *(
+            Index(f"ix_products_market_{field}", "market", field)
+            for field in NUMERIC_FIELDS
+        ),
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    name: Mapped[str] = mapped_column(String(63), unique=True, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    market: Mapped[str] = mapped_column(String(15))
+    name: Mapped[str] = mapped_column(String(63))
     description: Mapped[str] = mapped_column(String(255), nullable=True)
     calories: Mapped[float] = mapped_column(Float, nullable=True)
     fats: Mapped[float] = mapped_column(Float, nullable=True)
@@ -35,3 +54,116 @@ class Product(Base):
     sugar: Mapped[float] = mapped_column(Float, nullable=True)
     salt: Mapped[float] = mapped_column(Float, nullable=True)
     portion: Mapped[float] = mapped_column(Float, nullable=True)
+
+
+class MenuMetadata(Base):
+    """
+    ORM model for the menu_metadata table.
+
+    Remembers which version of a menu file was imported last, so unchanged files
+    are not imported again.
+
+    Attributes:
+        file_name (str): The name of the imported menu file.
+        file_hash (str): The SHA-256 digest of the file contents.
+        file_mtime (float): The modification time of the file.
+        imported_at (datetime): When the file was imported.
+    """
+
+    __tablename__ = "menu_metadata"
+
+    file_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    file_hash: Mapped[str] = mapped_column(String(64))
+    file_mtime: Mapped[float] = mapped_column(Float)
+    imported_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+class MenuVersion(Base):
+    """
+    ORM model for the menu_versions table.
+
+    Every import that changes the menu of a market records a new version.
+
+    Attributes:
+        market (str): The market code.
+        version (int): The version number, counted from 1 per market.
+        imported_at (datetime): When the version was imported.
+        changes (int): The number of products added, changed or removed.
+    """
+
+    __tablename__ = "menu_versions"
+    __table_args__ = (
+        Index("ix_menu_versions_market_imported_at", "market", "imported_at"),
+    )
+
+    market: Mapped[str] = mapped_column(String(15), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    imported_at: Mapped[datetime] = mapped_column(DateTime)
+    changes: Mapped[int] = mapped_column(Integer)
+
+
+class ProductChange(Base):
+    """
+    ORM model for the product_changes table.
+
+    Holds the fields of a product that changed in a menu version: all fields
+    of an added product, the changed fields of an updated one and NULL for a
+    removed one.
+
+    Attributes:
+        id (int): The primary key of the change.
+        market (str): The market code.
+        version (int): The menu version of the change.
+        name (str): The name of the product.
+        product_id (int): The id of the product in the products table.
+        fields (dict | None): The new values of the changed fields, or None if
+            the product was removed.
+    """
+
+    __tablename__ = "product_changes"
+    __table_args__ = (
+        Index("ix_product_changes_market_version", "market", "version"),
+        Index("ix_product_changes_market_name_version", "market", "name", "version"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    market: Mapped[str] = mapped_column(String(15))
+    version: Mapped[int] = mapped_column(Integer)
+    name: Mapped[str] = mapped_column(String(63))
+    product_id: Mapped[int] = mapped_column(Integer)
+    fields: Mapped[dict] = mapped_column(JSON, nullable=True)
+
+
+class MenuCheckpoint(Base):
+    """
+    ORM model for the menu_checkpoints table.
+
+    A checkpoint holds a copy of every product of the menu of a market at a
+    version, so rebuilding a later version only replays the changes recorded
+    after it. The product fields are the same as in the products table.
+
+    Attributes:
+        market (str): The market code.
+        version (int): The menu version of the checkpoint.
+        name (str): The name of the product.
+        product_id (int): The id of the product in the products table.
+    """
+
+    __tablename__ = "menu_checkpoints"
+
+    market: Mapped[str] = mapped_column(String(15), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer)
+    description: Mapped[str] = mapped_column(String(255), nullable=True)
+    calories: Mapped[float] = mapped_column(Float, nullable=True)
+    fats: Mapped[float] = mapped_column(Float, nullable=True)
+    carbs: Mapped[float] = mapped_column(Float, nullable=True)
+    proteins: Mapped[float] = mapped_column(Float, nullable=True)
+    unsaturated_fats: Mapped[float] = mapped_column(Float, nullable=True)
+    sugar: Mapped[float] = mapped_column(Float, nullable=True)
+    salt: Mapped[float] = mapped_column(Float, nullable=True)
+    portion: Mapped[float] = mapped_column(Float, nullable=True)
+
+
+PRODUCT_COLUMNS = tuple(Product.__table__.columns.keys())
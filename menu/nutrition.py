@@ -0,0 +1,427 @@
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
+
+from menu import schemas
+from menu.search import NUMERIC_FIELDS, Range
+
+SIMILARITY_CHUNK_SIZE = 512
+
+
+class SearchLimitExceeded(Exception):
+    """
+    Raised when a meal optimization visits more branches or runs longer than
+    allowed.
+    """
+
+
+@dataclass(frozen=True)
+class Bound:
+    """
+    Inclusive bound on the total of a nutrient in a meal.
+
+    Attributes:
+        field (str): The numeric field to bound.
+        minimum (float | None): The lower bound, or None for no bound.
+        maximum (float | None): The upper bound, or None for no bound.
+    """
+
+    field: str
+    minimum: float | None = None
+    maximum: float | None = None
+
+
+@dataclass(frozen=True)
+class Meal:
+    """
+    A combination of products with its nutrient totals.
+
+    Attributes:
+        items (tuple[tuple[str, int], ...]): Product names and quantities.
+        totals (dict[str, float]): The total of each nutrient.
+        incomplete (tuple[str, ...]): Nutrients unknown for some product, whose
+            totals only cover the products where they are known.
+    """
+
+    items: tuple[tuple[str, int], ...]
+    totals: dict[str, float]
+    incomplete: tuple[str, ...] = ()
+
+
+def parse_weights(params: Iterable[tuple[str, str]]) -> dict[str, float]:
+    """
+    Reads nutrient weights from `<field>_weight` query parameters.
+
+    Other parameters are ignored.
+
+    Args:
+        params (Iterable[tuple[str, str]]): The query parameters.
+
+    Returns:
+        dict[str, float]: The weight of each given field.
+
+    Raises:
+        ValueError: If a weight names an unknown field or is not a
+            non-negative number.
+    """
+    weights = {}
+    for key, value in params:
+        field, _, suffix = key.rpartition("_")
+        if suffix != "weight" or not field:
+            continue
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"Cannot weight {field!r}")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise ValueError(f"{key} must be a number") from None
+        if not math.isfinite(weight) or weight < 0:
+            raise ValueError(f"{key} must be a non-negative number")
+        weights[field] = weight
+    return weights
+
+
+def _suffix_gains(vectors: np.ndarray) -> np.ndarray:
+    """
+    Computes the most one product can add to each column, over the products
+    from every position on.
+
+    Args:
+        vectors (np.ndarray): The (products x columns) values.
+
+    Returns:
+        np.ndarray: The (products + 1 x columns) gains, never negative, with a
+            last row of zeros past the end.
+    """
+    gains = np.zeros((len(vectors) + 1, vectors.shape[1]))
+    if len(vectors):
+        reversed_gains = np.maximum(vectors[::-1], 0.0)
+        gains[:-1] = np.maximum.accumulate(reversed_gains, axis=0)[::-1]
+    return gains
+
+
+class NutrientMatrix:
+    """
+    The numeric fields of a menu as one float64 matrix, NULLs stored as NaN.
+
+    Attributes:
+        products (Sequence[schemas.Product]): The products, one per row.
+        names (Sequence[str]): The product names, one per row.
+        matrix (np.ndarray): The (products x NUMERIC_FIELDS) matrix.
+        rows (Mapping[str, int]): The row of each product name.
+    """
+
+    def __init__(
+        self,
+        products: Sequence[schemas.Product],
+        names: Sequence[str] | None = None,
+        rows: Mapping[str, int] | None = None,
+        matrix: np.ndarray | None = None,
+    ) -> None:
+        """
+        Builds the matrix.
+
+        The names, rows and matrix are built from the products unless given,
+        e.g. as views of a memory-mapped snapshot file.
+
+        Args:
+            products (Sequence[schemas.Product]): The products, one per row.
+            names (Sequence[str] | None): The product names, one per row.
+            rows (Mapping[str, int] | None): The row of each product name.
+            matrix (np.ndarray | None): The read-only matrix.
+        """
+        self.products = products
+        if names is None:
+            names = tuple(product.name for product in self.products)
+        self.names = names
+        self.rows: Mapping[str, int] = (
+            {name: row for row, name in enumerate(names)} if rows is None else rows
+        )
+        if matrix is None:
+            matrix = np.array(
+                [
+                    [getattr(product, field) for field in NUMERIC_FIELDS]
+                    for product in self.products
+                ],
+                dtype=np.float64,
+            ).reshape(len(self.products), len(NUMERIC_FIELDS))
+            matrix.flags.writeable = False
+        self.matrix = matrix
+
+    @cached_property
+    def normalized(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The matrix scaled to zero mean and unit variance per
+                field, NULLs imputed with the mean of their field. Computed on
+                first use.
+        """
+        known = ~np.isnan(self.matrix)
+        counts = np.maximum(known.sum(axis=0), 1)
+        means = np.nansum(self.matrix, axis=0) / counts
+        deviations = np.where(known, self.matrix - means, 0.0)
+        stds = np.sqrt((deviations**2).sum(axis=0) / counts)
+        normalized = deviations / np.where(stds > 0, stds, 1.0)
+        normalized.flags.writeable = False
+        return normalized
+
+    def _to_meal(self, rows: np.ndarray, quantities: np.ndarray) -> Meal:
+        """
+        Sums the nutrients of some rows.
+
+        Args:
+            rows (np.ndarray): The rows of the products.
+            quantities (np.ndarray): The quantity of each product.
+
+        Returns:
+            Meal: The products with their totals.
+        """
+        values = self.matrix[rows]
+        totals = quantities @ np.nan_to_num(values)
+        incomplete = np.isnan(values).any(axis=0)
+        return Meal(
+            items=tuple(
+                (self.names[row], int(quantity))
+                for row, quantity in zip(rows, quantities)
+            ),
+            totals=dict(zip(NUMERIC_FIELDS, totals.tolist())),
+            incomplete=tuple(
+                field for field, missing in zip(NUMERIC_FIELDS, incomplete) if missing
+            ),
+        )
+
+    def get_totals(self, order: Mapping[str, int]) -> tuple[Meal, list[str]]:
+        """
+        Sums the nutrients of an order in one vectorized pass.
+
+        Args:
+            order (Mapping[str, int]): The quantity of each product name.
+
+        Returns:
+            tuple[Meal, list[str]]: The totals over the known products and the
+                names that are not on the menu.
+        """
+        not_found = [name for name in order if name not in self.rows]
+        found = [name for name in order if name in self.rows]
+        rows = np.array([self.rows[name] for name in found], dtype=np.intp)
+        quantities = np.array([order[name] for name in found], dtype=np.float64)
+        return self._to_meal(rows, quantities), not_found
+
+    def optimize(
+        self,
+        objective: str,
+        maximize: bool = True,
+        bounds: Sequence[Bound] = (),
+        max_items: int = 3,
+        min_items: int = 1,
+        max_quantity: int = 1,
+        top: int = 5,
+        max_nodes: int | None = None,
+        timeout: float | None = None,
+    ) -> list[Meal]:
+        """
+        Finds the best meals under bounds on their nutrient totals.
+
+        Solves the bounded multi-constraint knapsack exactly by branch and
+        bound. Products are sorted by their objective value, every level of
+        the search evaluates all next products in one vectorized step, and a
+        branch is cut as soon as it cannot beat the current top meals, exceeds
+        a maximum bound, or cannot reach a minimum bound even if every
+        remaining item were the product with the most of that nutrient among
+        those still to come. Products with NULL values in the objective or a
+        bounded nutrient are left out.
+
+        Args:
+            objective (str): The numeric field to optimize.
+            maximize (bool): Whether to maximize or minimize the objective.
+            bounds (Sequence[Bound]): Bounds on the totals of the meal.
+            max_items (int): The maximum number of products in a meal.
+            min_items (int): The minimum number of products in a meal.
+            max_quantity (int): How many times one product can be taken.
+            top (int): The number of meals to return.
+            max_nodes (int | None): The maximum number of branches to visit,
+                unlimited if None.
+            timeout (float | None): The maximum duration of the search in
+                seconds, unlimited if None.
+
+        Returns:
+            list[Meal]: Up to `top` meals, best first.
+
+        Raises:
+            SearchLimitExceeded: If the search visits more than `max_nodes`
+                branches or runs longer than `timeout`.
+        """
+        columns = [NUMERIC_FIELDS.index(bound.field) for bound in bounds]
+        objective_column = NUMERIC_FIELDS.index(objective)
+        maxima = np.full(len(NUMERIC_FIELDS), np.inf)
+        minima = np.full(len(NUMERIC_FIELDS), -np.inf)
+        for column, bound in zip(columns, bounds):
+            if bound.maximum is not None:
+                maxima[column] = min(maxima[column], bound.maximum)
+            if bound.minimum is not None:
+                minima[column] = max(minima[column], bound.minimum)
+
+        vectors = np.nan_to_num(self.matrix)
+        eligible = ~np.isnan(self.matrix[:, [objective_column, *columns]]).any(axis=1)
+        eligible &= (vectors <= maxima).all(axis=1)
+        values = self.matrix[:, objective_column] * (1 if maximize else -1)
+        rows = np.flatnonzero(eligible)
+        rows = rows[np.argsort(-values[rows], kind="stable")]
+        values, vectors = values[rows], vectors[rows]
+
+        # Totals only grow with every product if no value is negative, which
+        # makes it safe to cut a branch that already exceeds a maximum.
+        monotone = bool((vectors >= 0).all())
+        minimum_columns = np.flatnonzero(minima > -np.inf)
+        minimum_values = minima[minimum_columns]
+        gains = _suffix_gains(vectors[:, minimum_columns])
+
+        best: list[tuple[float, int, tuple[int, ...]]] = []
+        counter = itertools.count()
+        nodes = itertools.count(1)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def threshold() -> float:
+            return best[0][0] if len(best) == top else -np.inf
+
+        def extend(
+            start: int, chosen: tuple[int, ...], totals: np.ndarray, value: float
+        ) -> None:
+            if max_nodes is not None and next(nodes) > max_nodes:
+                raise SearchLimitExceeded(f"Search exceeded {max_nodes} branches")
+            if deadline is not None and time.monotonic() > deadline:
+                raise SearchLimitExceeded(f"Search exceeded {timeout} seconds")
+
+            next_totals = totals + vectors[start:]
+            next_values = value + values[start:]
+            within = (next_totals <= maxima).all(axis=1)
+
+            if len(chosen) + 1 >= min_items:
+                accepted = within & (next_totals >= minima).all(axis=1)
+                accepted &= next_values > threshold()
+                for offset in np.flatnonzero(accepted)[:top]:
+                    chosen_rows = (*chosen, start + offset)
+                    entry = (next_values[offset], next(counter), chosen_rows)
+                    if len(best) < top:
+                        heapq.heappush(best, entry)
+                    elif entry[0] > best[0][0]:
+                        heapq.heapreplace(best, entry)
+
+            remaining = max_items - len(chosen) - 1
+            if remaining == 0:
+                return
+
+            expandable = within if monotone else np.ones(len(within), dtype=bool)
+            if len(minimum_columns):
+                expandable = expandable & (
+                    next_totals[:, minimum_columns] + remaining * gains[start:-1]
+                    >= minimum_values
+                ).all(axis=1)
+
+            for offset in np.flatnonzero(expandable):
+                position = start + offset
+                bound = next_values[offset] + max(values[position], 0.0) * remaining
+                if bound <= threshold():
+                    break
+                repeats = 1 + sum(1 for item in chosen if item == position)
+                extend(
+                    position if repeats < max_quantity else position + 1,
+                    (*chosen, position),
+                    next_totals[offset],
+                    next_values[offset],
+                )
+
+        reachable = (max_items * gains[0] >= minimum_values).all()
+        if len(rows) and max_items >= 1 and reachable:
+            extend(0, (), np.zeros(len(NUMERIC_FIELDS)), 0.0)
+
+        meals = []
+        for _, _, chosen in sorted(best, reverse=True):
+            meal_rows, quantities = np.unique(rows[list(chosen)], return_counts=True)
+            meals.append(self._to_meal(meal_rows, quantities.astype(np.float64)))
+        return meals
+
+    def similar(
+        self,
+        names: Sequence[str],
+        limit: int = 5,
+        weights: Mapping[str, float] | None = None,
+        ranges: Sequence[Range] = (),
+    ) -> list[list[tuple[schemas.Product, float]]]:
+        """
+        Finds the nearest products to each of the given products by nutrient
+        profile.
+
+        Distances are weighted Euclidean distances between normalized rows.
+        Queries are handled in chunks, each one matrix product followed by
+        a top-k selection with argpartition.
+
+        Args:
+            names (Sequence[str]): The names of products on the menu.
+            limit (int): The number of neighbours per product.
+            weights (Mapping[str, float] | None): The weight of each field,
+                1 for the fields not given.
+            ranges (Sequence[Range]): Predicates the neighbours must match.
+
+        Returns:
+            list[list[tuple[schemas.Product, float]]]: For each name, up to `limit`
+                other products with their distances, nearest first.
+        """
+        scale = np.ones(len(NUMERIC_FIELDS))
+        for field, weight in (weights or {}).items():
+            scale[NUMERIC_FIELDS.index(field)] = math.sqrt(weight)
+        points = self.normalized * scale
+
+        candidates = np.ones(len(self.names), dtype=bool)
+        for predicate in ranges:
+            column = self.matrix[:, NUMERIC_FIELDS.index(predicate.field)]
+            candidates &= ~np.isnan(column)
+            if predicate.minimum is not None:
+                candidates &= column >= predicate.minimum
+            if predicate.maximum is not None:
+                candidates &= column <= predicate.maximum
+        candidate_rows = np.flatnonzero(candidates)
+        candidate_points = points[candidate_rows]
+        candidate_norms = (candidate_points**2).sum(axis=1)
+
+        query_rows = np.array([self.rows[name] for name in names], dtype=np.intp)
+        count = min(max(limit, 0), len(candidate_rows))
+        neighbours = []
+        for start in range(0, len(query_rows), SIMILARITY_CHUNK_SIZE):
+            chunk = query_rows[start:start + SIMILARITY_CHUNK_SIZE]
+            if count == 0:
+                neighbours.extend([] for _ in chunk)
+                continue
+
+            queries = points[chunk]
+            distances = (
+                (queries**2).sum(axis=1)[:, None]
+                + candidate_norms
+                - 2 * queries @ candidate_points.T
+            )
+            distances[candidate_rows == chunk[:, None]] = np.inf
+
+            # Squared distances rank the same, so only the selected are rooted.
+            nearest = np.argpartition(distances, count - 1, axis=1)[:, :count]
+            nearest_distances = np.sqrt(
+                np.maximum(np.take_along_axis(distances, nearest, axis=1), 0.0)
+            )
+            order = np.lexsort((nearest, nearest_distances), axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            nearest_distances = np.take_along_axis(nearest_distances, order, axis=1)
+
+            for positions, row_distances in zip(nearest, nearest_distances):
+                neighbours.append(
+                    [
+                        (self.products[candidate_rows[position]], float(distance))
+                        for position, distance in zip(positions, row_distances)
+                        if distance != np.inf
+                    ]
+                )
+        return neighbours
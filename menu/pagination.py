@@ -0,0 +1,150 @@
+import base64
+import json
+import math
+from dataclasses import dataclass
+
+ORDERABLE_FIELDS = (
+    "id",
+    "name",
+    "calories",
+    "fats",
+    "carbs",
+    "proteins",
+    "unsaturated_fats",
+    "sugar",
+    "salt",
+    "portion",
+)
+
+
+def parse_order_by(order_by: str) -> tuple[str, bool]:
+    """
+    Parses an ordering such as `calories` or `-calories`.
+
+    Args:
+        order_by (str): The field to order by, prefixed with `-` for descending.
+
+    Returns:
+        tuple[str, bool]: The field name and whether the order is descending.
+
+    Raises:
+        ValueError: If the field cannot be ordered by.
+    """
+    field = order_by.removeprefix("-")
+    if field not in ORDERABLE_FIELDS:
+        raise ValueError(f"Cannot order by {field!r}")
+    return field, order_by.startswith("-")
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Position after the last product of a page in a given ordering.
+
+    Products are ordered by the field and then by id, with NULLs first in
+    ascending and last in descending order, as SQLite sorts them.
+
+    Attributes:
+        order_by (str): The ordering the cursor belongs to.
+        value (str | float | int | None): The ordered field of the last product.
+        id (int): The id of the last product.
+    """
+
+    order_by: str
+    value: str | float | int | None
+    id: int
+
+    @property
+    def sort_key(self) -> tuple:
+        """
+        Returns:
+            tuple: The key of the position in ascending order.
+        """
+        return sort_key(self.value, self.id)
+
+    def encode(self) -> str:
+        """
+        Encodes the cursor into an opaque token.
+
+        Returns:
+            str: The URL-safe token.
+        """
+        payload = json.dumps([self.order_by, self.value, self.id]).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        """
+        Decodes a token produced by `encode`.
+
+        Args:
+            token (str): The token.
+
+        Returns:
+            Cursor: The decoded cursor.
+
+        Raises:
+            ValueError: If the token is malformed.
+        """
+        try:
+            payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            order_by, value, product_id = json.loads(payload)
+        except (TypeError, ValueError) as error:
+            raise ValueError("Invalid cursor") from error
+        if not isinstance(order_by, str):
+            raise ValueError("Invalid cursor")
+        try:
+            field, _ = parse_order_by(order_by)
+        except ValueError as error:
+            raise ValueError("Invalid cursor") from error
+
+        if field == "name":
+            valid_value = value is None or isinstance(value, str)
+        else:
+            valid_value = value is None or _is_number(value) and math.isfinite(value)
+        valid_id = _is_number(product_id) and isinstance(product_id, int)
+        if not valid_value or not valid_id:
+            raise ValueError("Invalid cursor")
+        return cls(order_by=order_by, value=value, id=product_id)
+
+    @classmethod
+    def after(cls, order_by: str, product) -> "Cursor":
+        """
+        Builds the cursor pointing after a product.
+
+        Args:
+            order_by (str): The ordering of the page.
+            product: The last product of the page.
+
+        Returns:
+            Cursor: The cursor of the next page.
+        """
+        field, _ = parse_order_by(order_by)
+        return cls(order_by=order_by, value=getattr(product, field), id=product.id)
+
+
+def _is_number(value: object) -> bool:
+    """
+    Checks whether a decoded JSON value is a number, booleans excluded.
+
+    Args:
+        value (object): The value.
+
+    Returns:
+        bool: True for integers and floats.
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def sort_key(value: str | float | int | None, product_id: int) -> tuple:
+    """
+    Builds the ascending sort key of a product, with NULLs first.
+
+    Args:
+        value (str | float | int | None): The ordered field of the product.
+        product_id (int): The id of the product.
+
+    Returns:
+        tuple: The sort key.
+    """
+    return (value is not None, 0 if value is None else value, product_id)
@@ -0,0 +1,241 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024
+
+
+def compress(body: bytes) -> dict[str, bytes]:
+    """
+    Builds the compressed variants of a body.
+
+    Brotli is used only when the `brotli` package is installed.
+
+    Args:
+        body (bytes): The body to compress.
+
+    Returns:
+        dict[str, bytes]: The compressed bodies keyed by content coding, empty
+            for bodies too small to be worth compressing.
+    """
+    if len(body) < COMPRESS_MIN_SIZE:
+        return {}
+
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body)
+    return variants
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """
+    Parses an Accept-Encoding header.
+
+    Args:
+        header (str): The header value, e.g. `gzip, br;q=0.8`.
+
+    Returns:
+        dict[str, float]: The quality of each listed coding.
+    """
+    qualities = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            qualities[coding.strip().lower()] = quality
+    return qualities
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """
+    A JSON response body serialized and compressed once, with strong ETags.
+
+    Attributes:
+        body (bytes): The serialized JSON body.
+        etag (str): The quoted ETag computed from the body.
+        headers (dict[str, str]): Extra headers sent with the body.
+        encodings (dict[str, bytes]): Compressed variants keyed by content coding.
+    """
+
+    body: bytes
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def from_content(
+        cls, content: Any, headers: dict[str, str] | None = None
+    ) -> "CachedResponse":
+        """
+        Serializes content with orjson and builds its compressed variants.
+
+        Args:
+            content (Any): JSON-compatible data, pydantic models included.
+            headers (dict[str, str] | None): Extra headers sent with the body.
+
+        Returns:
+            CachedResponse: The serialized response.
+        """
+        body = orjson.dumps(content, default=_dump_model)
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        return cls(
+            body=body, etag=etag, headers=headers or {}, encodings=compress(body)
+        )
+
+    def get_etag(self, encoding: str | None) -> str:
+        """
+        Returns the ETag of a variant; each coding has its own strong ETag.
+
+        Args:
+            encoding (str | None): The content coding, or None for the plain body.
+
+        Returns:
+            str: The quoted ETag.
+        """
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+    def choose_encoding(self, request: Request) -> str | None:
+        """
+        Chooses the best variant the client accepts, preferring brotli.
+
+        Args:
+            request (Request): The request with an optional Accept-Encoding header.
+
+        Returns:
+            str | None: The content coding, or None for the plain body.
+        """
+        if not self.encodings:
+            return None
+
+        qualities = parse_accept_encoding(request.headers.get("accept-encoding", ""))
+        best, best_quality = None, 0.0
+        for encoding in ("br", "gzip"):
+            quality = qualities.get(encoding, qualities.get("*", 0.0))
+            if encoding in self.encodings and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def matches(self, request: Request) -> bool:
+        """
+        Checks whether the client already has this response.
+
+        Args:
+            request (Request): The request with an optional If-None-Match header.
+
+        Returns:
+            bool: True if the request's If-None-Match lists an ETag of any variant.
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        etags = {self.get_etag(None), *map(self.get_etag, self.encodings)}
+        return "*" in tags or not tags.isdisjoint(etags)
+
+    def to_response(self, request: Request, max_age: int) -> Response:
+        """
+        Builds the response for a request, answering 304 to a matching ETag.
+
+        Args:
+            request (Request): The request being answered.
+            max_age (int): The max-age of the Cache-Control header in seconds.
+
+        Returns:
+            Response: A 304 response or the JSON body in the chosen coding.
+        """
+        encoding = self.choose_encoding(request)
+        headers = {
+            **self.headers,
+            "ETag": self.get_etag(encoding),
+            "Cache-Control": f"public, max-age={max_age}",
+        }
+        if self.encodings:
+            headers["Vary"] = "Accept-Encoding"
+        if self.matches(request):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            return Response(
+                content=self.encodings[encoding],
+                media_type="application/json",
+                headers=headers,
+            )
+        return Response(
+            content=self.body, media_type="application/json", headers=headers
+        )
+
+
+def _dump_model(value: Any) -> Any:
+    """
+    Converts values orjson cannot serialize natively.
+
+    Args:
+        value (Any): The value to convert.
+
+    Returns:
+        Any: A JSON-compatible value.
+
+    Raises:
+        TypeError: If the value is not supported.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized responses.
+
+    A cache belongs to one menu snapshot, so it never holds stale data.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """
+        Initializes a ResponseCache instance.
+
+        Args:
+            max_size (int): The maximum number of cached responses.
+        """
+        self.max_size = max_size
+        self._responses: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+
+    def get(
+        self, key: Hashable, build: Callable[[], CachedResponse]
+    ) -> CachedResponse:
+        """
+        Returns the cached response for a key, building it on a miss.
+
+        Args:
+            key (Hashable): The key of the response, e.g. route and parameters.
+            build (Callable[[], CachedResponse]): Builds the response on a miss.
+
+        Returns:
+            CachedResponse: The cached response.
+        """
+        if (response := self._responses.get(key)) is not None:
+            self._responses.move_to_end(key)
+            return response
+
+        response = build()
+        self._responses[key] = response
+        if len(self._responses) > self.max_size:
+            self._responses.popitem(last=False)
+        return response
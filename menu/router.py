@@ -1,67 +1,395 @@
 from typing import Sequence
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.engine import get_db
-from menu import schemas
-from menu.crud import get_all_products, get_single_product
+from database.engine import get_read_db
+from menu import config, models, schemas
+from menu.crud import (
+    coalesced,
+    get_all_products,
+    get_menu,
+    get_products_by_names,
+    get_single_product,
+    get_product_history,
+    get_single_product_field,
+    search_products,
+)
+from menu.export import EXPORT_MEDIA_TYPES, export_products, iter_product_rows
+from menu.lookup import TrigramIndex
+from menu.nutrition import Bound, NutrientMatrix, SearchLimitExceeded, parse_weights
+from menu.pagination import Cursor, parse_order_by
+from menu.responses import CachedResponse
+from menu.search import NUMERIC_FIELDS, Range, parse_ranges, parse_sort_by
+from menu.snapshot import (
+    MenuSnapshot,
+    get_snapshot,
+    get_snapshot_as_of,
+    parse_as_of,
+)
 
 router = APIRouter()
 
+SUGGESTIONS_LIMIT = 5
+
+
+def get_market(market: str = config.DEFAULT_MARKET) -> str:
+    """
+    Reads the market of a request from the `market` query parameter.
+
+    Args:
+        market (str, optional): The market code. Defaults to the first
+            configured market.
+
+    Returns:
+        str: The market code.
+
+    Raises:
+        HTTPException: If the market is not configured.
+    """
+    if market not in config.MARKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown market: {market}")
+    return market
+
+
+async def get_market_snapshot(
+    market: str = Depends(get_market), as_of: str | None = None
+) -> MenuSnapshot | None:
+    """
+    Returns the menu snapshot of the requested market.
+
+    With `as_of`, the menu as it was at a past version is served from a
+    snapshot rebuilt from the menu history, whether snapshots are enabled or not.
+
+    Args:
+        market (str, optional): Market dependency.
+        as_of (str | None, optional): A menu version number, or an ISO 8601
+            time for the version current at that time. Defaults to the
+            current menu.
+
+    Returns:
+        MenuSnapshot | None: The snapshot, or None if snapshots are disabled or
+            not built yet.
+
+    Raises:
+        HTTPException: If `as_of` is invalid or there is no such version.
+    """
+    if as_of is None:
+        return get_snapshot(market)
+
+    try:
+        snapshot = await get_snapshot_as_of(market, parse_as_of(as_of))
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No menu version as of {as_of}")
+    return snapshot
+
+
+async def get_name_index(
+    snapshot: MenuSnapshot | None, db: AsyncSession, market: str
+) -> TrigramIndex:
+    """
+    Returns the fuzzy name index of the snapshot, or builds one from the database.
+
+    Args:
+        snapshot (MenuSnapshot | None): The current menu snapshot.
+        db (AsyncSession): The database session, used without a snapshot.
+        market (str): The market code.
+
+    Returns:
+        TrigramIndex: The index over all products of the market.
+    """
+    if snapshot is not None:
+        return snapshot.name_index
+
+    return TrigramIndex(
+        [
+            schemas.Product.model_validate(product)
+            for product in await get_menu(db, market)
+        ]
+    )
+
+
+async def get_nutrient_matrix(
+    snapshot: MenuSnapshot | None, db: AsyncSession, market: str
+) -> NutrientMatrix:
+    """
+    Returns the nutrient matrix of the snapshot, or builds one from the database.
+
+    Args:
+        snapshot (MenuSnapshot | None): The current menu snapshot.
+        db (AsyncSession): The database session, used without a snapshot.
+        market (str): The market code.
+
+    Returns:
+        NutrientMatrix: The matrix over all products of the market.
+    """
+    if snapshot is not None:
+        return snapshot.nutrients
+
+    return NutrientMatrix(
+        [
+            schemas.Product.model_validate(product)
+            for product in await get_menu(db, market)
+        ]
+    )
+
+
+def get_next_cursor_headers(
+    products: Sequence[schemas.Product], order_by: str, limit: int
+) -> dict[str, str]:
+    """
+    Builds the header with the cursor of the next page.
+
+    Args:
+        products (Sequence[schemas.Product]): The products of the current page.
+        order_by (str): The ordering of the page.
+        limit (int): The requested page size.
+
+    Returns:
+        dict[str, str]: The `X-Next-Cursor` header if the page is full.
+    """
+    if products and len(products) == limit:
+        return {"X-Next-Cursor": Cursor.after(order_by, products[-1]).encode()}
+    return {}
+
 
 @router.get("/all_products/", response_model=list[schemas.Product])
 async def read_products(
-    skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)
-) -> Sequence[schemas.Product]:
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(default=10, ge=1),
+    order_by: str | None = None,
+    cursor: str | None = None,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> Sequence[schemas.Product] | Response:
     """
     Retrieves a paginated list of products.
 
+    When the page is full, the `X-Next-Cursor` header holds the cursor of the
+    next page. Pages served from the snapshot are serialized once per menu
+    version and carry an ETag, so conditional requests can be answered with 304.
+
     Args:
+        request (Request): The request, used for conditional requests.
+        response (Response): The response, used to set the next cursor header.
         skip (int, optional): Number of records to skip. Defaults to 0.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
-        db (AsyncSession, optional): Database session dependency.
+        order_by (str | None, optional): Field to order by, prefixed with `-`
+            for descending order. Defaults to the ordering of the cursor or `id`.
+        cursor (str | None, optional): Cursor returned with the previous page.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
 
     Returns:
-        Sequence[schemas.Product]: A list of product schemas.
+        Sequence[schemas.Product] | Response: A list of product schemas.
+
+    Raises:
+        HTTPException: If the ordering or the cursor is invalid.
     """
-    return await get_all_products(db=db, skip=skip, limit=limit)
+    try:
+        page_cursor = Cursor.decode(cursor) if cursor else None
+        order_by = order_by or (page_cursor.order_by if page_cursor else "id")
+        parse_order_by(order_by)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    if page_cursor is not None and page_cursor.order_by != order_by:
+        raise HTTPException(status_code=400, detail="Cursor belongs to another order")
+
+    if snapshot is not None:
+
+        def build_page() -> CachedResponse:
+            products = snapshot.get_all_products(
+                skip=skip, limit=limit, order_by=order_by, cursor=page_cursor
+            )
+            return CachedResponse.from_content(
+                products, headers=get_next_cursor_headers(products, order_by, limit)
+            )
+
+        cached = snapshot.responses.get(
+            ("all_products", skip, limit, order_by, cursor), build_page
+        )
+        return cached.to_response(request, max_age=config.CACHE_MAX_AGE)
+
+    products = await get_all_products(
+        db=db,
+        market=market,
+        skip=skip,
+        limit=limit,
+        order_by=order_by,
+        cursor=page_cursor,
+    )
+
+    response.headers.update(get_next_cursor_headers(products, order_by, limit))
+    return products
 
 
 @router.get("/product/{product_name}/", response_model=schemas.Product)
 async def read_single_product(
-    product_name: str, db: AsyncSession = Depends(get_db)
-) -> schemas.Product:
+    request: Request,
+    product_name: str,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> schemas.Product | Response:
     """
     Retrieves a single product by name.
 
+    Products served from the snapshot are serialized once per menu version and
+    carry an ETag, so conditional requests can be answered with 304. Without a
+    snapshot, concurrent lookups of the same name share one query.
+
     Args:
+        request (Request): The request, used for conditional requests.
         product_name (str): The name of the product to retrieve.
-        db (AsyncSession, optional): Database session dependency.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried for suggestions without a snapshot.
+
+    Returns:
+        schemas.Product | Response: The product schema, or a 404 response
+            with the closest product names as `suggestions` if it is not found.
+    """
+    if snapshot is not None:
+        if product := snapshot.get_single_product(product_name):
+            cached = snapshot.responses.get(
+                ("product", product_name),
+                lambda: CachedResponse.from_content(product),
+            )
+            return cached.to_response(request, max_age=config.CACHE_MAX_AGE)
+    elif product := await coalesced(get_single_product, market, product_name):
+        return product
+
+    name_index = await get_name_index(snapshot, db, market)
+    suggestions = name_index.search(product_name, limit=SUGGESTIONS_LIMIT)
+    return JSONResponse(
+        {
+            "detail": "Product not found",
+            "suggestions": [suggestion.name for suggestion in suggestions],
+        },
+        status_code=404,
+    )
+
+
+@router.get(
+    "/product/{product_name}/similar", response_model=list[schemas.SimilarProduct]
+)
+async def read_similar_products(
+    request: Request,
+    product_name: str,
+    limit: int = Query(default=5, ge=1, le=50),
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> list[schemas.SimilarProduct]:
+    """
+    Retrieves the products with the nutrient profiles closest to a product.
+
+    Fields can be weighted with `<field>_weight` query parameters and the
+    neighbours filtered with `<field>_min` / `<field>_max` ones, e.g.
+    `?sugar_weight=3&sugar_max=10` for something similar with less sugar.
+
+    Args:
+        request (Request): The request, used to read the weights and ranges.
+        product_name (str): The name of the product.
+        limit (int, optional): The number of neighbours to return. Defaults to 5.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
 
     Returns:
-        schemas.Product: The product schema.
+        list[schemas.SimilarProduct]: The nearest products, nearest first.
 
     Raises:
-        HTTPException: If the product is not found.
+        HTTPException: If the product is not found or a weight or range is
+            invalid.
     """
-    if product := await get_single_product(db=db, product_name=product_name):
-        return product
+    try:
+        params = request.query_params.multi_items()
+        weights = parse_weights(params)
+        ranges = parse_ranges(params)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    nutrients = await get_nutrient_matrix(snapshot, db, market)
+    if product_name not in nutrients.rows:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    [neighbours] = nutrients.similar(
+        [product_name], limit=limit, weights=weights, ranges=ranges
+    )
+    return [
+        schemas.SimilarProduct(**product.model_dump(), distance=distance)
+        for product, distance in neighbours
+    ]
+
+
+@router.get(
+    "/product/{product_name}/history", response_model=list[schemas.ProductVersion]
+)
+async def read_product_history(
+    product_name: str,
+    market: str = Depends(get_market),
+    db: AsyncSession = Depends(get_read_db),
+) -> list[schemas.ProductVersion]:
+    """
+    Retrieves the changes of a product over all menu versions, oldest first.
 
-    raise HTTPException(status_code=404, detail="Product not found")
+    Args:
+        product_name (str): The name of the product.
+        market (str, optional): Market dependency, see `get_market`.
+        db (AsyncSession, optional): Read-only database session dependency.
+
+    Returns:
+        list[schemas.ProductVersion]: The versions that added, changed or
+            removed the product.
+
+    Raises:
+        HTTPException: If the product has no history.
+    """
+    history = await get_product_history(db, market, product_name)
+    if not history:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    return [
+        schemas.ProductVersion(
+            version=version,
+            imported_at=imported_at,
+            changes=fields or {},
+            removed=fields is None,
+        )
+        for version, imported_at, fields in history
+    ]
 
 
 @router.get("/product/{product_name}/{product_field}/")
 async def read_single_product_field(
-    product_name: str, product_field: str, db: AsyncSession = Depends(get_db)
+    product_name: str,
+    product_field: str,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
 ) -> dict:
     """
     Retrieves a specific field of a single product by name.
 
+    Without a snapshot, concurrent lookups of the same field share one query.
+
     Args:
         product_name (str): The name of the product to retrieve.
         product_field (str): The field of the product to retrieve.
-        db (AsyncSession, optional): Database session dependency.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
 
     Returns:
         dict: A dictionary containing the requested field and its value.
@@ -69,8 +397,380 @@ async def read_single_product_field(
     Raises:
         HTTPException: If the product or the field is not found.
     """
-    if product := await get_single_product(db=db, product_name=product_name):
-        if hasattr(product, product_field):
-            return {product_field: getattr(product, product_field)}
+    if snapshot is not None:
+        product = snapshot.get_single_product(product_name)
+        found = product is not None
+        value = getattr(product, product_field, None)
+    else:
+        found, value = await coalesced(
+            get_single_product_field,
+            market,
+            product_name,
+            product_field if product_field in models.PRODUCT_COLUMNS else "id",
+        )
+
+    if not found:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if product_field not in models.PRODUCT_COLUMNS:
         raise HTTPException(status_code=404, detail="Field not found")
-    raise HTTPException(status_code=404, detail="Product not found")
+    return {product_field: value}
+
+
+@router.post("/products/batch", response_model=schemas.ProductBatchResponse)
+async def read_products_batch(
+    batch: schemas.ProductBatchRequest,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> schemas.ProductBatchResponse:
+    """
+    Retrieves several products by name at once.
+
+    Args:
+        batch (schemas.ProductBatchRequest): The names and the fields to return.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
+
+    Returns:
+        schemas.ProductBatchResponse: The found products in the order of the
+            requested names and the names that were not found.
+
+    Raises:
+        HTTPException: If a requested field does not exist.
+    """
+    fields = batch.fields or models.PRODUCT_COLUMNS
+    if unknown_fields := set(fields).difference(models.PRODUCT_COLUMNS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}",
+        )
+
+    names = list(dict.fromkeys(batch.names))
+    if snapshot is not None:
+        products = snapshot.get_products_by_names(names, fields)
+    else:
+        found = {
+            product["name"]: product
+            for product in await get_products_by_names(db, market, names, fields)
+        }
+        products = [found[name] for name in names if name in found]
+
+    found_names = {product["name"] for product in products}
+    return schemas.ProductBatchResponse(
+        products=products,
+        not_found=[name for name in names if name not in found_names],
+    )
+
+
+@router.post("/products/similar", response_model=schemas.SimilarProductsResponse)
+async def read_similar_products_batch(
+    query: schemas.SimilarProductsRequest,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> schemas.SimilarProductsResponse:
+    """
+    Retrieves the nearest products of many products at once, e.g. of the whole
+    menu for a recommendation export.
+
+    Args:
+        query (schemas.SimilarProductsRequest): The names, weights and bounds.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
+
+    Returns:
+        schemas.SimilarProductsResponse: The neighbours of each found product
+            and the names that were not found.
+
+    Raises:
+        HTTPException: If a weight or bound is invalid.
+    """
+    if unknown_fields := {*query.weights, *query.constraints}.difference(
+        NUMERIC_FIELDS
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}",
+        )
+    if any(weight < 0 for weight in query.weights.values()):
+        raise HTTPException(status_code=400, detail="Weights must be non-negative")
+
+    nutrients = await get_nutrient_matrix(snapshot, db, market)
+    names = list(dict.fromkeys(nutrients.names if query.names is None else query.names))
+    found = [name for name in names if name in nutrients.rows]
+    neighbours = nutrients.similar(
+        found,
+        limit=query.limit,
+        weights=query.weights,
+        ranges=[
+            Range(field=field, minimum=bound.min, maximum=bound.max)
+            for field, bound in query.constraints.items()
+        ],
+    )
+    return schemas.SimilarProductsResponse(
+        similar={
+            name: [
+                schemas.SimilarProduct(**product.model_dump(), distance=distance)
+                for product, distance in products
+            ]
+            for name, products in zip(found, neighbours)
+        },
+        not_found=[name for name in names if name not in nutrients.rows],
+    )
+
+
+@router.get("/products/search", response_model=list[schemas.Product])
+async def read_products_in_ranges(
+    request: Request,
+    sort_by: str | None = None,
+    limit: int = Query(default=10, ge=1),
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> Sequence[schemas.Product]:
+    """
+    Retrieves products whose nutrients lie in the given ranges.
+
+    Ranges are given as `<field>_min` and `<field>_max` query parameters over
+    any numeric field, e.g. `?calories_min=200&calories_max=400&proteins_min=20`.
+    Products with a NULL value never match a range on that field.
+
+    Args:
+        request (Request): The request, used to read the range parameters.
+        sort_by (str | None, optional): Numeric field to sort by, prefixed with
+            `-` for descending order. NULLs are sorted last. Defaults to id order.
+        limit (int, optional): Maximum number of records to return. Defaults to 10.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
+
+    Returns:
+        Sequence[schemas.Product]: A list of product schemas.
+
+    Raises:
+        HTTPException: If a range or the sort field is invalid.
+    """
+    try:
+        ranges = parse_ranges(request.query_params.multi_items())
+        if sort_by:
+            parse_sort_by(sort_by)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    if snapshot is not None:
+        return snapshot.nutrient_index.search(ranges, sort_by=sort_by, limit=limit)
+
+    return await search_products(
+        db=db, market=market, ranges=ranges, sort_by=sort_by, limit=limit
+    )
+
+
+@router.get("/products/lookup", response_model=list[schemas.Product])
+async def lookup_products(
+    q: str,
+    limit: int = Query(default=10, ge=1, le=100),
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> Sequence[schemas.Product]:
+    """
+    Retrieves the products best matching a text, tolerating case and typos.
+
+    Args:
+        q (str): The text to look up, e.g. the beginning of a product name.
+        limit (int, optional): Maximum number of records to return, at most
+            100. Defaults to 10.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
+
+    Returns:
+        Sequence[schemas.Product]: The matching product schemas, best first.
+    """
+    name_index = await get_name_index(snapshot, db, market)
+    return name_index.search(q, limit=limit)
+
+
+@router.get("/menu", response_model=list[schemas.Product])
+async def read_menu(
+    request: Request,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> Sequence[schemas.Product] | Response:
+    """
+    Retrieves the whole menu at once.
+
+    From the snapshot, the menu is served pre-serialized and, depending on
+    Accept-Encoding, pre-compressed.
+
+    Args:
+        request (Request): The request, used for content negotiation.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
+
+    Returns:
+        Sequence[schemas.Product] | Response: All product schemas in id order.
+    """
+    if snapshot is not None:
+        return snapshot.menu_response.to_response(
+            request, max_age=config.CACHE_MAX_AGE
+        )
+
+    return await get_menu(db, market)
+
+
+@router.get("/export")
+async def export_menu(
+    export_format: str = Query(default="ndjson", alias="format"),
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+) -> StreamingResponse:
+    """
+    Streams the whole menu as NDJSON, CSV or a JSON array.
+
+    Rows are read and encoded in batches while the response is sent, so the
+    memory use does not grow with the size of the menu.
+
+    Args:
+        export_format (str, optional): `ndjson`, `csv` or `json`, given as the
+            `format` query parameter. Defaults to `ndjson`.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+
+    Returns:
+        StreamingResponse: The products in id order.
+
+    Raises:
+        HTTPException: If the format is not supported.
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format: {export_format}",
+        )
+
+    return StreamingResponse(
+        export_products(iter_product_rows(snapshot, market), export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="menu.{market}.{export_format}"'
+            )
+        },
+    )
+
+
+@router.post("/meals/totals", response_model=schemas.MealTotalsResponse)
+async def read_meal_totals(
+    order: schemas.MealTotalsRequest,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> schemas.MealTotalsResponse:
+    """
+    Sums the nutrients of an order.
+
+    Args:
+        order (schemas.MealTotalsRequest): The products and their quantities.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
+
+    Returns:
+        schemas.MealTotalsResponse: The totals and the names not on the menu.
+    """
+    quantities: dict[str, int] = {}
+    for item in order.items:
+        quantities[item.name] = quantities.get(item.name, 0) + item.quantity
+
+    nutrients = await get_nutrient_matrix(snapshot, db, market)
+    meal, not_found = nutrients.get_totals(quantities)
+    return schemas.MealTotalsResponse(
+        items=[
+            schemas.MealItem(name=name, quantity=quantity)
+            for name, quantity in meal.items
+        ],
+        totals=meal.totals,
+        incomplete=list(meal.incomplete),
+        not_found=not_found,
+    )
+
+
+@router.post("/meals/optimize", response_model=list[schemas.Meal])
+async def optimize_meal(
+    query: schemas.MealOptimizeRequest,
+    market: str = Depends(get_market),
+    snapshot: MenuSnapshot | None = Depends(get_market_snapshot),
+    db: AsyncSession = Depends(get_read_db),
+) -> list[schemas.Meal]:
+    """
+    Finds the best meals under bounds on their nutrient totals, e.g. maximum
+    proteins with at most 700 kcal and 2 g of salt.
+
+    The search runs in a worker thread, and is rejected once it exceeds the
+    configured number of branches or duration.
+
+    Args:
+        query (schemas.MealOptimizeRequest): The objective, bounds and limits.
+        market (str, optional): Market dependency, see `get_market`.
+        snapshot (MenuSnapshot | None, optional): Menu snapshot dependency.
+        db (AsyncSession, optional): Read-only database session dependency,
+            only queried without a snapshot.
+
+    Returns:
+        list[schemas.Meal]: The best meals first.
+
+    Raises:
+        HTTPException: If the objective or a bounded field is not numeric, or
+            with status code 422 if the search exceeds its limits.
+    """
+    if unknown_fields := {query.objective, *query.constraints}.difference(
+        NUMERIC_FIELDS
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}",
+        )
+
+    nutrients = await get_nutrient_matrix(snapshot, db, market)
+    try:
+        meals = await run_in_threadpool(
+            nutrients.optimize,
+            objective=query.objective,
+            maximize=query.maximize,
+            bounds=[
+                Bound(field=field, minimum=bound.min, maximum=bound.max)
+                for field, bound in query.constraints.items()
+            ],
+            max_items=query.max_items,
+            min_items=query.min_items,
+            max_quantity=query.max_quantity,
+            top=query.top,
+            max_nodes=config.OPTIMIZE_MAX_NODES,
+            timeout=config.OPTIMIZE_TIMEOUT,
+        )
+    except SearchLimitExceeded as error:
+        raise HTTPException(
+            status_code=422, detail=f"{error}, narrow the constraints"
+        ) from None
+    return [
+        schemas.Meal(
+            items=[
+                schemas.MealItem(name=name, quantity=quantity)
+                for name, quantity in meal.items
+            ],
+            totals=meal.totals,
+            incomplete=list(meal.incomplete),
+        )
+        for meal in meals
+    ]
@@ -1,6 +1,7 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ProductBase(BaseModel):
@@ -34,12 +35,191 @@ class ProductBase(BaseModel):
 
 class Product(ProductBase):
     """
-    Schema for product data including ID.
+    Schema for product data including ID and market.
 
     Inherits from ProductBase.
     """
 
     id: int
+    market: str
 
     class Config:
         from_attributes = True
+
+
+class ProductVersion(BaseModel):
+    """
+    Schema for the change of a product in a menu version.
+
+    Attributes:
+        version (int): The menu version.
+        imported_at (datetime): When the version was imported.
+        changes (dict[str, Any]): The new values of the fields that changed,
+            all fields for the version that added the product.
+        removed (bool): Whether the product was removed from the menu.
+    """
+
+    version: int
+    imported_at: datetime
+    changes: dict[str, Any]
+    removed: bool
+
+
+class ProductBatchRequest(BaseModel):
+    """
+    Schema for a batch product lookup.
+
+    Attributes:
+        names (list[str]): The names of the products to retrieve.
+        fields (Optional[list[str]]): The fields to return for each product.
+            All fields are returned if omitted.
+    """
+
+    names: list[str] = Field(max_length=100)
+    fields: Optional[list[str]] = None
+
+
+class ProductBatchResponse(BaseModel):
+    """
+    Schema for the result of a batch product lookup.
+
+    Attributes:
+        products (list[dict[str, Any]]): The requested fields of each found
+            product, in the order of the requested names.
+        not_found (list[str]): The requested names without a product.
+    """
+
+    products: list[dict[str, Any]]
+    not_found: list[str]
+
+
+class MealItem(BaseModel):
+    """
+    Schema for a product in a meal.
+
+    Attributes:
+        name (str): The name of the product.
+        quantity (int): How many times the product is in the meal.
+    """
+
+    name: str
+    quantity: int = Field(default=1, ge=1)
+
+
+class MealTotalsRequest(BaseModel):
+    """
+    Schema for an order whose nutrients are summed.
+
+    Attributes:
+        items (list[MealItem]): The products of the order.
+    """
+
+    items: list[MealItem] = Field(max_length=100)
+
+
+class Meal(BaseModel):
+    """
+    Schema for a meal with its nutrient totals.
+
+    Attributes:
+        items (list[MealItem]): The products of the meal.
+        totals (dict[str, float]): The total of each numeric field.
+        incomplete (list[str]): Fields unknown for some product, whose totals
+            only cover the products where they are known.
+    """
+
+    items: list[MealItem]
+    totals: dict[str, float]
+    incomplete: list[str]
+
+
+class MealTotalsResponse(Meal):
+    """
+    Schema for the nutrient totals of an order.
+
+    Attributes:
+        not_found (list[str]): The ordered names without a product.
+    """
+
+    not_found: list[str]
+
+
+class NutrientBound(BaseModel):
+    """
+    Schema for an inclusive bound on a nutrient total.
+
+    Attributes:
+        min (Optional[float]): The lower bound.
+        max (Optional[float]): The upper bound.
+    """
+
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class MealOptimizeRequest(BaseModel):
+    """
+    Schema for a meal optimization query.
+
+    Attributes:
+        objective (str): The numeric field to optimize.
+        maximize (bool): Whether to maximize or minimize the objective.
+        constraints (dict[str, NutrientBound]): Bounds on the meal totals by field.
+        max_items (int): The maximum number of products in a meal.
+        min_items (int): The minimum number of products in a meal.
+        max_quantity (int): How many times one product can be taken.
+        top (int): The number of meals to return.
+    """
+
+    objective: str
+    maximize: bool = True
+    constraints: dict[str, NutrientBound] = Field(default_factory=dict)
+    max_items: int = Field(default=3, ge=1, le=6)
+    min_items: int = Field(default=1, ge=1)
+    max_quantity: int = Field(default=1, ge=1, le=5)
+    top: int = Field(default=5, ge=1, le=50)
+
+
+class SimilarProduct(Product):
+    """
+    Schema for a product similar to another one.
+
+    Attributes:
+        distance (float): The weighted distance between the normalized nutrient
+            profiles of both products.
+    """
+
+    distance: float
+
+
+class SimilarProductsRequest(BaseModel):
+    """
+    Schema for a batch similar product query.
+
+    Attributes:
+        names (Optional[list[str]]): The names of the products to find neighbours
+            for. The whole menu is used if omitted.
+        limit (int): The number of neighbours per product.
+        weights (dict[str, float]): The weight of each numeric field, 1 for the
+            fields not given.
+        constraints (dict[str, NutrientBound]): Bounds the neighbours must match.
+    """
+
+    names: Optional[list[str]] = None
+    limit: int = Field(default=5, ge=1, le=50)
+    weights: dict[str, float] = Field(default_factory=dict)
+    constraints: dict[str, NutrientBound] = Field(default_factory=dict)
+
+
+class SimilarProductsResponse(BaseModel):
+    """
+    Schema for the result of a batch similar product query.
+
+    Attributes:
+        similar (dict[str, list[SimilarProduct]]): The neighbours of each found
+            product, nearest first.
+        not_found (list[str]): The requested names that were not found.
+    """
+
+    similar: dict[str, list[SimilarProduct]]
+    not_found: list[str]
@@ -0,0 +1,242 @@
+import math
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from menu import schemas
+
+NUMERIC_FIELDS = (
+    "calories",
+    "fats",
+    "carbs",
+    "proteins",
+    "unsaturated_fats",
+    "sugar",
+    "salt",
+    "portion",
+)
+
+
+@dataclass(frozen=True)
+class Range:
+    """
+    Inclusive range predicate over a numeric product field.
+
+    Products whose field is NULL never match a range.
+
+    Attributes:
+        field (str): The numeric field to filter on.
+        minimum (float | None): The lower bound, or None for no bound.
+        maximum (float | None): The upper bound, or None for no bound.
+    """
+
+    field: str
+    minimum: float | None = None
+    maximum: float | None = None
+
+    def matches(self, value: float | None) -> bool:
+        """
+        Checks whether a value lies in the range.
+
+        Args:
+            value (float | None): The value of the field.
+
+        Returns:
+            bool: True if the value is not NULL and within the bounds.
+        """
+        return (
+            value is not None
+            and (self.minimum is None or value >= self.minimum)
+            and (self.maximum is None or value <= self.maximum)
+        )
+
+
+def parse_ranges(params: Iterable[tuple[str, str]]) -> list[Range]:
+    """
+    Builds range predicates from `<field>_min` / `<field>_max` query parameters.
+
+    Other parameters are ignored.
+
+    Args:
+        params (Iterable[tuple[str, str]]): The query parameters.
+
+    Returns:
+        list[Range]: One range per filtered field.
+
+    Raises:
+        ValueError: If a bound names an unknown field or is not a number.
+    """
+    bounds: dict[str, dict[str, float]] = {}
+    for key, value in params:
+        field, _, bound = key.rpartition("_")
+        if bound not in ("min", "max") or not field:
+            continue
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"Cannot filter by {field!r}")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"{key} must be a number") from None
+        if math.isnan(number):
+            raise ValueError(f"{key} must be a number")
+        bounds.setdefault(field, {})["minimum" if bound == "min" else "maximum"] = number
+
+    return [Range(field=field, **limits) for field, limits in bounds.items()]
+
+
+def parse_sort_by(sort_by: str) -> tuple[str, bool]:
+    """
+    Parses a sort order such as `sugar` or `-sugar`.
+
+    Args:
+        sort_by (str): The field to sort by, prefixed with `-` for descending.
+
+    Returns:
+        tuple[str, bool]: The field name and whether the order is descending.
+
+    Raises:
+        ValueError: If the field is not numeric.
+    """
+    field = sort_by.removeprefix("-")
+    if field not in NUMERIC_FIELDS:
+        raise ValueError(f"Cannot sort by {field!r}")
+    return field, sort_by.startswith("-")
+
+
+class NutrientIndex:
+    """
+    Sorted per-field indexes over the numeric fields of a menu.
+
+    Each index holds the positions of the products whose field is not NULL,
+    sorted by value and then position, next to their values, so a range lookup
+    costs O(log n + k). The index of a field is built with NumPy on first use.
+    """
+
+    def __init__(self, products: Sequence[schemas.Product], matrix: np.ndarray) -> None:
+        """
+        Initializes the indexes.
+
+        Args:
+            products (Sequence[schemas.Product]): The products in id order.
+            matrix (np.ndarray): The (products x NUMERIC_FIELDS) values, NULLs
+                as NaN.
+        """
+        self._products = products
+        self._matrix = matrix
+        self._columns: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._orderings: dict[tuple[str, bool], np.ndarray] = {}
+
+    def _column(self, field: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the index of a field, building it on first use.
+
+        Args:
+            field (str): The numeric field.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The non-NULL values in ascending
+                order and the positions of their products.
+        """
+        if field not in self._columns:
+            values = self._matrix[:, NUMERIC_FIELDS.index(field)]
+            positions = np.flatnonzero(~np.isnan(values))
+            positions = positions[np.argsort(values[positions], kind="stable")]
+            self._columns[field] = (values[positions], positions)
+        return self._columns[field]
+
+    def _bounds(self, predicate: Range) -> tuple[int, int]:
+        """
+        Finds the slice of an index covered by a range.
+
+        Args:
+            predicate (Range): The range.
+
+        Returns:
+            tuple[int, int]: The start and stop positions in the index.
+        """
+        values, _ = self._column(predicate.field)
+        start = (
+            0
+            if predicate.minimum is None
+            else int(np.searchsorted(values, predicate.minimum, side="left"))
+        )
+        stop = (
+            len(values)
+            if predicate.maximum is None
+            else int(np.searchsorted(values, predicate.maximum, side="right"))
+        )
+        return start, max(start, stop)
+
+    def _sorted_positions(self, field: str, descending: bool) -> np.ndarray:
+        """
+        Returns all positions sorted by a field, NULLs last, ties by position.
+
+        Args:
+            field (str): The field to sort by.
+            descending (bool): Whether to sort in descending order.
+
+        Returns:
+            np.ndarray: The positions, computed once per ordering.
+        """
+        if (field, descending) not in self._orderings:
+            values, positions = self._column(field)
+            if descending:
+                positions = positions[np.lexsort((positions, -values))]
+            column = self._matrix[:, NUMERIC_FIELDS.index(field)]
+            nulls = np.flatnonzero(np.isnan(column))
+            self._orderings[field, descending] = np.concatenate((positions, nulls))
+        return self._orderings[field, descending]
+
+    def search(
+        self, ranges: Sequence[Range], sort_by: str | None = None, limit: int = 10
+    ) -> list[schemas.Product]:
+        """
+        Finds products matching all ranges.
+
+        The most selective range is scanned through its index and the others
+        are checked on its candidates in one vectorized step.
+
+        Args:
+            ranges (Sequence[Range]): The predicates, all of which must match.
+            sort_by (str | None): The field to sort by, prefixed with `-` for
+                descending order. NULLs are sorted last. Defaults to id order.
+            limit (int): The maximum number of products to return.
+
+        Returns:
+            list[schemas.Product]: The top `limit` matching products.
+        """
+        limit = max(limit, 0)
+        field, descending = parse_sort_by(sort_by) if sort_by else (None, False)
+
+        if not ranges:
+            if field is None:
+                return list(self._products[:limit])
+            positions = self._sorted_positions(field, descending)[:limit]
+            return [self._products[position] for position in positions]
+
+        bounds = [self._bounds(predicate) for predicate in ranges]
+        selected = min(range(len(ranges)), key=lambda i: bounds[i][1] - bounds[i][0])
+        driver, (start, stop) = ranges[selected], bounds[selected]
+
+        candidates = self._column(driver.field)[1][start:stop]
+        for predicate in ranges:
+            if predicate is driver:
+                continue
+            values = self._matrix[candidates, NUMERIC_FIELDS.index(predicate.field)]
+            matches = ~np.isnan(values)
+            if predicate.minimum is not None:
+                matches &= values >= predicate.minimum
+            if predicate.maximum is not None:
+                matches &= values <= predicate.maximum
+            candidates = candidates[matches]
+
+        if field is None:
+            positions = np.sort(candidates)[:limit]
+        else:
+            values = self._matrix[candidates, NUMERIC_FIELDS.index(field)]
+            nulls = np.isnan(values)
+            keys = np.where(nulls, 0.0, -values if descending else values)
+            positions = candidates[np.lexsort((candidates, keys, nulls))[:limit]]
+
+        return [self._products[position] for position in positions]
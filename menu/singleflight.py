@@ -0,0 +1,109 @@
+import asyncio
+import time
+from functools import partial
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+
+@dataclass
+class SingleFlightStats:
+    """
+    Counters of a SingleFlight instance.
+
+    Attributes:
+        hits (int): Calls answered from the result cache.
+        misses (int): Calls that started a new flight.
+        coalesced (int): Calls that joined a flight already in progress.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical async calls and caches their results.
+
+    Calls with the same key share one in-flight task, and its result is kept
+    in a bounded LRU cache for a short time. Clearing the cache also detaches
+    the flights in progress, so results of an old menu are never cached.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Initializes a SingleFlight instance.
+
+        Args:
+            max_size (int): The maximum number of cached results, 0 to only
+                coalesce calls.
+            ttl (float): How long a result stays cached in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = SingleFlightStats()
+        self._results: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._flights: dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+
+    async def call(self, key: Hashable, function: Callable[[], Awaitable]) -> Any:
+        """
+        Returns the result for a key, running the function only if the result
+        is neither cached nor already being computed.
+
+        The function runs in a task of its own, so cancelling one caller does
+        not cancel the others.
+
+        Args:
+            key (Hashable): The key of the call, e.g. function and arguments.
+            function (Callable[[], Awaitable]): Computes the result.
+
+        Returns:
+            Any: The result of the function.
+        """
+        if (cached := self._results.get(key)) is not None:
+            expires_at, result = cached
+            if expires_at > time.monotonic():
+                self._results.move_to_end(key)
+                self.stats.hits += 1
+                return result
+            del self._results[key]
+
+        if (flight := self._flights.get(key)) is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(flight)
+
+        self.stats.misses += 1
+        flight = asyncio.create_task(function())
+        self._flights[key] = flight
+        flight.add_done_callback(partial(self._land, key, generation=self._generation))
+        return await asyncio.shield(flight)
+
+    def _land(self, key: Hashable, task: asyncio.Task, generation: int) -> None:
+        """
+        Removes a finished flight and caches its result.
+
+        Args:
+            key (Hashable): The key of the call.
+            task (asyncio.Task): The finished task.
+            generation (int): The generation the flight was started in.
+        """
+        if generation != self._generation:
+            return
+        del self._flights[key]
+        if task.cancelled() or task.exception() is not None or self.max_size <= 0:
+            return
+
+        self._results[key] = (time.monotonic() + self.ttl, task.result())
+        self._results.move_to_end(key)
+        if len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Drops all cached results and detaches the flights in progress.
+        """
+        self._generation += 1
+        self._results.clear()
+        self._flights.clear()
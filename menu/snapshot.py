@@ -0,0 +1,390 @@
+import asyncio
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping, Sequence
+
+import numpy as np
+
+from database.engine import async_read_session
+from menu import config, schemas
+from menu.columns import (
+    ColumnarNames,
+    ColumnarProducts,
+    ColumnarRows,
+    ProductsByName,
+    load_snapshot_file,
+)
+from menu.crud import get_menu, get_menu_at, get_menu_version
+from menu.pagination import ORDERABLE_FIELDS, Cursor, parse_order_by, sort_key
+from menu.responses import CachedResponse, ResponseCache
+from menu.lookup import TrigramIndex
+from menu.nutrition import NutrientMatrix
+from menu.search import NUMERIC_FIELDS, NutrientIndex
+from menu.singleflight import SingleFlight
+from parser.columnar import ColumnarMenu
+
+
+class MenuSnapshot:
+    """
+    Immutable in-memory copy of the products of a market.
+
+    A snapshot is built after every menu import and replaced as a whole, so
+    a request holding a snapshot always sees one consistent menu version.
+    Every market has a snapshot of its own, with its own response cache. The
+    products are either held as objects or read from a memory-mapped snapshot
+    file, see `from_columns`. The fuzzy name index, the serialized menu and the
+    orderings of every orderable field are built by `prepare` before a current
+    snapshot is swapped in, and on first use for snapshots of past versions.
+
+    Attributes:
+        market (str): The market code.
+        version (int): The stored menu version the snapshot was built from, 0
+            if no version was recorded yet.
+        products (Sequence[schemas.Product]): The products in id order.
+        by_name (Mapping[str, schemas.Product]): The products keyed by name.
+        nutrients (NutrientMatrix): The numeric fields as a NumPy matrix.
+        nutrient_index (NutrientIndex): Sorted indexes over the numeric fields.
+        responses (ResponseCache): Responses serialized from this snapshot.
+    """
+
+    __slots__ = (
+        "market",
+        "version",
+        "products",
+        "by_name",
+        "nutrients",
+        "nutrient_index",
+        "responses",
+        "_name_index",
+        "_menu_response",
+        "_orderings",
+    )
+
+    def __init__(
+        self,
+        market: str,
+        version: int,
+        products: Sequence[schemas.Product],
+        by_name: Mapping[str, schemas.Product] | None = None,
+        nutrients: NutrientMatrix | None = None,
+    ) -> None:
+        """
+        Initializes a MenuSnapshot instance.
+
+        Args:
+            market (str): The market code.
+            version (int): The stored menu version the snapshot was built from.
+            products (Sequence[schemas.Product]): The products in id order.
+            by_name (Mapping[str, schemas.Product] | None): The products keyed
+                by name, built from the products if not given.
+            nutrients (NutrientMatrix | None): The nutrient matrix of the
+                products, built from the products if not given.
+        """
+        self.market = market
+        self.version = version
+        self.products = products
+        if by_name is None:
+            by_name = MappingProxyType({product.name: product for product in products})
+        self.by_name = by_name
+        self.nutrients = NutrientMatrix(products) if nutrients is None else nutrients
+        self.nutrient_index = NutrientIndex(products, self.nutrients.matrix)
+        self.responses = ResponseCache(max_size=config.RESPONSE_CACHE_SIZE)
+        self._name_index: TrigramIndex | None = None
+        self._menu_response: CachedResponse | None = None
+        self._orderings: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_columns(
+        cls, market: str, version: int, menu: ColumnarMenu
+    ) -> "MenuSnapshot":
+        """
+        Builds a snapshot served straight from a memory-mapped snapshot file.
+
+        Products are built from the file as requests access them, names are
+        looked up in its hash index and the nutrient matrix is a zero-copy view
+        of its numeric columns.
+
+        Args:
+            market (str): The market code.
+            version (int): The menu version of the file.
+            menu (ColumnarMenu): The mapped file, one product per row in id order.
+
+        Returns:
+            MenuSnapshot: The snapshot.
+        """
+        products = ColumnarProducts(market, menu)
+        rows = ColumnarRows(menu)
+        return cls(
+            market=market,
+            version=version,
+            products=products,
+            by_name=ProductsByName(rows, products),
+            nutrients=NutrientMatrix(
+                products, names=ColumnarNames(menu), rows=rows, matrix=menu.numbers
+            ),
+        )
+
+    def prepare(self) -> None:
+        """
+        Builds the fuzzy name index, sorts the products by every orderable
+        field and serializes and compresses the whole menu, so the first
+        requests do not pay for them on the event loop.
+        """
+        self.name_index
+        for field in ORDERABLE_FIELDS:
+            self._get_ordering(field)
+        self.menu_response
+
+    @property
+    def name_index(self) -> TrigramIndex:
+        """
+        Returns:
+            TrigramIndex: Fuzzy index over the names and descriptions, built on
+                first use unless prepared.
+        """
+        if self._name_index is None:
+            self._name_index = TrigramIndex(self.products)
+        return self._name_index
+
+    @property
+    def menu_response(self) -> CachedResponse:
+        """
+        Returns:
+            CachedResponse: The whole menu, serialized and compressed on first
+                use unless prepared.
+        """
+        if self._menu_response is None:
+            self._menu_response = CachedResponse.from_content(list(self.products))
+        return self._menu_response
+
+    def _get_ordering(self, field: str) -> np.ndarray:
+        """
+        Returns the positions of the products sorted by a field, sorting them
+        on first use unless prepared.
+
+        Products are ordered by the field and then by id, with NULLs first.
+
+        Args:
+            field (str): The field to order by.
+
+        Returns:
+            np.ndarray: The positions in ascending order.
+        """
+        if field not in self._orderings:
+            if field == "id":
+                positions = np.arange(len(self.products))
+            elif field == "name":
+                names = self.nutrients.names
+                positions = np.array(
+                    sorted(range(len(names)), key=names.__getitem__), dtype=np.intp
+                )
+            else:
+                values = self.nutrients.matrix[:, NUMERIC_FIELDS.index(field)]
+                nulls = np.isnan(values)
+                # A stable sort keeps products of equal value in id order.
+                positions = np.lexsort((np.where(nulls, 0.0, values), ~nulls))
+            self._orderings[field] = positions
+        return self._orderings[field]
+
+    def get_all_products(
+        self,
+        skip: int,
+        limit: int,
+        order_by: str = "id",
+        cursor: Cursor | None = None,
+    ) -> Sequence[schemas.Product]:
+        """
+        Retrieves a page of products in the same order as `crud.get_all_products`.
+
+        Args:
+            skip (int): The number of records to skip.
+            limit (int): The maximum number of records to return.
+            order_by (str): The field to order by, prefixed with `-` for descending.
+            cursor (Cursor | None): The position to continue from.
+
+        Returns:
+            Sequence[schemas.Product]: A list of products.
+        """
+        field, descending = parse_order_by(order_by)
+        positions = self._get_ordering(field)
+        skip, limit = max(skip, 0), max(limit, 0)
+
+        def get_sort_key(position: int) -> tuple:
+            product = self.products[position]
+            return sort_key(getattr(product, field), product.id)
+
+        if descending:
+            end = (
+                len(positions)
+                if cursor is None
+                else bisect_left(positions, cursor.sort_key, key=get_sort_key)
+            )
+            end = max(end - skip, 0)
+            page = positions[max(end - limit, 0):end][::-1]
+        else:
+            start = (
+                0
+                if cursor is None
+                else bisect_right(positions, cursor.sort_key, key=get_sort_key)
+            )
+            start += skip
+            page = positions[start:start + limit]
+        return [self.products[position] for position in page]
+
+    def get_single_product(self, product_name: str) -> schemas.Product | None:
+        """
+        Retrieves a single product by name.
+
+        Args:
+            product_name (str): The name of the product to retrieve.
+
+        Returns:
+            schemas.Product | None: The product, or None if not found.
+        """
+        return self.by_name.get(product_name)
+
+    def get_products_by_names(
+        self, product_names: Sequence[str], fields: Sequence[str]
+    ) -> list[dict]:
+        """
+        Retrieves selected fields of the products with the given names.
+
+        Args:
+            product_names (Sequence[str]): The names of the products to retrieve.
+            fields (Sequence[str]): The fields to return, validated by the caller.
+
+        Returns:
+            list[dict]: The found products as dictionaries, always including `name`.
+        """
+        fields = ("name", *(field for field in fields if field != "name"))
+        return [
+            {field: getattr(product, field) for field in fields}
+            for name in product_names
+            if (product := self.by_name.get(name)) is not None
+        ]
+
+
+_snapshots: dict[str, MenuSnapshot] = {}
+# Past versions never change, so their snapshots are cached without expiry.
+_past_snapshots = SingleFlight(max_size=config.HISTORY_CACHE_SIZE, ttl=math.inf)
+
+
+def parse_as_of(as_of: str) -> int | datetime:
+    """
+    Parses an `as_of` parameter: a version number or an ISO 8601 timestamp.
+
+    Timestamps with a time zone are converted to local time, the time zone of
+    the recorded import times.
+
+    Args:
+        as_of (str): The parameter value, e.g. `3` or `2024-05-01T12:00`.
+
+    Returns:
+        int | datetime: The version number or the local time.
+
+    Raises:
+        ValueError: If the value is neither.
+    """
+    if as_of.isdigit():
+        return int(as_of)
+    try:
+        moment = datetime.fromisoformat(as_of)
+    except ValueError:
+        raise ValueError("as_of must be a version number or an ISO 8601 time") from None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def get_snapshot(market: str) -> MenuSnapshot | None:
+    """
+    Returns the current menu snapshot of a market.
+
+    Args:
+        market (str): The market code.
+
+    Returns:
+        MenuSnapshot | None: The snapshot, or None if snapshots are disabled or
+            not built yet.
+    """
+    return _snapshots.get(market)
+
+
+async def refresh_snapshot(market: str) -> MenuSnapshot | None:
+    """
+    Builds a snapshot of the products of a market and makes it the current one.
+
+    With mapped snapshots enabled, the snapshot file of the menu version is
+    mapped, and only written if it does not exist yet, e.g. after an import.
+    The snapshot is built and prepared in a worker thread, so requests are
+    served from the current one meanwhile, see `MenuSnapshot.prepare`.
+
+    Args:
+        market (str): The market code.
+
+    Returns:
+        MenuSnapshot | None: The new snapshot, or None if snapshots are disabled.
+    """
+    if not config.USE_SNAPSHOT:
+        return None
+
+    async with async_read_session() as db:
+        version = await get_menu_version(db, market) or 0
+        if config.MAPPED_SNAPSHOT and version:
+            menu = await load_snapshot_file(db, market, version)
+        else:
+            menu = None
+            rows = await get_menu(db, market)
+
+    def build() -> MenuSnapshot:
+        if menu is not None:
+            snapshot = MenuSnapshot.from_columns(market, version, menu)
+        else:
+            products = tuple(schemas.Product.model_validate(row) for row in rows)
+            snapshot = MenuSnapshot(market=market, version=version, products=products)
+        snapshot.prepare()
+        return snapshot
+
+    snapshot = await asyncio.to_thread(build)
+    _snapshots[market] = snapshot
+    return snapshot
+
+
+async def get_snapshot_as_of(
+    market: str, as_of: int | datetime
+) -> MenuSnapshot | None:
+    """
+    Returns a snapshot of the menu of a market as it was at a past version.
+
+    The snapshot is rebuilt from the recorded changes and cached, the current
+    snapshot is returned if it is of the same version.
+
+    Args:
+        market (str): The market code.
+        as_of (int | datetime): A version number, or a point in time for the
+            version current at that time.
+
+    Returns:
+        MenuSnapshot | None: The snapshot, or None if there is no such version.
+    """
+    async with async_read_session() as db:
+        version = await get_menu_version(db, market, as_of)
+    if version is None:
+        return None
+    if (current := _snapshots.get(market)) is not None and current.version == version:
+        return current
+
+    async def build() -> MenuSnapshot:
+        async with async_read_session() as db:
+            products = await get_menu_at(db, market, version)
+        return MenuSnapshot(
+            market=market,
+            version=version,
+            products=tuple(
+                schemas.Product(market=market, **product) for product in products
+            ),
+        )
+
+    return await _past_snapshots.call((market, version), build)
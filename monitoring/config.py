@@ -0,0 +1,6 @@
+import configparser
+
+config = configparser.ConfigParser()
+config.read("config.ini")
+
+ENABLED = config.getboolean("metrics", "enabled", fallback=True)
@@ -0,0 +1,378 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Sequence
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    """
+    Escapes a label value for the Prometheus text format.
+
+    Args:
+        value (str): The label value.
+
+    Returns:
+        str: The escaped value.
+    """
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """
+    Formats a label set, e.g. `{route="/menu",method="GET"}`.
+
+    Args:
+        names (Sequence[str]): The label names.
+        values (Sequence[str]): The label values.
+
+    Returns:
+        str: The label set, empty if there are no labels.
+    """
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    """
+    Formats a sample value.
+
+    Args:
+        value (float): The value.
+
+    Returns:
+        str: The value in the Prometheus text format.
+    """
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Value:
+    """
+    A single counter or gauge sample.
+    """
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    """
+    The buckets, sum and count of a single histogram.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric:
+    """
+    A metric family: one sample, or histogram, per combination of labels.
+
+    Attributes:
+        name (str): The metric name.
+        documentation (str): The HELP text.
+        metric_type (str): `counter`, `gauge` or `histogram`.
+        label_names (tuple[str, ...]): The names of the labels.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """
+        Initializes a Metric instance.
+
+        Args:
+            name (str): The metric name.
+            documentation (str): The HELP text.
+            metric_type (str): `counter`, `gauge` or `histogram`.
+            label_names (Sequence[str]): The names of the labels.
+            buckets (Sequence[float]): The upper bounds of the histogram buckets.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self._buckets = tuple(sorted(buckets))
+        self._children: dict[tuple[str, ...], _Value | _HistogramValue] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> _Value | _HistogramValue:
+        """
+        Returns the sample of a label combination, creating it on first use.
+
+        Args:
+            *values (str): The label values, in the order of `label_names`.
+
+        Returns:
+            _Value | _HistogramValue: The sample.
+        """
+        if (child := self._children.get(values)) is not None:
+            return child
+
+        with self._lock:
+            if values not in self._children:
+                self._children[values] = (
+                    _HistogramValue(self._buckets)
+                    if self.metric_type == "histogram"
+                    else _Value()
+                )
+            return self._children[values]
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increments a metric without labels.
+
+        Args:
+            amount (float): The increment.
+        """
+        self.labels().inc(amount)
+
+    def set(self, value: float) -> None:
+        """
+        Sets a gauge without labels.
+
+        Args:
+            value (float): The value.
+        """
+        self.labels().set(value)
+
+    def observe(self, value: float) -> None:
+        """
+        Records a value in a histogram without labels.
+
+        Args:
+            value (float): The observed value, e.g. a duration in seconds.
+        """
+        self.labels().observe(value)
+
+    def render(self) -> list[str]:
+        """
+        Renders the metric in the Prometheus text format.
+
+        Returns:
+            list[str]: The HELP, TYPE and sample lines.
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for values, child in list(self._children.items()):
+            labels = _format_labels(self.label_names, values)
+            if self.metric_type != "histogram":
+                lines.append(f"{self.name}{labels} {_format_value(child.value)}")
+                continue
+
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            bucket_names = (*self.label_names, "le")
+            for bound, count in zip((*self._buckets, math.inf), counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    bucket_names, (*values, _format_value(bound))
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    A metric without labels whose value is read when the metrics are rendered.
+
+    Attributes:
+        name (str): The metric name.
+        documentation (str): The HELP text.
+        metric_type (str): `counter` or `gauge`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        function: Callable[[], float],
+    ) -> None:
+        """
+        Initializes a CallbackMetric instance.
+
+        Args:
+            name (str): The metric name.
+            documentation (str): The HELP text.
+            metric_type (str): `counter` or `gauge`.
+            function (Callable[[], float]): Returns the current value.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self._function = function
+
+    def render(self) -> list[str]:
+        """
+        Renders the metric in the Prometheus text format.
+
+        Returns:
+            list[str]: The HELP, TYPE and sample lines.
+        """
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+            f"{self.name} {_format_value(self._function())}",
+        ]
+
+
+class Registry:
+    """
+    The metrics exposed at `/metrics`.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric | CallbackMetric] = {}
+
+    def _register(self, metric: Metric | CallbackMetric) -> Metric | CallbackMetric:
+        """
+        Adds a metric, returning the existing one if the name is taken.
+
+        Args:
+            metric (Metric | CallbackMetric): The metric.
+
+        Returns:
+            Metric | CallbackMetric: The registered metric.
+        """
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Metric:
+        """
+        Registers a counter.
+
+        Args:
+            name (str): The metric name, ending in `_total`.
+            documentation (str): The HELP text.
+            labels (Sequence[str]): The names of the labels.
+
+        Returns:
+            Metric: The counter.
+        """
+        return self._register(Metric(name, documentation, "counter", labels))
+
+    def gauge(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Metric:
+        """
+        Registers a gauge.
+
+        Args:
+            name (str): The metric name.
+            documentation (str): The HELP text.
+            labels (Sequence[str]): The names of the labels.
+
+        Returns:
+            Metric: The gauge.
+        """
+        return self._register(Metric(name, documentation, "gauge", labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Metric:
+        """
+        Registers a histogram.
+
+        Args:
+            name (str): The metric name, e.g. ending in `_seconds`.
+            documentation (str): The HELP text.
+            labels (Sequence[str]): The names of the labels.
+            buckets (Sequence[float]): The upper bounds of the buckets.
+
+        Returns:
+            Metric: The histogram.
+        """
+        return self._register(
+            Metric(name, documentation, "histogram", labels, buckets)
+        )
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        function: Callable[[], float],
+    ) -> CallbackMetric:
+        """
+        Registers a metric read from a function when rendered.
+
+        Args:
+            name (str): The metric name.
+            documentation (str): The HELP text.
+            metric_type (str): `counter` or `gauge`.
+            function (Callable[[], float]): Returns the current value.
+
+        Returns:
+            CallbackMetric: The metric.
+        """
+        return self._register(
+            CallbackMetric(name, documentation, metric_type, function)
+        )
+
+    def render(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition.
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
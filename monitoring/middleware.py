@@ -0,0 +1,72 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from monitoring.metrics import registry
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time until the response is fully sent, by route template.",
+    labels=("method", "route", "status"),
+)
+requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests being handled.", labels=("method",)
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and concurrency of every request.
+
+    Latencies are labelled with the template of the matched route, e.g.
+    `/product/{product_name}/`, which the router leaves in the scope, so labels
+    do not grow with the number of distinct URLs and no route is matched twice.
+    It is a plain ASGI middleware rather than a BaseHTTPMiddleware, which
+    would wrap every response body in an extra task and stream.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        Initializes a MetricsMiddleware instance.
+
+        Args:
+            app (ASGIApp): The application to instrument.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Handles a request, timing it until the last body chunk is sent.
+
+        Args:
+            scope (Scope): The ASGI scope.
+            receive (Receive): The ASGI receive channel.
+            send (Send): The ASGI send channel.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = requests_in_flight.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            path = route.path if route is not None else UNMATCHED_ROUTE
+            request_duration.labels(method, path, status).observe(
+                time.perf_counter() - start
+            )
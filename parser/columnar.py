@@ -0,0 +1,360 @@
+import json
+import math
+import mmap
+import os
+import struct
+import zlib
+from typing import Iterator, Mapping, Sequence
+
+import numpy as np
+
+MAGIC = b"MENUCOLS"
+FORMAT_VERSION = 1
+# Magic, format version and header length, followed by the JSON header.
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+EMPTY_SLOT = -1
+
+
+def _hash(key: bytes) -> int:
+    """
+    Hashes a key of the name index. Unlike `hash`, the result is the same in
+    every process.
+
+    Args:
+        key (bytes): The UTF-8 encoded key.
+
+    Returns:
+        int: The hash.
+    """
+    return zlib.crc32(key)
+
+
+def _build_index(keys: Sequence[bytes]) -> np.ndarray:
+    """
+    Builds an open addressing hash table from keys to their rows.
+
+    The table has a power of two slots, at least twice as many as keys, and
+    collisions are resolved by linear probing.
+
+    Args:
+        keys (Sequence[bytes]): The key of every row.
+
+    Returns:
+        np.ndarray: The int32 table, the row of a key or EMPTY_SLOT per slot.
+    """
+    size = 1 << max(len(keys) * 2 - 1, 1).bit_length()
+    mask = size - 1
+    table = np.full(size, EMPTY_SLOT, dtype=np.int32)
+    slots = table.tolist()
+    for row, key in enumerate(keys):
+        slot = _hash(key) & mask
+        while slots[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        slots[slot] = row
+    table[:] = slots
+    return table
+
+
+def write_columns(
+    path: str,
+    rows: int,
+    numbers: Mapping[str, Sequence[float | None]],
+    strings: Mapping[str, Sequence[str | None]],
+    integers: Mapping[str, Sequence[int]] | None = None,
+    index: str = "name",
+    metadata: dict | None = None,
+) -> None:
+    """
+    Writes a table of products as a columnar file that can be memory-mapped.
+
+    The file starts with a JSON header locating every section. The numeric
+    columns form one (columns x rows) float64 block, NULLs stored as NaN and
+    marked in a NULL bitmap. Every string column is an offsets array and a
+    blob of UTF-8 bytes. The rows are indexed by the unique `index` column in
+    a hash table. The file is written to a temporary file that then replaces
+    it, so readers never see a partially written file.
+
+    Args:
+        path (str): The path of the file.
+        rows (int): The number of rows.
+        numbers (Mapping[str, Sequence[float | None]]): The numeric columns,
+            None or NaN for NULL.
+        strings (Mapping[str, Sequence[str | None]]): The string columns.
+        integers (Mapping[str, Sequence[int]] | None): Integer columns without
+            NULLs, such as ids.
+        index (str): The string column to index.
+        metadata (dict | None): JSON-serializable data stored in the header.
+    """
+    sections: dict[str, bytes | np.ndarray] = {}
+    null_fields = [*numbers, *strings]
+    nulls = np.zeros((len(null_fields), rows), dtype=bool)
+
+    block = np.empty((len(numbers), rows), dtype=np.float64)
+    for position, values in enumerate(numbers.values()):
+        block[position] = np.asarray(values, dtype=np.float64)
+        nulls[position] = np.isnan(block[position])
+    sections["numbers"] = block
+
+    for position, (field, values) in enumerate(strings.items(), start=len(numbers)):
+        encoded = [b"" if value is None else value.encode("utf-8") for value in values]
+        nulls[position] = [value is None for value in values]
+        offsets = np.zeros(rows + 1, dtype=np.uint64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        sections[f"{field}.offsets"] = offsets
+        sections[f"{field}.data"] = b"".join(encoded)
+        if field == index:
+            sections["index"] = _build_index(encoded)
+
+    for field, values in (integers or {}).items():
+        sections[field] = np.asarray(values, dtype=np.int64)
+    sections["nulls"] = np.packbits(nulls, axis=1, bitorder="little")
+
+    layout = {}
+    offset = 0
+    for name, section in sections.items():
+        size = len(section) if isinstance(section, bytes) else section.nbytes
+        layout[name] = [offset, size]
+        offset += size + -size % ALIGNMENT
+    header = json.dumps(
+        {
+            "rows": rows,
+            "numbers": list(numbers),
+            "strings": list(strings),
+            "integers": list(integers or {}),
+            "nulls": null_fields,
+            "index": index,
+            "sections": layout,
+            "metadata": metadata or {},
+        }
+    ).encode("utf-8")
+    header += b" " * (-(PREAMBLE.size + len(header)) % ALIGNMENT)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        file.write(header)
+        for section in sections.values():
+            data = section if isinstance(section, bytes) else section.tobytes()
+            file.write(data)
+            file.write(b"\0" * (-len(data) % ALIGNMENT))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+class ColumnarMenu:
+    """
+    Read-only, memory-mapped view of a file written by `write_columns`.
+
+    Nothing is parsed up front: columns are NumPy views of the mapped file and
+    pages are read by the OS as they are touched, and shared by all processes
+    mapping the file. The file must not be modified while it is mapped, it is
+    only ever replaced.
+
+    Attributes:
+        rows (int): The number of rows.
+        numeric_fields (tuple[str, ...]): The numeric columns, in block order.
+        string_fields (tuple[str, ...]): The string columns.
+        metadata (dict): The metadata stored by the writer.
+        numbers (np.ndarray): The read-only (rows x numeric_fields) float64
+            matrix, NULLs as NaN.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Maps a columnar file.
+
+        Args:
+            path (str): The path of the file.
+
+        Raises:
+            ValueError: If the file is not a columnar file of a known version.
+        """
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < PREAMBLE.size:
+            raise ValueError(f"{path} is not a columnar menu file")
+        magic, version, header_size = PREAMBLE.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(
+                f"{path} is not a columnar menu file of version {FORMAT_VERSION}"
+            )
+        header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_size])
+
+        self._start = PREAMBLE.size + header_size
+        self._sections = header["sections"]
+        self._null_rows = {field: row for row, field in enumerate(header["nulls"])}
+        self.rows: int = header["rows"]
+        self.numeric_fields = tuple(header["numbers"])
+        self.string_fields = tuple(header["strings"])
+        self.metadata: dict = header["metadata"]
+        self._index_field = header["index"]
+
+        self.numbers = self._view("numbers", np.float64).reshape(
+            len(self.numeric_fields), self.rows
+        ).T
+        self._nulls = self._view("nulls", np.uint8).reshape(
+            len(self._null_rows), -(-self.rows // 8)
+        )
+        self._index = self._view("index", np.int32)
+        self._offsets = {
+            field: self._view(f"{field}.offsets", np.uint64)
+            for field in self.string_fields
+        }
+        self._integers = {
+            field: self._view(field, np.int64) for field in header["integers"]
+        }
+
+    def _view(self, section: str, dtype: type) -> np.ndarray:
+        """
+        Returns a section of the file as a read-only array, without copying.
+
+        Args:
+            section (str): The name of the section.
+            dtype (type): The type of the elements.
+
+        Returns:
+            np.ndarray: The one-dimensional view.
+        """
+        offset, size = self._sections[section]
+        return np.frombuffer(
+            self._mmap,
+            dtype=dtype,
+            count=size // np.dtype(dtype).itemsize,
+            offset=self._start + offset,
+        )
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __enter__(self) -> "ColumnarMenu":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmaps the file. Views returned earlier must no longer be in use.
+        """
+        self.numbers = self._nulls = self._index = None
+        self._offsets = self._integers = {}
+        self._mmap.close()
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        Returns a numeric column as a zero-copy view.
+
+        Args:
+            field (str): The numeric field.
+
+        Returns:
+            np.ndarray: The read-only float64 column, NULLs as NaN.
+        """
+        return self.numbers[:, self.numeric_fields.index(field)]
+
+    def integers(self, field: str) -> np.ndarray:
+        """
+        Returns an integer column as a zero-copy view.
+
+        Args:
+            field (str): The integer field.
+
+        Returns:
+            np.ndarray: The read-only int64 column.
+        """
+        return self._integers[field]
+
+    def is_null(self, field: str, row: int) -> bool:
+        """
+        Reads the NULL bitmap of a column.
+
+        Args:
+            field (str): The numeric or string field.
+            row (int): The row.
+
+        Returns:
+            bool: Whether the value is NULL.
+        """
+        return bool(self._nulls[self._null_rows[field], row >> 3] >> (row & 7) & 1)
+
+    def _bytes(self, field: str, row: int) -> bytes:
+        """
+        Reads the encoded value of a string column.
+
+        Args:
+            field (str): The string field.
+            row (int): The row.
+
+        Returns:
+            bytes: The UTF-8 encoded value.
+        """
+        offsets = self._offsets[field]
+        start = self._start + self._sections[f"{field}.data"][0]
+        return self._mmap[start + int(offsets[row]):start + int(offsets[row + 1])]
+
+    def string(self, field: str, row: int) -> str | None:
+        """
+        Reads a value of a string column.
+
+        Args:
+            field (str): The string field.
+            row (int): The row.
+
+        Returns:
+            str | None: The value, or None if it is NULL.
+        """
+        if self.is_null(field, row):
+            return None
+        return self._bytes(field, row).decode("utf-8")
+
+    def find(self, key: str) -> int | None:
+        """
+        Looks up a row by the value of the indexed column in O(1).
+
+        Args:
+            key (str): The value of the indexed column, e.g. a product name.
+
+        Returns:
+            int | None: The row, or None if no row has the value.
+        """
+        encoded = key.encode("utf-8")
+        mask = len(self._index) - 1
+        slot = _hash(encoded) & mask
+        while (row := int(self._index[slot])) != EMPTY_SLOT:
+            if self._bytes(self._index_field, row) == encoded:
+                return row
+            slot = (slot + 1) & mask
+        return None
+
+    def record(self, row: int) -> dict:
+        """
+        Reads all columns of a row.
+
+        Args:
+            row (int): The row.
+
+        Returns:
+            dict: The values keyed by column, NULLs as None.
+        """
+        values = self.numbers[row].tolist()
+        return {
+            **{field: column[row].item() for field, column in self._integers.items()},
+            **{field: self.string(field, row) for field in self.string_fields},
+            **{
+                field: None if math.isnan(value) else value
+                for field, value in zip(self.numeric_fields, values)
+            },
+        }
+
+    def records(self) -> Iterator[dict]:
+        """
+        Iterates over all rows in file order.
+
+        Yields:
+            dict: The next row, see `record`.
+        """
+        for row in range(self.rows):
+            yield self.record(row)
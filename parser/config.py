@@ -4,4 +4,21 @@ config = configparser.ConfigParser()
 config.read("config.ini")
 
 FILE_PATH = config.get("paths", "menu_file_dir")
-MENU_FILE_NAME = "mcdonalds.json"
+MENU_FILE_NAME = "mcdonalds.{market}.json"
+MANIFEST_FILE_NAME = "mcdonalds.{market}.manifest.json"
+PROFILE_FILE_NAME = "mcdonalds.{market}.profile.json"
+PARTIAL_FILE_NAME = "mcdonalds.{market}.partial.ndjson"
+COLUMNAR_FILE_NAME = "mcdonalds.{market}.columns"
+
+# Market codes mapped to the URLs of their menu pages, the default menu page
+# if no markets are configured.
+MARKETS: dict[str, str | None] = (
+    dict(config.items("markets")) if config.has_section("markets") else {"ua": None}
+)
+
+WORKERS = config.getint("parser", "workers", fallback=1)
+MAX_RETRIES = config.getint("parser", "max_retries", fallback=2)
+ENGINE = config.get("parser", "engine", fallback="selenium")
+HTTP_CONCURRENCY = config.getint("parser", "http_concurrency", fallback=16)
+INCREMENTAL = config.getboolean("parser", "incremental", fallback=False)
+LEAN_BROWSER = config.getboolean("parser", "lean_browser", fallback=False)
@@ -0,0 +1,652 @@
+import asyncio
+import logging
+from contextlib import AbstractContextManager, nullcontext
+from html.parser import HTMLParser
+from typing import Mapping
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from items import Product
+from manifest import ScrapeManifest
+from parse import USER_AGENT, ParallelProductScraper, ProductScraper, ScrapeError
+from profiling import ScrapeProfiler
+from writers import NDJSONFileWriter
+
+logger = logging.getLogger(__name__)
+
+VOID_TAGS = frozenset(
+    (
+        "area", "base", "br", "col", "embed", "hr", "img", "input",
+        "link", "meta", "param", "source", "track", "wbr",
+    )
+)
+
+
+class HTMLNode:
+    """
+    A minimal element of a statically parsed HTML document.
+
+    Attributes:
+        tag (str): The tag name of the element.
+        attrs (dict[str, str]): The attributes of the element.
+        children (list[HTMLNode | str]): Child elements and text chunks.
+    """
+
+    __slots__ = ("tag", "attrs", "children")
+
+    def __init__(self, tag: str, attrs: dict[str, str]) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.children: list[HTMLNode | str] = []
+
+    @property
+    def classes(self) -> list[str]:
+        """
+        Returns:
+            list[str]: The CSS classes of the element.
+        """
+        return self.attrs.get("class", "").split()
+
+    @property
+    def text(self) -> str:
+        """
+        Returns:
+            str: The whitespace-normalized text content of the element.
+        """
+        chunks = []
+        stack: list[HTMLNode | str] = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                chunks.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return " ".join("".join(chunks).split())
+
+    def elements(self) -> list["HTMLNode"]:
+        """
+        Returns:
+            list[HTMLNode]: The direct child elements, without text chunks.
+        """
+        return [child for child in self.children if isinstance(child, HTMLNode)]
+
+    def iter_descendants(self):
+        """
+        Iterates over all descendant elements in document order.
+
+        Yields:
+            HTMLNode: The next descendant element.
+        """
+        stack = list(reversed(self.elements()))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.elements()))
+
+    def find_by_class(self, class_name: str) -> "HTMLNode | None":
+        """
+        Finds the first descendant element with the given CSS class.
+
+        Args:
+            class_name (str): The CSS class to look for.
+
+        Returns:
+            HTMLNode | None: The element, or None if there is no such element.
+        """
+        for node in self.iter_descendants():
+            if class_name in node.classes:
+                return node
+        return None
+
+    def find_all_by_tag(self, tag: str) -> list["HTMLNode"]:
+        """
+        Finds all descendant elements with the given tag.
+
+        Args:
+            tag (str): The tag name to look for.
+
+        Returns:
+            list[HTMLNode]: The matching elements in document order.
+        """
+        return [node for node in self.iter_descendants() if node.tag == tag]
+
+
+class _TreeBuilder(HTMLParser):
+    """
+    Builds a tree of HTMLNode objects from an HTML document.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root = HTMLNode("document", {})
+        self._stack = [self.root]
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        node = HTMLNode(tag, {key: value or "" for key, value in attrs})
+        self._stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self._stack.append(node)
+
+    def handle_endtag(self, tag: str) -> None:
+        for depth in range(len(self._stack) - 1, 0, -1):
+            if self._stack[depth].tag == tag:
+                del self._stack[depth:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        self._stack[-1].children.append(data)
+
+
+def parse_html(html: str) -> HTMLNode:
+    """
+    Parses an HTML document into a tree of nodes.
+
+    Args:
+        html (str): The HTML document.
+
+    Returns:
+        HTMLNode: The root node of the document.
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def _get_nutrient_values(nutrient_list: HTMLNode | None) -> list[str]:
+    """
+    Reads the visible values of a `.cmp-nutrition-summary` list.
+
+    Mirrors the `.value > span[aria-hidden='true']` selector used by the
+    Selenium scraper.
+
+    Args:
+        nutrient_list (HTMLNode | None): The `ul` element of the list.
+
+    Returns:
+        list[str]: One value per list item that has one.
+    """
+    if nutrient_list is None:
+        return []
+
+    values = []
+    for item in nutrient_list.find_all_by_tag("li"):
+        value = item.find_by_class("value")
+        if value is None:
+            continue
+        for span in value.elements():
+            if span.tag == "span" and span.attrs.get("aria-hidden") == "true":
+                values.append(span.text)
+                break
+    return values
+
+
+def parse_product_page(html: str) -> Product | None:
+    """
+    Extracts product information from the server-sent HTML of a product page.
+
+    Args:
+        html (str): The HTML of the product page.
+
+    Returns:
+        Product | None: The product, or None if any field is missing or blank
+            in the static HTML and the page has to be rendered in a browser.
+    """
+    document = parse_html(html)
+
+    name = document.find_by_class("cmp-product-details-main__heading-title")
+    description = document.find_by_class("cmp-product-details-main__description")
+    macronutrients = _get_nutrient_values(
+        document.find_by_class("cmp-nutrition-summary__heading-primary")
+    )
+    dietary_components = _get_nutrient_values(
+        document.find_by_class("cmp-nutrition-summary__details-column-view-desktop")
+    )[:4]
+
+    if (
+        name is None
+        or not name.text
+        or description is None
+        or len(macronutrients) != 4
+        or len(dietary_components) != 4
+        # Values left empty in the HTML are filled in by scripts.
+        or not all(macronutrients)
+        or not all(dietary_components)
+    ):
+        return None
+
+    return ProductScraper.build_product(
+        name=name.text,
+        description=description.text,
+        macronutrients=macronutrients,
+        dietary_components=dietary_components,
+    )
+
+
+def parse_product_detail_urls(html: str, base_url: str) -> list[str]:
+    """
+    Extracts the product detail URLs from the server-sent HTML of the menu page.
+
+    Args:
+        html (str): The HTML of the menu page.
+        base_url (str): The URL of the menu page, used to resolve relative links.
+
+    Returns:
+        list[str]: The absolute detail URLs in menu order.
+    """
+    urls = []
+    for node in parse_html(html).iter_descendants():
+        if "cmp-category__item" not in node.classes:
+            continue
+        links = node.find_all_by_tag("a")
+        if links and links[0].attrs.get("href"):
+            urls.append(urljoin(base_url, links[0].attrs["href"]))
+    return urls
+
+
+class HostLimiter:
+    """
+    Limits the number of requests in flight to each host.
+
+    Scrapers sharing a limiter share the limit of every host, so scraping more
+    markets from the same host at once does not add to the load on it.
+
+    Attributes:
+        concurrency (int): The maximum number of requests in flight per host.
+    """
+
+    def __init__(self, concurrency: int) -> None:
+        """
+        Initializes a HostLimiter instance.
+
+        Args:
+            concurrency (int): The maximum number of requests in flight per host.
+        """
+        self.concurrency = max(1, concurrency)
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        """
+        Returns the semaphore of the host of a URL.
+
+        Args:
+            url (str): The URL to request.
+
+        Returns:
+            asyncio.Semaphore: The semaphore to hold while the request is in flight.
+        """
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[host]
+
+
+def create_client(timeout: float) -> httpx.AsyncClient:
+    """
+    Creates a client sharing connections between requests.
+
+    The number of connections is not limited by the client, requests are
+    limited per host by a HostLimiter instead.
+
+    Args:
+        timeout (float): The timeout of a single request in seconds.
+
+    Returns:
+        httpx.AsyncClient: The client.
+    """
+    return httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        timeout=timeout,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=None),
+    )
+
+
+class HTTPProductScraper:
+    """
+    Scrapes product pages over plain HTTP, using a browser only when needed.
+
+    Detail pages are downloaded concurrently and parsed statically. Pages whose
+    static HTML lacks any field are scraped again with Selenium.
+
+    Attributes:
+        base_url (str): The menu page to scrape.
+        concurrency (int): The maximum number of requests in flight per host.
+        timeout (float): The timeout of a single request in seconds.
+        fallback_workers (int): The number of browsers used for fallback pages.
+        manifest (ScrapeManifest | None): The manifest of the previous run.
+        profiler (ScrapeProfiler | None): Records the time of every phase.
+        lean (bool): Whether fallback pages are rendered in lean browsers.
+        writer (NDJSONFileWriter | None): Receives every product as soon as it
+            is scraped.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        concurrency: int = 16,
+        timeout: float = 10.0,
+        fallback_workers: int = 1,
+        manifest: ScrapeManifest | None = None,
+        profiler: ScrapeProfiler | None = None,
+        lean: bool = False,
+        writer: NDJSONFileWriter | None = None,
+    ) -> None:
+        """
+        Initializes an HTTPProductScraper instance.
+
+        Args:
+            base_url (str | None): The menu page to scrape. Defaults to
+                ProductScraper.BASE_URL.
+            concurrency (int): The maximum number of requests in flight per host.
+            timeout (float): The timeout of a single request in seconds.
+            fallback_workers (int): The number of browsers used for fallback pages.
+            manifest (ScrapeManifest | None): The manifest of the previous run.
+                When given, unchanged pages are requested conditionally and
+                products of unchanged pages are reused.
+            profiler (ScrapeProfiler | None): Records the time of every phase,
+                including those of pages rendered with Selenium.
+            lean (bool): Whether fallback pages are rendered in lean browsers.
+            writer (NDJSONFileWriter | None): Receives every product as soon as
+                it is scraped. Pages it already holds from an interrupted run
+                are not downloaded again.
+        """
+        self.base_url = base_url or ProductScraper.BASE_URL
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.fallback_workers = fallback_workers
+        self.manifest = manifest
+        self.profiler = profiler
+        self.lean = lean
+        self.writer = writer
+        self._pending: dict[str, tuple[str, httpx.Headers]] = {}
+
+    def _phase(self, url: str, name: str) -> AbstractContextManager:
+        """
+        Times a phase of scraping a page if a profiler is set.
+
+        Args:
+            url (str): The URL of the page.
+            name (str): The name of the phase.
+
+        Returns:
+            AbstractContextManager: The context to run the phase in.
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(url, name)
+
+    def _record_attempt(self, url: str, product: Product | None, outcome: str) -> None:
+        """
+        Records the outcome of fetching a page if a profiler is set.
+
+        Pages that have to be rendered are recorded by the Selenium scraper.
+
+        Args:
+            url (str): The URL of the page.
+            product (Product | None): The product, None if it has to be rendered.
+            outcome (str): `scraped`, `reused` or `resumed`.
+        """
+        if self.profiler is not None and product is not None:
+            self.profiler.record_attempt(url, outcome)
+
+    async def _fetch_product(
+        self, client: httpx.AsyncClient, limiter: HostLimiter, url: str
+    ) -> Product | None:
+        """
+        Returns the product of a page, resuming from the writer if it already
+        holds the page and writing the product to it otherwise.
+
+        Args:
+            client (httpx.AsyncClient): The HTTP client.
+            limiter (HostLimiter): Limits the number of requests in flight.
+            url (str): The URL of the product page.
+
+        Returns:
+            Product | None: The product, or None if the page has to be rendered.
+        """
+        if self.writer is None:
+            return await self._download_product(client, limiter, url)
+
+        if (product := self.writer.get(url)) is not None:
+            if self.manifest is not None:
+                self.manifest.resume(url, self.writer.get_manifest_entry(url))
+            self._record_attempt(url, product, "resumed")
+            return product
+
+        if product := await self._download_product(client, limiter, url):
+            self.writer.append(
+                url, product, self.manifest.get_entry(url) if self.manifest else None
+            )
+        return product
+
+    async def _download_product(
+        self, client: httpx.AsyncClient, limiter: HostLimiter, url: str
+    ) -> Product | None:
+        """
+        Downloads and parses a single product page.
+
+        Args:
+            client (httpx.AsyncClient): The HTTP client.
+            limiter (HostLimiter): Limits the number of requests in flight.
+            url (str): The URL of the product page.
+
+        Returns:
+            Product | None: The product, or None if the page has to be rendered.
+        """
+        headers = self.manifest.conditional_headers(url) if self.manifest else {}
+
+        async with limiter(url):
+            try:
+                with self._phase(url, "fetch"):
+                    response = await client.get(url, headers=headers)
+                if response.status_code == httpx.codes.NOT_MODIFIED:
+                    product = self.manifest.reuse(url)
+                    self._record_attempt(url, product, "reused")
+                    return product
+                response.raise_for_status()
+            except httpx.HTTPError as error:
+                logger.warning("Failed to fetch %s: %s", url, error)
+                return None
+
+        if self.manifest is None:
+            product = self._parse(url, response.text)
+            self._record_attempt(url, product, "scraped")
+            return product
+
+        with self._phase(url, "fingerprint"):
+            fingerprint = self.manifest.fingerprint(response.text)
+        if previous_product := self.manifest.reuse(url, fingerprint):
+            self._record_attempt(url, previous_product, "reused")
+            return previous_product
+
+        product = self._parse(url, response.text)
+        if product:
+            self._record(url, fingerprint, response.headers, product)
+        else:
+            self._pending[url] = (fingerprint, response.headers)
+        self._record_attempt(url, product, "scraped")
+        return product
+
+    def _parse(self, url: str, html: str) -> Product | None:
+        """
+        Parses a downloaded product page.
+
+        Args:
+            url (str): The URL of the product page.
+            html (str): The HTML of the page.
+
+        Returns:
+            Product | None: The product, or None if the page has to be rendered,
+                also when the static HTML cannot be parsed at all.
+        """
+        with self._phase(url, "parse"):
+            try:
+                return parse_product_page(html)
+            except (ValueError, IndexError) as error:
+                logger.warning("Could not parse %s statically: %s", url, error)
+                return None
+
+    def _record(
+        self, url: str, fingerprint: str, headers: httpx.Headers, product: Product
+    ) -> None:
+        """
+        Records a scraped page in the manifest together with its validators.
+
+        Args:
+            url (str): The URL of the product page.
+            fingerprint (str): The fingerprint of the server-sent HTML.
+            headers (httpx.Headers): The response headers.
+            product (Product): The scraped product.
+        """
+        self.manifest.record(
+            url,
+            fingerprint,
+            product,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+        )
+
+    async def fetch_all_products(
+        self, client: httpx.AsyncClient, limiter: HostLimiter
+    ) -> tuple[list[str], list[Product | None]]:
+        """
+        Downloads the menu page and all product pages.
+
+        Args:
+            client (httpx.AsyncClient): The HTTP client.
+            limiter (HostLimiter): Limits the number of requests in flight.
+
+        Returns:
+            tuple[list[str], list[Product | None]]: The detail URLs and the
+                statically parsed products in the same order.
+        """
+        with self._phase(self.base_url, "menu_page"):
+            async with limiter(self.base_url):
+                response = await client.get(self.base_url)
+            response.raise_for_status()
+            urls = parse_product_detail_urls(response.text, str(response.url))
+
+        products = await asyncio.gather(
+            *(self._fetch_product(client, limiter, url) for url in urls)
+        )
+        return urls, list(products)
+
+    def scrape_all_products(self) -> list[Product]:
+        """
+        Scrapes all products listed on the menu page.
+
+        Falls back to the Selenium scraper for the whole menu if its static HTML
+        lists no products, and for single pages missing any field.
+
+        Returns:
+            list[Product]: The scraped products in menu order.
+        """
+
+        async def fetch() -> tuple[list[str], list[Product | None]]:
+            async with create_client(self.timeout) as client:
+                return await self.fetch_all_products(
+                    client, HostLimiter(self.concurrency)
+                )
+
+        urls, products = asyncio.run(fetch())
+        return self.render_missing_products(urls, products)
+
+    def render_missing_products(
+        self, urls: list[str], products: list[Product | None]
+    ) -> list[Product]:
+        """
+        Renders the pages that could not be parsed statically with Selenium.
+
+        Args:
+            urls (list[str]): The detail URLs of the menu.
+            products (list[Product | None]): The statically parsed products in
+                the same order, None for pages that have to be rendered.
+
+        Returns:
+            list[Product]: The scraped products in menu order.
+
+        Raises:
+            ScrapeError: If any page could not be rendered either.
+        """
+        if not urls:
+            logger.info("Menu page has no static product links, using Selenium")
+            return ParallelProductScraper(
+                workers=self.fallback_workers,
+                base_url=self.base_url,
+                manifest=self.manifest,
+                profiler=self.profiler,
+                lean=self.lean,
+                writer=self.writer,
+            ).scrape_all_products()
+
+        fallback_scraper = ParallelProductScraper(
+            workers=self.fallback_workers,
+            base_url=self.base_url,
+            profiler=self.profiler,
+            lean=self.lean,
+            writer=self.writer,
+        )
+        missing = [index for index, product in enumerate(products) if product is None]
+        if missing:
+            logger.info(
+                "Rendering %d of %d pages with Selenium", len(missing), len(urls)
+            )
+            rendered = fallback_scraper.scrape_products([urls[i] for i in missing])
+            for index, product in zip(missing, rendered):
+                products[index] = product
+                if product is not None and urls[index] in self._pending:
+                    self._record(urls[index], *self._pending[urls[index]], product)
+
+        if fallback_scraper.failures:
+            raise ScrapeError(fallback_scraper.failures)
+        return products
+
+
+def scrape_markets(
+    scrapers: Mapping[str, HTTPProductScraper], concurrency: int, timeout: float = 10.0
+) -> dict[str, list[Product]]:
+    """
+    Scrapes the menus of several markets at once.
+
+    The pages of all markets are downloaded concurrently over one client, with
+    at most `concurrency` requests in flight per host, so the run takes about
+    as long as downloading the same number of pages of one market. Pages that
+    have to be rendered are rendered afterwards, one market after another,
+    each market using the whole pool of browsers.
+
+    A market whose menu page cannot be downloaded, or with any page that
+    cannot be scraped, is logged and left out, the other markets are still
+    scraped.
+
+    Args:
+        scrapers (Mapping[str, HTTPProductScraper]): The scraper of each market.
+        concurrency (int): The maximum number of requests in flight per host.
+        timeout (float): The timeout of a single request in seconds.
+
+    Returns:
+        dict[str, list[Product]]: The products of each scraped market.
+    """
+
+    async def fetch() -> list:
+        limiter = HostLimiter(concurrency)
+        async with create_client(timeout) as client:
+            return await asyncio.gather(
+                *(
+                    scraper.fetch_all_products(client, limiter)
+                    for scraper in scrapers.values()
+                ),
+                return_exceptions=True,
+            )
+
+    menus = {}
+    for (market, scraper), fetched in zip(scrapers.items(), asyncio.run(fetch())):
+        if isinstance(fetched, BaseException):
+            logger.error("Failed to scrape market %s: %s", market, fetched)
+            continue
+        try:
+            menus[market] = scraper.render_missing_products(*fetched)
+        except ScrapeError as error:
+            logger.error("Failed to scrape market %s: %s", market, error)
+    return menus
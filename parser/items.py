@@ -1,4 +1,7 @@
-from dataclasses import dataclass
+import math
+from array import array
+from dataclasses import dataclass, fields
+from typing import Iterable, Iterator
 
 
 @dataclass
@@ -29,3 +32,82 @@ class Product:
     sugar: float
     salt: float
     portion: float
+
+
+NUMERIC_FIELDS = tuple(field.name for field in fields(Product))[2:]
+
+
+class ProductColumns:
+    """
+    Array-backed counterpart of Product for handling many products at once.
+
+    The numeric fields are kept in one `array("d")` per field instead of one
+    object per product, with NULLs stored as NaN.
+
+    Attributes:
+        names (list[str]): The names of the products.
+        descriptions (list[str | None]): The descriptions of the products.
+        numbers (dict[str, array]): The values of every numeric field.
+    """
+
+    __slots__ = ("names", "descriptions", "numbers")
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self.descriptions: list[str | None] = []
+        self.numbers = {field: array("d") for field in NUMERIC_FIELDS}
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product]) -> "ProductColumns":
+        """
+        Builds the columns of some products.
+
+        Args:
+            products (Iterable[Product]): The products.
+
+        Returns:
+            ProductColumns: The products as columns, in the same order.
+        """
+        columns = cls()
+        for product in products:
+            columns.append(product)
+        return columns
+
+    def append(self, product: Product) -> None:
+        """
+        Adds a product after the last row.
+
+        Args:
+            product (Product): The product.
+        """
+        self.names.append(product.name)
+        self.descriptions.append(product.description)
+        for field, values in self.numbers.items():
+            value = getattr(product, field)
+            values.append(math.nan if value is None else value)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, row: int) -> Product:
+        """
+        Rebuilds the product of a row.
+
+        Args:
+            row (int): The row.
+
+        Returns:
+            Product: The product.
+        """
+        values = {field: column[row] for field, column in self.numbers.items()}
+        return Product(
+            name=self.names[row],
+            description=self.descriptions[row],
+            **{
+                field: None if math.isnan(value) else value
+                for field, value in values.items()
+            },
+        )
+
+    def __iter__(self) -> Iterator[Product]:
+        return (self[row] for row in range(len(self)))
@@ -1,11 +1,166 @@
-from parse import ProductScraper
+import argparse
+import logging
+import os
+
+from fetch import HTTPProductScraper, scrape_markets
+from items import Product, ProductColumns
+from manifest import ScrapeManifest
+from parse import ParallelProductScraper, ProductScraper, ScrapeError
+from profiling import ScrapeProfiler
 import config
-from writers import JSONFileWriter
+from writers import ColumnarFileWriter, JSONFileWriter, NDJSONFileWriter
+
+logger = logging.getLogger(__name__)
+
+
+def save_market(
+    market: str,
+    products: list[Product],
+    partial_writer: NDJSONFileWriter,
+    manifest: ScrapeManifest | None,
+) -> None:
+    """
+    Writes the menu file and the columnar file of a market and finishes its
+    scraping state.
+
+    Args:
+        market (str): The market code.
+        products (list[Product]): The scraped products of the market.
+        partial_writer (NDJSONFileWriter): The writer of the interrupted-run file.
+        manifest (ScrapeManifest | None): The manifest of the market.
+    """
+    partial_writer.close()
+    menu_file_name = config.MENU_FILE_NAME.format(market=market)
+    JSONFileWriter(file_name=menu_file_name).write_in_json_file(products)
+    ColumnarFileWriter(
+        file_name=config.COLUMNAR_FILE_NAME.format(market=market)
+    ).write_columns(ProductColumns.from_products(products), menu_file_name)
+    partial_writer.remove()
+
+    if manifest is not None:
+        manifest.save()
+
+
+def scrape_market(
+    market: str,
+    partial_writer: NDJSONFileWriter,
+    manifest: ScrapeManifest | None,
+    profiler: ScrapeProfiler,
+) -> None:
+    """
+    Scrapes the menu of a market with Selenium and saves it.
+
+    Nothing is saved if any page fails, so the files of the previous run stay
+    in place and the partial file keeps the scraped products for the next run.
+
+    Args:
+        market (str): The market code.
+        partial_writer (NDJSONFileWriter): The writer of the interrupted-run file.
+        manifest (ScrapeManifest | None): The manifest of the market.
+        profiler (ScrapeProfiler): Records the time of every phase.
+
+    Raises:
+        ScrapeError: If any page failed after all retries.
+    """
+    if config.WORKERS > 1:
+        products = ParallelProductScraper(
+            workers=config.WORKERS,
+            max_retries=config.MAX_RETRIES,
+            base_url=config.MARKETS[market],
+            manifest=manifest,
+            profiler=profiler,
+            lean=config.LEAN_BROWSER,
+            writer=partial_writer,
+        ).scrape_all_products()
+    else:
+        scraper = ProductScraper(
+            base_url=config.MARKETS[market],
+            manifest=manifest,
+            profiler=profiler,
+            lean=config.LEAN_BROWSER,
+            writer=partial_writer,
+        )
+        try:
+            products = scraper.scrape_all_products()
+        finally:
+            scraper.close()
+    save_market(market, products, partial_writer, manifest)
 
 
 if __name__ == "__main__":
-    scraper = ProductScraper()
-    data = scraper.scrape_all_products()
+    arg_parser = argparse.ArgumentParser(description="Scrape the McDonald's menu.")
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time spent in every scraping phase",
+    )
+    arg_parser.add_argument(
+        "--market",
+        action="append",
+        choices=list(config.MARKETS),
+        help="scrape only this market, can be repeated",
+    )
+    args = arg_parser.parse_args()
+    markets = args.market or list(config.MARKETS)
+
+    profilers = {}
+    partial_writers = {}
+    manifests = {}
+    for market in markets:
+        profilers[market] = ScrapeProfiler()
+        partial_writers[market] = NDJSONFileWriter(
+            file_name=config.PARTIAL_FILE_NAME.format(market=market)
+        )
+        partial_writers[market].open()
+        manifests[market] = None
+        if config.INCREMENTAL:
+            manifests[market] = ScrapeManifest.load(
+                path=os.path.join(
+                    config.FILE_PATH, config.MANIFEST_FILE_NAME.format(market=market)
+                ),
+                output_path=os.path.join(
+                    config.FILE_PATH, config.MENU_FILE_NAME.format(market=market)
+                ),
+            )
+
+    try:
+        if config.ENGINE == "http":
+            scrapers = {
+                market: HTTPProductScraper(
+                    base_url=config.MARKETS[market],
+                    concurrency=config.HTTP_CONCURRENCY,
+                    fallback_workers=config.WORKERS,
+                    manifest=manifests[market],
+                    profiler=profilers[market],
+                    lean=config.LEAN_BROWSER,
+                    writer=partial_writers[market],
+                )
+                for market in markets
+            }
+            menus = scrape_markets(scrapers, concurrency=config.HTTP_CONCURRENCY)
+            for market, products in menus.items():
+                save_market(market, products, partial_writers[market], manifests[market])
+
+        else:
+            # Browsers are the bottleneck, so markets take turns using all of them.
+            for market in markets:
+                try:
+                    scrape_market(
+                        market,
+                        partial_writers[market],
+                        manifests[market],
+                        profilers[market],
+                    )
+                except ScrapeError as error:
+                    logger.error("Failed to scrape market %s: %s", market, error)
+    finally:
+        # Markets that were not finished keep their products for the next run.
+        for partial_writer in partial_writers.values():
+            partial_writer.close()
 
-    writer = JSONFileWriter(file_name=config.MENU_FILE_NAME)
-    writer.write_in_json_file(data)
+    for market, profiler in profilers.items():
+        profile_file_name = config.PROFILE_FILE_NAME.format(market=market)
+        profiler.save(os.path.join(config.FILE_PATH, profile_file_name))
+        if args.profile:
+            print(f"[{market}]")
+            print(profiler.summary())
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict
+
+from items import Product
+
+
+class ScrapeManifest:
+    """
+    Remembers what each product page looked like on the previous run.
+
+    The manifest is keyed by product detail URL and stores a content fingerprint,
+    the name of the product scraped from the page and, where the server sent them,
+    the ETag and Last-Modified headers. Together with the previous output file it
+    lets the HTTP scraper reuse products whose pages have not changed.
+
+    Attributes:
+        path (str): The path to the manifest file.
+        previous_entries (dict[str, dict]): Entries loaded from the previous run.
+        entries (dict[str, dict]): Entries recorded during the current run.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        previous_entries: dict[str, dict] | None = None,
+        previous_products: dict[str, Product] | None = None,
+    ) -> None:
+        """
+        Initializes a ScrapeManifest instance.
+
+        Args:
+            path (str): The path to the manifest file.
+            previous_entries (dict[str, dict] | None): Entries of the previous run.
+            previous_products (dict[str, Product] | None): Products of the previous
+                run keyed by name.
+        """
+        self.path = path
+        self.previous_entries = previous_entries or {}
+        self.entries: dict[str, dict] = {}
+        self._previous_products = previous_products or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, output_path: str) -> "ScrapeManifest":
+        """
+        Loads the manifest and the output of the previous run.
+
+        Missing files are treated as a first run.
+
+        Args:
+            path (str): The path to the manifest file.
+            output_path (str): The path to the previous JSON output.
+
+        Returns:
+            ScrapeManifest: The manifest of the previous run.
+        """
+        previous_entries = {}
+        previous_products = {}
+
+        if os.path.exists(path) and os.path.exists(output_path):
+            with open(path, "r", encoding="utf-8") as file:
+                previous_entries = json.load(file)
+            with open(output_path, "r", encoding="utf-8") as file:
+                previous_products = {
+                    record["name"]: Product(**record) for record in json.load(file)
+                }
+
+        return cls(path, previous_entries, previous_products)
+
+    @staticmethod
+    def fingerprint(content: str) -> str:
+        """
+        Computes the fingerprint of a page.
+
+        Args:
+            content (str): The content of the page.
+
+        Returns:
+            str: The hex digest of the content.
+        """
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def fingerprint_product(cls, product: Product) -> str:
+        """
+        Computes the fingerprint of the fields of a product, for pages whose
+        source differs between renders, see ProductScraper.
+
+        Args:
+            product (Product): The product scraped from the page.
+
+        Returns:
+            str: The hex digest of the fields.
+        """
+        return cls.fingerprint(
+            json.dumps(asdict(product), ensure_ascii=False, sort_keys=True)
+        )
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        """
+        Builds the conditional request headers for a page that can be reused.
+
+        Args:
+            url (str): The URL of the product page.
+
+        Returns:
+            dict[str, str]: If-None-Match / If-Modified-Since headers, empty if
+                the page was not scraped before.
+        """
+        entry = self.previous_entries.get(url)
+        if entry is None or entry.get("name") not in self._previous_products:
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def reuse(self, url: str, fingerprint: str | None = None) -> Product | None:
+        """
+        Returns the previous product of a page if the page has not changed.
+
+        The previous entry is carried over into the current run.
+
+        Args:
+            url (str): The URL of the product page.
+            fingerprint (str | None): The fingerprint of the page now, or None
+                if the server already confirmed that it has not changed.
+
+        Returns:
+            Product | None: The previous product, or None if it must be scraped.
+        """
+        entry = self.previous_entries.get(url)
+        if entry is None:
+            return None
+        if fingerprint is not None and entry.get("fingerprint") != fingerprint:
+            return None
+        if (product := self._previous_products.get(entry.get("name"))) is None:
+            return None
+
+        with self._lock:
+            self.entries[url] = entry
+        return product
+
+    def record(
+        self,
+        url: str,
+        fingerprint: str,
+        product: Product,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """
+        Records a freshly scraped page.
+
+        Args:
+            url (str): The URL of the product page.
+            fingerprint (str): The fingerprint of the page.
+            product (Product): The product scraped from the page.
+            etag (str | None): The ETag header of the response.
+            last_modified (str | None): The Last-Modified header of the response.
+        """
+        entry = {"fingerprint": fingerprint, "name": product.name}
+        if etag:
+            entry["etag"] = etag
+        if last_modified:
+            entry["last_modified"] = last_modified
+
+        with self._lock:
+            self.entries[url] = entry
+
+    def resume(self, url: str, entry: dict | None) -> None:
+        """
+        Carries a page resumed from an interrupted run into the current run.
+
+        Without the entry recorded by the interrupted run, the entry of the
+        previous run is carried over if there is one. A page that has changed
+        since then fails the fingerprint check next run and is scraped again.
+
+        Args:
+            url (str): The URL of the product page.
+            entry (dict | None): The entry recorded by the interrupted run.
+        """
+        entry = entry or self.previous_entries.get(url)
+        if entry is None:
+            return
+
+        with self._lock:
+            self.entries[url] = entry
+
+    def get_entry(self, url: str) -> dict | None:
+        """
+        Returns the entry of a page recorded or reused in the current run.
+
+        Args:
+            url (str): The URL of the product page.
+
+        Returns:
+            dict | None: The entry, or None if the page has none yet.
+        """
+        with self._lock:
+            return self.entries.get(url)
+
+    def save(self) -> None:
+        """
+        Writes the entries of the current run to the manifest file.
+
+        Pages that were not seen in this run are dropped. The entries are
+        written to a temporary file that then replaces the manifest, so a crash
+        never leaves a partially written manifest.
+        """
+        temporary_path = f"{self.path}.tmp"
+        with self._lock, open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self.entries, file, ensure_ascii=False, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.path)
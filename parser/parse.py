@@ -1,6 +1,11 @@
+import logging
+import queue
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, nullcontext
 
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
@@ -8,6 +13,62 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 
 from items import Product
+from manifest import ScrapeManifest
+from profiling import ScrapeProfiler
+from writers import NDJSONFileWriter
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/58.0.3029.110 Safari/537.3"
+)
+
+LEAN_ARGUMENTS = (
+    "--blink-settings=imagesEnabled=false",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-features=MediaRouter,OptimizationHints,Translate",
+    "--disable-gpu",
+    "--disable-sync",
+    "--mute-audio",
+    "--no-first-run",
+)
+BLOCKED_URLS = (
+    # Images, media and fonts.
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.mp3", "*.woff", "*.woff2", "*.ttf", "*.otf",
+    # Analytics, tag managers and consent banners.
+    "*adobedtm.com*", "*cookielaw.org*", "*demdex.net*", "*doubleclick.net*",
+    "*facebook.net*", "*google-analytics.com*", "*googletagmanager.com*",
+    "*hotjar.com*", "*omtrdc.net*", "*onetrust.com*",
+)
+
+
+class ScrapeError(Exception):
+    """
+    Raised when some pages of a menu could not be scraped, so that no partial
+    menu is saved in place of the complete one.
+
+    Attributes:
+        failures (dict[str, str]): The error of every page that failed.
+    """
+
+    def __init__(self, failures: dict[str, str]) -> None:
+        """
+        Initializes a ScrapeError instance.
+
+        Args:
+            failures (dict[str, str]): The error of every page that failed.
+        """
+        super().__init__(
+            f"{len(failures)} pages failed: {', '.join(sorted(failures))}"
+        )
+        self.failures = failures
 
 
 class BaseScraper:
@@ -18,13 +79,28 @@ class BaseScraper:
     and a custom user agent.
 
     Attributes:
+        lean (bool): Whether the browser skips everything scraping does not need.
         options (Options): WebDriver options for configuring the browser.
         driver (WebDriver): WebDriver instance for interacting with the browser.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, lean: bool = False) -> None:
+        """
+        Initializes a BaseScraper instance.
+
+        Args:
+            lean (bool): Block images, media, fonts and third-party trackers,
+                return from page loads once the DOM is ready and disable
+                Chrome features that are not needed for scraping.
+        """
+        self.lean = lean
         self.options = Options()
         self.driver = webdriver.Chrome(options=self._add_options())
+        if lean:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd(
+                "Network.setBlockedURLs", {"urls": list(BLOCKED_URLS)}
+            )
 
     def _add_options(self) -> Options:
         """
@@ -34,13 +110,22 @@ class BaseScraper:
             Options: WebDriver options.
         """
         self.options.add_argument("--headless")
-        self.options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/58.0.3029.110 Safari/537.3"
-        )
+        self.options.add_argument(f"user-agent={USER_AGENT}")
+        if self.lean:
+            self.options.page_load_strategy = "eager"
+            for argument in LEAN_ARGUMENTS:
+                self.options.add_argument(argument)
         return self.options
 
+    def close(self) -> None:
+        """
+        Shuts down the WebDriver, ignoring errors from an already dead browser.
+        """
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            logger.warning("WebDriver did not shut down cleanly")
+
 
 class ProductScraper(BaseScraper):
     """
@@ -51,6 +136,92 @@ class ProductScraper(BaseScraper):
     """
 
     BASE_URL = "https://www.mcdonalds.com/ua/uk-ua/eat/fullmenu.html"
+    DETAIL_BUTTON_ID = "accordion-29309a7a60-item-9ea8a10642-button"
+    DETAIL_DELAY = 1
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        manifest: ScrapeManifest | None = None,
+        profiler: ScrapeProfiler | None = None,
+        lean: bool = False,
+        writer: NDJSONFileWriter | None = None,
+    ) -> None:
+        """
+        Initializes a ProductScraper instance.
+
+        Args:
+            base_url (str | None): The menu page to scrape. Defaults to BASE_URL,
+                can point to a local fixture server.
+            manifest (ScrapeManifest | None): The manifest of the run, which
+                records every scraped page. Rendered pages are always extracted
+                again: their page source changes with every render, and the
+                extracted fields are only known after extraction.
+            profiler (ScrapeProfiler | None): Records the time of every phase
+                of scraping a page.
+            lean (bool): Use a lean browser, which also waits for the product
+                details to appear instead of sleeping DETAIL_DELAY seconds.
+            writer (NDJSONFileWriter | None): Receives every product as soon as
+                it is scraped. Pages it already holds from an interrupted run
+                are not scraped again.
+        """
+        super().__init__(lean=lean)
+        self.base_url = base_url or self.BASE_URL
+        self.manifest = manifest
+        self.profiler = profiler
+        self.writer = writer
+
+    def _phase(self, url: str, name: str) -> AbstractContextManager:
+        """
+        Times a phase of scraping a page if a profiler is set.
+
+        Args:
+            url (str): The URL of the page.
+            name (str): The name of the phase.
+
+        Returns:
+            AbstractContextManager: The context to run the phase in.
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(url, name)
+
+    def _record_attempt(self, url: str, outcome: str) -> None:
+        """
+        Records the outcome of scraping a page if a profiler is set.
+
+        Args:
+            url (str): The URL of the page.
+            outcome (str): `scraped`, `resumed` or `failed`.
+        """
+        if self.profiler is not None:
+            self.profiler.record_attempt(url, outcome)
+
+    def scrape_product(self, url: str) -> Product:
+        """
+        Returns the product of a page, resuming from the writer if it already
+        holds the page and writing the product to it otherwise.
+
+        Args:
+            url (str): The URL of the product page.
+
+        Returns:
+            Product: The product.
+        """
+        if self.writer is None:
+            return self._scrape_single_product(url)
+
+        if (product := self.writer.get(url)) is not None:
+            if self.manifest is not None:
+                self.manifest.resume(url, self.writer.get_manifest_entry(url))
+            self._record_attempt(url, "resumed")
+            return product
+
+        product = self._scrape_single_product(url)
+        self.writer.append(
+            url, product, self.manifest.get_entry(url) if self.manifest else None
+        )
+        return product
 
     def _scrape_single_product(self, url: str) -> Product:
         """
@@ -61,24 +232,80 @@ class ProductScraper(BaseScraper):
 
         Returns:
             Product: The scraped product information.
+
+        Raises:
+            WebDriverException: If the browser fails.
+            ValueError, IndexError: If the page does not hold a complete product.
+        """
+        try:
+            with self._phase(url, "load"):
+                self.driver.get(url)
+
+            with self._phase(url, "detail_button"):
+                self._click_detail_product_button()
+            with self._phase(url, "detail_delay"):
+                self._wait_for_details()
+
+            with self._phase(url, "name"):
+                name = self._get_product_name()
+            with self._phase(url, "description"):
+                description = self._get_product_description()
+            with self._phase(url, "macronutrients"):
+                macronutrients = self._get_product_macronutrients()
+            with self._phase(url, "dietary_components"):
+                dietary_components = self._get_product_dietary_components()
+
+            product = self.build_product(
+                name=name,
+                description=description,
+                macronutrients=macronutrients,
+                dietary_components=dietary_components,
+            )
+        except (WebDriverException, ValueError, IndexError):
+            self._record_attempt(url, "failed")
+            raise
+
+        if self.manifest is not None:
+            self.manifest.record(
+                url, self.manifest.fingerprint_product(product), product
+            )
+        self._record_attempt(url, "scraped")
+        return product
+
+    @classmethod
+    def build_product(
+        cls,
+        name: str,
+        description: str,
+        macronutrients: list[str],
+        dietary_components: list[str],
+    ) -> Product:
         """
-        self.driver.get(url)
-        self._click_detail_product_button()
+        Builds a product from the raw texts found on a product page.
 
-        calories, fats, carbs, proteins = self._get_product_macronutrients()
-        unsaturated_fats, sugar, salt, portion = self._get_product_dietary_components()
+        Args:
+            name (str): The name of the product.
+            description (str): The description of the product.
+            macronutrients (list[str]): Calories, fats, carbs and proteins.
+            dietary_components (list[str]): Unsaturated fats, sugar, salt and portion.
+
+        Returns:
+            Product: The product with numeric values converted to floats.
+        """
+        calories, fats, carbs, proteins = macronutrients
+        unsaturated_fats, sugar, salt, portion = dietary_components
 
         return Product(
-            name=self._get_product_name(),
-            description=self._get_product_description(),
-            calories=self._turn_into_float(calories),
-            fats=self._turn_into_float(fats),
-            carbs=self._turn_into_float(carbs),
-            proteins=self._turn_into_float(proteins),
-            unsaturated_fats=self._turn_into_float(unsaturated_fats),
-            sugar=self._turn_into_float(sugar),
-            salt=self._turn_into_float(salt),
-            portion=self._turn_into_float(portion),
+            name=name,
+            description=description,
+            calories=cls._turn_into_float(calories),
+            fats=cls._turn_into_float(fats),
+            carbs=cls._turn_into_float(carbs),
+            proteins=cls._turn_into_float(proteins),
+            unsaturated_fats=cls._turn_into_float(unsaturated_fats),
+            sugar=cls._turn_into_float(sugar),
+            salt=cls._turn_into_float(salt),
+            portion=cls._turn_into_float(portion),
         )
 
     @staticmethod
@@ -98,18 +325,51 @@ class ProductScraper(BaseScraper):
     def _click_detail_product_button(self) -> None:
         """
         Clicks on the detail product button to reveal more information.
+
+        The details take a moment to appear, see `_wait_for_details`.
         """
         wait = WebDriverWait(self.driver, 10)
         detail_info_button = wait.until(
-            EC.element_to_be_clickable(
-                (By.ID, "accordion-29309a7a60-item-9ea8a10642-button")
-            )
+            EC.element_to_be_clickable((By.ID, self.DETAIL_BUTTON_ID))
         )
         self.driver.execute_script(
             "arguments[0].scrollIntoView(true);", detail_info_button
         )
         detail_info_button.click()
-        time.sleep(1)
+
+    def _wait_for_details(self) -> None:
+        """
+        Waits for the product details revealed by the detail button.
+
+        Lean browsers wait until the accordion reports itself expanded or the
+        nutrition details are visible, others sleep DETAIL_DELAY seconds.
+        """
+        if not self.lean:
+            time.sleep(self.DETAIL_DELAY)
+            return
+
+        WebDriverWait(self.driver, 5).until(
+            EC.any_of(
+                EC.text_to_be_present_in_element_attribute(
+                    (By.ID, self.DETAIL_BUTTON_ID), "aria-expanded", "true"
+                ),
+                EC.visibility_of_element_located(
+                    (By.CLASS_NAME, "cmp-nutrition-summary__details-column-view-desktop")
+                ),
+            )
+        )
+
+    def get_product_detail_urls(self) -> list[str]:
+        """
+        Collects detail page URLs of all products listed on the menu page.
+
+        Returns:
+            list[str]: The detail URLs in menu order.
+        """
+        with self._phase(self.base_url, "menu_page"):
+            self.driver.get(self.base_url)
+            products = self.driver.find_elements(By.CLASS_NAME, "cmp-category__item")
+            return [self._get_product_detail_url(product) for product in products]
 
     def scrape_all_products(self) -> list[Product]:
         """
@@ -118,13 +378,8 @@ class ProductScraper(BaseScraper):
         Returns:
             list[Product]: A list of scraped product information.
         """
-        self.driver.get(self.BASE_URL)
-        products = self.driver.find_elements(By.CLASS_NAME, "cmp-category__item")
-
-        product_detail_urls = [
-            self._get_product_detail_url(product) for product in products
-        ]
-        return [self._scrape_single_product(url) for url in product_detail_urls]
+        product_detail_urls = self.get_product_detail_urls()
+        return [self.scrape_product(url) for url in product_detail_urls]
 
     @staticmethod
     def _turn_into_float(item: str) -> float | None:
@@ -135,7 +390,8 @@ class ProductScraper(BaseScraper):
             item (str): The string to convert.
 
         Returns:
-            float | None: The converted float value, or None if conversion fails.
+            float | None: The converted float value, or None if conversion fails
+                or the string holds no value.
         """
         try:
             return float(
@@ -144,7 +400,7 @@ class ProductScraper(BaseScraper):
                 .replace("мл/ml", " ")
                 .split()[0]
             )
-        except ValueError:
+        except (ValueError, IndexError):
             return None
 
     def _get_product_name(self) -> str:
@@ -226,3 +482,194 @@ class ProductScraper(BaseScraper):
             )
             for component in li_dietary_components
         ]
+
+
+class ParallelProductScraper:
+    """
+    Scrapes product pages with a pool of headless Chrome workers.
+
+    The menu page is read once, then detail URLs are spread across the workers.
+    A worker whose browser fails is shut down and its slot in the pool is
+    refilled with a fresh browser before the URL is retried, so a single crash
+    does not abort the run. A page that cannot be parsed fails on its own.
+
+    Attributes:
+        workers (int): The number of browsers scraping at the same time.
+        max_retries (int): How many times a failed URL is retried.
+        base_url (str | None): The menu page to scrape.
+        manifest (ScrapeManifest | None): The manifest shared by all workers.
+        profiler (ScrapeProfiler | None): The profiler shared by all workers.
+        lean (bool): Whether the workers use lean browsers.
+        writer (NDJSONFileWriter | None): The writer shared by all workers.
+        failures (dict[str, str]): The error of every URL that failed after all
+            retries.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_retries: int = 2,
+        base_url: str | None = None,
+        manifest: ScrapeManifest | None = None,
+        profiler: ScrapeProfiler | None = None,
+        lean: bool = False,
+        writer: NDJSONFileWriter | None = None,
+    ) -> None:
+        """
+        Initializes a ParallelProductScraper instance.
+
+        Args:
+            workers (int): The number of browsers scraping at the same time.
+            max_retries (int): How many times a failed URL is retried.
+            base_url (str | None): The menu page to scrape.
+            manifest (ScrapeManifest | None): The manifest of the previous run.
+            profiler (ScrapeProfiler | None): Records the time of every phase
+                of scraping a page.
+            lean (bool): Whether the workers use lean browsers.
+            writer (NDJSONFileWriter | None): Receives every product as soon as
+                it is scraped, see ProductScraper.
+        """
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.base_url = base_url
+        self.manifest = manifest
+        self.profiler = profiler
+        self.lean = lean
+        self.writer = writer
+        self.failures: dict[str, str] = {}
+        # Idle workers, None for a slot whose browser has to be started again.
+        self._idle_scrapers: queue.Queue[ProductScraper | None] = queue.Queue()
+
+    def _new_scraper(self) -> ProductScraper:
+        """
+        Starts a new worker browser.
+
+        Returns:
+            ProductScraper: A scraper with its own WebDriver.
+        """
+        return ProductScraper(
+            base_url=self.base_url,
+            manifest=self.manifest,
+            profiler=self.profiler,
+            lean=self.lean,
+            writer=self.writer,
+        )
+
+    def _scrape_with_worker(self, url: str) -> Product | None:
+        """
+        Scrapes a single URL on an idle worker, replacing the worker on failure.
+
+        Every slot taken from the pool is put back, holding either a working
+        browser or None, so the pool keeps its size even when a replacement
+        browser fails to start. Such a slot is started again by the next
+        worker that takes it.
+
+        Args:
+            url (str): The URL of the product page.
+
+        Returns:
+            Product | None: The scraped product, or None if every attempt failed
+                or the page could not be parsed.
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            scraper = self._idle_scrapers.get()
+            try:
+                if scraper is None:
+                    scraper = self._new_scraper()
+                return scraper.scrape_product(url)
+            except WebDriverException as worker_error:
+                logger.warning(
+                    "Worker failed on %s (attempt %d), replacing it", url, attempt + 1
+                )
+                error = worker_error
+                if scraper is not None:
+                    scraper.close()
+                    scraper = None
+            except (ValueError, IndexError) as parse_error:
+                logger.error("Could not parse %s: %s", url, parse_error)
+                self.failures[url] = repr(parse_error)
+                return None
+            finally:
+                self._idle_scrapers.put(scraper)
+
+        logger.error("Giving up on %s after %d attempts", url, self.max_retries + 1)
+        self.failures[url] = repr(error)
+        return None
+
+    def _close_idle_scrapers(self) -> None:
+        """
+        Shuts down the browsers of all idle workers.
+        """
+        while not self._idle_scrapers.empty():
+            if (scraper := self._idle_scrapers.get_nowait()) is not None:
+                scraper.close()
+
+    def scrape_products(self, urls: list[str]) -> list[Product | None]:
+        """
+        Scrapes the given product pages in parallel.
+
+        Args:
+            urls (list[str]): The URLs of the product pages.
+
+        Pages the writer already holds from an interrupted run are not handed
+        to the workers, and no more browsers are started than there are pages
+        left. Pages that fail are listed in `failures`.
+
+        Returns:
+            list[Product | None]: The scraped products in the order of `urls`,
+                with None for pages that failed after all retries.
+        """
+        products = [None] * len(urls)
+        pending = []
+        for index, url in enumerate(urls):
+            if self.writer is not None and (product := self.writer.get(url)):
+                products[index] = product
+                if self.manifest is not None:
+                    self.manifest.resume(url, self.writer.get_manifest_entry(url))
+                if self.profiler is not None:
+                    self.profiler.record_attempt(url, "resumed")
+            else:
+                pending.append(index)
+
+        workers = min(self.workers, len(pending))
+        try:
+            while self._idle_scrapers.qsize() < workers:
+                self._idle_scrapers.put(self._new_scraper())
+
+            with ThreadPoolExecutor(max_workers=workers or 1) as executor:
+                scraped = executor.map(
+                    self._scrape_with_worker, [urls[index] for index in pending]
+                )
+                for index, product in zip(pending, scraped):
+                    products[index] = product
+        finally:
+            self._close_idle_scrapers()
+        return products
+
+    def scrape_all_products(self) -> list[Product]:
+        """
+        Scrapes all products listed on the menu page in parallel.
+
+        Like ProductScraper, it never returns a partial menu: a menu missing
+        products would remove them from the database on the next import.
+
+        Returns:
+            list[Product]: The scraped products in menu order.
+
+        Raises:
+            WebDriverException: If the menu page cannot be read.
+            ScrapeError: If any page failed after all retries.
+        """
+        seed_scraper = self._new_scraper()
+        self._idle_scrapers.put(seed_scraper)
+        try:
+            product_detail_urls = seed_scraper.get_product_detail_urls()
+        except WebDriverException:
+            self._close_idle_scrapers()
+            raise
+
+        products = self.scrape_products(product_detail_urls)
+        if self.failures:
+            raise ScrapeError(self.failures)
+        return products
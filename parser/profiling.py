@@ -0,0 +1,202 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: list[float], rank: float) -> float:
+    """
+    Computes a percentile of sorted values with linear interpolation.
+
+    Args:
+        values (list[float]): The values in ascending order.
+        rank (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or NaN if there are no values.
+    """
+    if not values:
+        return math.nan
+    position = (len(values) - 1) * rank / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class ScrapeProfiler:
+    """
+    Records the wall time of every phase of scraping each product page.
+
+    Phases are named steps such as `load` or `macronutrients`. A phase that
+    raises is recorded with the name of the exception, e.g. `TimeoutException`,
+    so slow waits that time out show up separately. The profiler is shared by
+    all worker threads.
+
+    Attributes:
+        started_at (float): The wall clock time the profiler was created at.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._durations: dict[str, list[float]] = defaultdict(list)
+        self._failures: dict[str, dict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self._pages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _page(self, url: str) -> dict:
+        """
+        Returns the record of a page, creating it on first use.
+
+        Must be called with the lock held.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            dict: The phases, attempts and outcome of the page.
+        """
+        if url not in self._pages:
+            self._pages[url] = {
+                "url": url,
+                "outcome": None,
+                "attempts": 0,
+                "seconds": 0.0,
+                "phases": defaultdict(float),
+            }
+        return self._pages[url]
+
+    @contextmanager
+    def phase(self, url: str, name: str) -> Iterator[None]:
+        """
+        Times a phase of scraping a page.
+
+        Args:
+            url (str): The URL of the page.
+            name (str): The name of the phase.
+
+        Yields:
+            None
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as error:
+            with self._lock:
+                self._failures[name][type(error).__name__] += 1
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._durations[name].append(seconds)
+                page = self._page(url)
+                page["phases"][name] += seconds
+                page["seconds"] += seconds
+
+    def record_attempt(self, url: str, outcome: str) -> None:
+        """
+        Records the outcome of an attempt to scrape a page.
+
+        Args:
+            url (str): The URL of the page.
+            outcome (str): `scraped`, `reused` or `failed`.
+        """
+        with self._lock:
+            page = self._page(url)
+            page["attempts"] += 1
+            page["outcome"] = outcome
+
+    def report(self, slowest: int = 10) -> dict:
+        """
+        Builds the profiling report.
+
+        Phases outside of product pages, such as reading the menu page, count
+        towards the phase statistics only.
+
+        Args:
+            slowest (int): How many of the slowest pages to list.
+
+        Returns:
+            dict: Percentiles per phase and the timings of every page.
+        """
+        with self._lock:
+            durations = {
+                name: sorted(values) for name, values in self._durations.items()
+            }
+            failures = {name: dict(counts) for name, counts in self._failures.items()}
+            pages = [
+                {**page, "phases": dict(page["phases"])}
+                for page in self._pages.values()
+                if page["attempts"]
+            ]
+
+        phases = {}
+        for name, values in durations.items():
+            phases[name] = {
+                "count": len(values),
+                "total": sum(values),
+                **{f"p{rank}": percentile(values, rank) for rank in PERCENTILES},
+                "max": values[-1],
+                "failures": failures.get(name, {}),
+            }
+
+        outcomes: dict[str, int] = defaultdict(int)
+        for page in pages:
+            outcomes[page["outcome"]] += 1
+
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": time.perf_counter() - self._start,
+            "pages": len(pages),
+            "outcomes": dict(outcomes),
+            "retries": sum(max(page["attempts"] - 1, 0) for page in pages),
+            "phases": phases,
+            "slowest": [
+                page["url"]
+                for page in sorted(pages, key=lambda page: -page["seconds"])[:slowest]
+            ],
+            "products": pages,
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Writes the report to a JSON file.
+
+        Args:
+            path (str): The path of the report.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, ensure_ascii=False, indent=4)
+
+    def summary(self) -> str:
+        """
+        Formats the report as a table of phases, slowest total first.
+
+        Returns:
+            str: The summary.
+        """
+        report = self.report(slowest=5)
+        lines = [
+            f"{report['pages']} pages in {report['wall_seconds']:.1f}s, "
+            f"{report['retries']} retries, outcomes: {report['outcomes']}",
+            f"{'phase':<20}{'count':>7}{'total':>10}{'p50':>9}{'p90':>9}"
+            f"{'p99':>9}{'max':>9}  failures",
+        ]
+        for name, stats in sorted(
+            report["phases"].items(), key=lambda item: -item[1]["total"]
+        ):
+            lines.append(
+                f"{name:<20}{stats['count']:>7}{stats['total']:>9.2f}s"
+                f"{stats['p50']:>8.3f}s{stats['p90']:>8.3f}s{stats['p99']:>8.3f}s"
+                f"{stats['max']:>8.3f}s  {stats['failures'] or ''}"
+            )
+        lines.append("slowest pages:")
+        lines.extend(f"  {url}" for url in report["slowest"])
+        return "\n".join(lines)
@@ -1,8 +1,17 @@
+import hashlib
 import json
+import logging
 import os.path
-from dataclasses import asdict
+import threading
+from dataclasses import asdict, fields
 
 import config
+from columnar import write_columns
+from items import Product, ProductColumns
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_FIELDS = tuple(field.name for field in fields(Product))
 
 
 class JSONFileWriter:
@@ -35,10 +44,208 @@ class JSONFileWriter:
         """
         Writes data to the JSON file.
 
+        The data is written to a temporary file that then replaces the JSON
+        file, so readers never see a partially written file.
+
         Args:
             data (list): The data to write to the JSON file.
         """
         data_as_dicts = [asdict(record) for record in data]
 
-        with open(self._get_path_to_file(), "w", encoding="utf-8") as file:
+        path = self._get_path_to_file()
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
             json.dump(data_as_dicts, file, ensure_ascii=False, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+
+
+class ColumnarFileWriter:
+    """
+    Writes products as a columnar file that the API can memory-map.
+
+    The file records the SHA-256 digest of the JSON file written from the same
+    products, so a reader can tell whether both files hold the same menu.
+
+    Attributes:
+        file_name (str): The name of the columnar file.
+    """
+
+    def __init__(self, file_name: str) -> None:
+        """
+        Initializes a ColumnarFileWriter instance.
+
+        Args:
+            file_name (str): The name of the columnar file.
+        """
+        self.file_name = file_name
+
+    def write_columns(self, products: ProductColumns, source_file_name: str) -> None:
+        """
+        Writes the products to the columnar file.
+
+        Args:
+            products (ProductColumns): The products.
+            source_file_name (str): The name of the JSON file already written
+                from the same products.
+        """
+        digest = hashlib.sha256()
+        with open(os.path.join(config.FILE_PATH, source_file_name), "rb") as file:
+            while chunk := file.read(1 << 16):
+                digest.update(chunk)
+
+        write_columns(
+            os.path.join(config.FILE_PATH, self.file_name),
+            rows=len(products),
+            numbers=products.numbers,
+            strings={"name": products.names, "description": products.descriptions},
+            metadata={"source_sha256": digest.hexdigest()},
+        )
+
+
+class NDJSONFileWriter:
+    """
+    Appends every product to an NDJSON file as soon as it is scraped.
+
+    Each line holds the product fields, the `url` of its page and, when the
+    run keeps a manifest, the `manifest` entry of the page. If a run is
+    interrupted, the next run loads the file and skips the pages already in
+    it. The file is synced to disk every `sync_every` products.
+
+    Attributes:
+        file_name (str): The name of the NDJSON file.
+        sync_every (int): How many products are appended between syncs.
+    """
+
+    def __init__(self, file_name: str, sync_every: int = 20) -> None:
+        """
+        Initializes an NDJSONFileWriter instance.
+
+        Args:
+            file_name (str): The name of the NDJSON file.
+            sync_every (int): How many products are appended between syncs.
+        """
+        self.file_name = file_name
+        self.sync_every = max(1, sync_every)
+        self._products: dict[str, Product] = {}
+        self._manifest_entries: dict[str, dict] = {}
+        self._file = None
+        self._unsynced = 0
+        self._lock = threading.Lock()
+
+    def _get_path_to_file(self) -> str:
+        """
+        Constructs the path to the NDJSON file.
+
+        Returns:
+            str: The path to the NDJSON file.
+        """
+        return os.path.join(config.FILE_PATH, self.file_name)
+
+    def open(self) -> int:
+        """
+        Loads the products of an interrupted run and opens the file for appending.
+
+        A last line cut off by a crash is dropped from the file.
+
+        Returns:
+            int: The number of products loaded from the previous run.
+        """
+        path = self._get_path_to_file()
+        valid_size = 0
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    self._products[record["url"]] = Product(
+                        **{field: record[field] for field in PRODUCT_FIELDS}
+                    )
+                    if record.get("manifest") is not None:
+                        self._manifest_entries[record["url"]] = record["manifest"]
+                    valid_size += len(line)
+
+        self._file = open(path, "ab")
+        self._file.truncate(valid_size)
+        if self._products:
+            logger.info("Resuming with %d scraped products", len(self._products))
+        return len(self._products)
+
+    def get(self, url: str) -> Product | None:
+        """
+        Returns the product already written for a page.
+
+        Args:
+            url (str): The URL of the product page.
+
+        Returns:
+            Product | None: The product, or None if the page was not scraped.
+        """
+        return self._products.get(url)
+
+    def get_manifest_entry(self, url: str) -> dict | None:
+        """
+        Returns the manifest entry written with the product of a page.
+
+        Args:
+            url (str): The URL of the product page.
+
+        Returns:
+            dict | None: The entry, or None if none was written.
+        """
+        return self._manifest_entries.get(url)
+
+    def append(
+        self, url: str, product: Product, manifest_entry: dict | None = None
+    ) -> None:
+        """
+        Appends a product, syncing the file every `sync_every` products.
+
+        Args:
+            url (str): The URL of the product page.
+            product (Product): The scraped product.
+            manifest_entry (dict | None): The manifest entry of the page, so an
+                interrupted run can carry it into the next manifest.
+        """
+        record = {"url": url, **asdict(product)}
+        if manifest_entry is not None:
+            record["manifest"] = manifest_entry
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._products[url] = product
+            if manifest_entry is not None:
+                self._manifest_entries[url] = manifest_entry
+            self._file.write(line.encode("utf-8") + b"\n")
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._sync()
+
+    def _sync(self) -> None:
+        """
+        Flushes the file to disk. Must be called with the lock held.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self) -> None:
+        """
+        Syncs and closes the file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        """
+        Closes and deletes the file once the output has been finalized.
+        """
+        self.close()
+        os.remove(self._get_path_to_file())
@@ -0,0 +1,207 @@
+import asyncio
+import functools
+import json
+import os
+import pathlib
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+
+# The parser modules import each other as top-level modules, as when they are
+# run with `python parser/main.py`.
+sys.path.insert(0, os.path.join(ROOT, "parser"))
+os.chdir(ROOT)
+
+MENU = [
+    {
+        "name": "Big Mac",
+        "description": "Two beef patties, special sauce, lettuce and cheese.",
+        "calories": 503.0,
+        "fats": 25.0,
+        "carbs": 42.0,
+        "proteins": 26.0,
+        "unsaturated_fats": 9.3,
+        "sugar": 8.7,
+        "salt": 2.3,
+        "portion": 214.0,
+    },
+    {
+        "name": "Cheeseburger",
+        "description": "A beef patty with cheese, pickles and onions.",
+        "calories": 301.0,
+        "fats": 12.0,
+        "carbs": 32.0,
+        "proteins": 16.0,
+        "unsaturated_fats": 6.0,
+        "sugar": 7.0,
+        "salt": 1.5,
+        "portion": 118.0,
+    },
+    {
+        "name": "Hamburger",
+        "description": "A beef patty with pickles and onions.",
+        "calories": 250.0,
+        "fats": 8.0,
+        "carbs": 31.0,
+        "proteins": 13.0,
+        "unsaturated_fats": 3.0,
+        "sugar": 6.0,
+        "salt": 1.2,
+        "portion": 104.0,
+    },
+    {
+        "name": "French Fries",
+        "description": "Medium fries.",
+        "calories": 337.0,
+        "fats": 17.0,
+        "carbs": 42.0,
+        "proteins": 3.4,
+        "unsaturated_fats": 1.5,
+        "sugar": 0.3,
+        "salt": 0.6,
+        "portion": 114.0,
+    },
+    {
+        "name": "McFlurry",
+        "description": "Soft serve with cookie pieces.",
+        "calories": 340.0,
+        "fats": 11.0,
+        "carbs": 53.0,
+        "proteins": 7.0,
+        "unsaturated_fats": None,
+        "sugar": 44.0,
+        "salt": 0.4,
+        "portion": 180.0,
+    },
+]
+
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the fixture pages without logging every request.
+    """
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="session")
+def fixture_server() -> Iterator[str]:
+    """
+    Serves copies of the menu and product pages from tests/fixtures.
+
+    Yields:
+        str: The base URL of the server.
+    """
+    handler = functools.partial(FixtureRequestHandler, directory=FIXTURES)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def write_menu(directory: pathlib.Path, products: list[dict], market: str = "ua") -> str:
+    """
+    Writes the menu file of a market, as the parser does.
+
+    Args:
+        directory (pathlib.Path): The menu file directory.
+        products (list[dict]): The product records.
+        market (str): The market code.
+
+    Returns:
+        str: The path to the menu file.
+    """
+    from parser import config as parser_config
+
+    path = os.path.join(directory, parser_config.MENU_FILE_NAME.format(market=market))
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(products, file, ensure_ascii=False, indent=4)
+    return path
+
+
+async def import_menu(market: str = "ua", force: bool = False) -> None:
+    """
+    Imports the menu file of a market and swaps in a new snapshot of it.
+
+    Args:
+        market (str): The market code.
+        force (bool): Import the file even if it has not changed.
+    """
+    import app as application
+    from database.initialize import create_tables, import_market
+
+    await create_tables()
+    await import_market(market, force)
+    await application.refresh_market(market)
+
+
+def api_client() -> httpx.AsyncClient:
+    """
+    Creates a client calling the API in process, without its lifespan.
+
+    Returns:
+        httpx.AsyncClient: The client.
+    """
+    import app as application
+
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=application.app), base_url="http://test"
+    )
+
+
+@pytest.fixture
+def menu_database(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[pathlib.Path]:
+    """
+    Points the database, the menu files and the snapshot files of the API at a
+    temporary directory, with fresh snapshots and lookup caches.
+
+    Yields:
+        pathlib.Path: The directory, see `write_menu`.
+    """
+    from database import config as database_config, engine, initialize
+    from menu import config as menu_config, crud, export, snapshot
+    from menu.singleflight import SingleFlight
+    from parser import config as parser_config
+
+    monkeypatch.setattr(
+        database_config, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'menu.db'}"
+    )
+    write_engine = engine.create_engine()
+    read_engine = engine.create_engine(read_only=True)
+    read_session = async_sessionmaker(read_engine)
+    monkeypatch.setattr(initialize, "engine", write_engine)
+    for module in (engine, crud, export, snapshot):
+        monkeypatch.setattr(module, "async_read_session", read_session)
+
+    monkeypatch.setattr(parser_config, "FILE_PATH", str(tmp_path))
+    monkeypatch.setattr(parser_config, "MARKETS", {"ua": None})
+    monkeypatch.setattr(menu_config, "SNAPSHOT_PATH", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(snapshot, "_snapshots", {})
+    monkeypatch.setattr(
+        snapshot, "_past_snapshots", SingleFlight(max_size=8, ttl=float("inf"))
+    )
+    for cache in crud.lookups.values():
+        cache.clear()
+
+    try:
+        yield tmp_path
+    finally:
+        for cache in crud.lookups.values():
+            cache.clear()
+        asyncio.run(write_engine.dispose())
+        asyncio.run(read_engine.dispose())
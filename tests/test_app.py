@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+import pytest
+
+import app as application
+from database import config
+from database.initialize import ImportResult
+
+
+def post_reload(headers: dict[str, str]) -> httpx.Response:
+    async def post() -> httpx.Response:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=application.app), base_url="http://test"
+        ) as client:
+            return await client.post("/admin/reload", headers=headers)
+
+    return asyncio.run(post())
+
+
+def test_reload_is_disabled_without_a_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "RELOAD_TOKEN", "")
+
+    assert post_reload({"X-Reload-Token": ""}).status_code == 404
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Reload-Token": "guess"}])
+def test_reload_requires_the_token(
+    monkeypatch: pytest.MonkeyPatch, headers: dict[str, str]
+) -> None:
+    monkeypatch.setattr(config, "RELOAD_TOKEN", "secret")
+
+    assert post_reload(headers).status_code == 401
+
+
+def test_reload_with_the_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "RELOAD_TOKEN", "secret")
+    reloads = []
+
+    async def reload_menu(force: bool, markets: list[str] | None) -> dict:
+        reloads.append((force, markets))
+        return {"duration": 0.0, "markets": {}}
+
+    monkeypatch.setattr(application, "reload_menu", reload_menu)
+
+    response = post_reload({"X-Reload-Token": "secret"})
+
+    assert response.status_code == 200
+    assert reloads == [(False, None)]
+
+
+def test_reload_refreshes_markets_after_a_failed_one(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    refreshed = []
+
+    async def import_market(market: str, force: bool) -> ImportResult:
+        if market == "pl":
+            raise ValueError("The menu file has no products")
+        return ImportResult(inserted=1, updated=0, removed=0, version=2)
+
+    async def refresh_market(market: str) -> None:
+        refreshed.append(market)
+
+    async def create_tables() -> None:
+        pass
+
+    monkeypatch.setattr(application, "import_market", import_market)
+    monkeypatch.setattr(application, "refresh_market", refresh_market)
+    monkeypatch.setattr(application, "create_tables", create_tables)
+
+    report = asyncio.run(application.reload_menu(markets=["pl", "ua"]))
+
+    assert refreshed == ["ua"]
+    assert report["markets"]["pl"] == {"error": "The menu file has no products"}
+    assert report["markets"]["ua"]["inserted"] == 1
@@ -0,0 +1,85 @@
+import asyncio
+import pathlib
+
+import httpx
+import pytest
+
+from conftest import MENU, api_client, import_menu, write_menu
+from menu import config
+
+
+@pytest.fixture(params=[True, False], ids=["snapshot", "database"])
+def batch(
+    request: pytest.FixtureRequest,
+    monkeypatch: pytest.MonkeyPatch,
+    menu_database: pathlib.Path,
+):
+    monkeypatch.setattr(config, "USE_SNAPSHOT", request.param)
+    write_menu(menu_database, MENU)
+    asyncio.run(import_menu())
+
+    def post(body: dict) -> httpx.Response:
+        async def send() -> httpx.Response:
+            async with api_client() as client:
+                return await client.post("/products/batch", json=body)
+
+        return asyncio.run(send())
+
+    return post
+
+
+def test_batch_returns_products_in_the_requested_order(batch) -> None:
+    response = batch({"names": ["McFlurry", "Whopper", "Big Mac", "McFlurry"]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [product["name"] for product in body["products"]] == ["McFlurry", "Big Mac"]
+    assert body["products"][1]["calories"] == 503.0
+    assert body["products"][1]["market"] == "ua"
+    assert body["not_found"] == ["Whopper"]
+
+
+def test_batch_projects_the_requested_fields(batch) -> None:
+    response = batch({"names": ["Big Mac", "McFlurry"], "fields": ["name", "sugar"]})
+
+    assert response.json()["products"] == [
+        {"name": "Big Mac", "sugar": 8.7},
+        {"name": "McFlurry", "sugar": 44.0},
+    ]
+
+
+def test_batch_rejects_unknown_fields_and_large_batches(batch) -> None:
+    unknown = batch({"names": ["Big Mac"], "fields": ["name", "weight"]})
+    too_large = batch({"names": [f"Product {number}" for number in range(101)]})
+
+    assert unknown.status_code == 400
+    assert unknown.json()["detail"] == "Unknown fields: weight"
+    assert too_large.status_code == 422
+
+
+@pytest.mark.parametrize("use_snapshot", [True, False], ids=["snapshot", "database"])
+def test_single_field_is_projected(
+    monkeypatch: pytest.MonkeyPatch, menu_database: pathlib.Path, use_snapshot: bool
+) -> None:
+    monkeypatch.setattr(config, "USE_SNAPSHOT", use_snapshot)
+    write_menu(menu_database, MENU)
+
+    async def send() -> list[httpx.Response]:
+        await import_menu()
+        async with api_client() as client:
+            return [
+                await client.get(f"/product/{name}/{field}/")
+                for name, field in [
+                    ("McFlurry", "unsaturated_fats"),
+                    ("Big Mac", "salt"),
+                    ("Big Mac", "weight"),
+                    ("Whopper", "salt"),
+                ]
+            ]
+
+    null_field, field, unknown_field, unknown_product = asyncio.run(send())
+
+    assert null_field.json() == {"unsaturated_fats": None}
+    assert field.json() == {"salt": 2.3}
+    assert unknown_field.json()["detail"] == "Field not found"
+    assert unknown_product.json()["detail"] == "Product not found"
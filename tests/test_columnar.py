@@ -0,0 +1,105 @@
+import copy
+import math
+
+import pytest
+
+import config
+from columnar import ColumnarMenu, write_columns
+from conftest import MENU, write_menu
+from database.initialize import get_file_hash, load_menu_data
+from items import NUMERIC_FIELDS, Product, ProductColumns
+from writers import ColumnarFileWriter
+
+
+def test_columns_round_trip_through_the_mapped_file(tmp_path) -> None:
+    path = str(tmp_path / "menu.columns")
+    names = [product["name"] for product in MENU] + ["Біг Мак®"]
+    descriptions = [product["description"] for product in MENU] + [None]
+    numbers = {
+        field: [product[field] for product in MENU] + [float("nan")]
+        for field in NUMERIC_FIELDS
+    }
+
+    write_columns(
+        path,
+        rows=len(names),
+        numbers=numbers,
+        strings={"name": names, "description": descriptions},
+        integers={"id": range(10, 10 + len(names))},
+        metadata={"source_sha256": "abc"},
+    )
+
+    with ColumnarMenu(path) as menu:
+        records = list(menu.records())
+        assert len(menu) == len(names)
+        assert menu.metadata == {"source_sha256": "abc"}
+        assert menu.numeric_fields == NUMERIC_FIELDS
+        assert menu.find("Біг Мак®") == 5
+        assert menu.find("McFlurry") == 4
+        assert menu.find("Big Mak") is None
+        assert menu.is_null("unsaturated_fats", 4)
+        assert not menu.is_null("unsaturated_fats", 3)
+        assert menu.is_null("description", 5)
+        assert menu.integers("id").tolist() == list(range(10, 16))
+        assert menu.column("calories")[0] == 503.0
+        assert math.isnan(menu.numbers[5, 0])
+        assert not menu.numbers.flags.writeable
+
+    assert records[:5] == [
+        {"id": 10 + row, **product} for row, product in enumerate(MENU)
+    ]
+    assert records[5] == {
+        "id": 15,
+        "name": "Біг Мак®",
+        "description": None,
+        **{field: None for field in NUMERIC_FIELDS},
+    }
+    assert not (tmp_path / "menu.columns.tmp").exists()
+
+
+def test_empty_menu_round_trips(tmp_path) -> None:
+    path = str(tmp_path / "menu.columns")
+
+    write_columns(
+        path,
+        rows=0,
+        numbers={field: [] for field in NUMERIC_FIELDS},
+        strings={"name": [], "description": []},
+    )
+
+    with ColumnarMenu(path) as menu:
+        assert list(menu.records()) == []
+        assert menu.numbers.shape == (0, len(NUMERIC_FIELDS))
+        assert menu.find("Big Mac") is None
+
+
+def test_other_files_are_not_mapped(tmp_path) -> None:
+    path = tmp_path / "menu.columns"
+    path.write_bytes(b"[]")
+
+    with pytest.raises(ValueError):
+        ColumnarMenu(str(path))
+
+
+def test_columnar_file_is_imported_while_it_matches_the_menu_file(
+    monkeypatch: pytest.MonkeyPatch, menu_database
+) -> None:
+    monkeypatch.setattr(config, "FILE_PATH", str(menu_database))
+    menu_file_name = config.MENU_FILE_NAME.format(market="ua")
+    menu_path = write_menu(menu_database, MENU)
+    # The columnar file differs from the menu file, to tell which one is read.
+    products = [Product(**product) for product in MENU]
+    products[0].calories = 1.0
+    ColumnarFileWriter(config.COLUMNAR_FILE_NAME.format(market="ua")).write_columns(
+        ProductColumns.from_products(products), menu_file_name
+    )
+
+    from_columns = list(load_menu_data("ua", get_file_hash(menu_path)))
+    changed = copy.deepcopy(MENU)
+    changed[1]["calories"] = 2.0
+    menu_path = write_menu(menu_database, changed)
+    from_menu_file = list(load_menu_data("ua", get_file_hash(menu_path)))
+
+    assert [record["calories"] for record in from_columns][:2] == [1.0, 301.0]
+    assert from_columns[4]["unsaturated_fats"] is None
+    assert from_menu_file == changed
@@ -0,0 +1,68 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from menu.responses import COMPRESS_MIN_SIZE, CachedResponse, compress
+
+CONTENT = [{"name": f"Product {number}", "calories": number} for number in range(200)]
+
+
+def make_request(accept_encoding: str | None) -> Request:
+    headers = []
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_small_bodies_are_not_compressed() -> None:
+    assert compress(b"x" * (COMPRESS_MIN_SIZE - 1)) == {}
+    assert CachedResponse.from_content({"name": "Big Mac"}).encodings == {}
+
+
+def test_gzip_variant_is_built_once_and_deterministic() -> None:
+    response = CachedResponse.from_content(CONTENT)
+
+    assert gzip.decompress(response.encodings["gzip"]) == response.body
+    assert len(response.encodings["gzip"]) < len(response.body)
+    assert CachedResponse.from_content(CONTENT).encodings == response.encodings
+
+
+def test_brotli_variant_when_installed() -> None:
+    brotli = pytest.importorskip("brotli")
+
+    response = CachedResponse.from_content(CONTENT)
+
+    assert brotli.decompress(response.encodings["br"]) == response.body
+    assert response.choose_encoding(make_request("gzip, br")) == "br"
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("GZIP;q=0.5", "gzip"),
+        ("deflate, gzip;q=0", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", None),
+        ("gzip;q=nonsense", None),
+    ],
+)
+def test_encoding_follows_accept_encoding(
+    accept_encoding: str | None, expected: str | None
+) -> None:
+    response = CachedResponse.from_content(CONTENT)
+    response = CachedResponse(
+        body=response.body,
+        etag=response.etag,
+        encodings={"gzip": response.encodings["gzip"]},
+    )
+    request = make_request(accept_encoding)
+
+    served = response.to_response(request, max_age=60)
+
+    assert response.choose_encoding(request) == expected
+    assert served.headers.get("content-encoding") == expected
+    assert served.body == (response.body if expected is None else response.encodings["gzip"])
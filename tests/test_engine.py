@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database.engine import get_read_db, session_duration
+
+
+def observed(outcome: str) -> int:
+    return sum(session_duration.labels("read", "open", outcome).counts)
+
+
+async def close_session(error: Exception | None) -> None:
+    sessions = get_read_db()
+    await anext(sessions)
+    if error is None:
+        with pytest.raises(StopAsyncIteration):
+            await anext(sessions)
+    else:
+        with pytest.raises(type(error)):
+            await sessions.athrow(error)
+
+
+@pytest.mark.parametrize(
+    ("error", "outcome"), [(None, "ok"), (LookupError("Product not found"), "error")]
+)
+def test_sessions_are_observed_with_their_outcome(
+    error: Exception | None, outcome: str
+) -> None:
+    before = observed(outcome)
+
+    asyncio.run(close_session(error))
+
+    assert observed(outcome) == before + 1
+
+
+def test_read_sessions_cannot_write(menu_database) -> None:
+    from database import config, engine, initialize
+
+    async def run() -> tuple:
+        await initialize.create_tables()
+        async with initialize.engine.connect() as conn:
+            write_pragmas = (
+                await conn.scalar(text("PRAGMA journal_mode")),
+                await conn.scalar(text("PRAGMA query_only")),
+            )
+        async with engine.async_read_session() as db:
+            read_pragmas = (
+                await db.scalar(text("PRAGMA busy_timeout")),
+                await db.scalar(text("PRAGMA query_only")),
+            )
+            with pytest.raises(OperationalError, match="readonly"):
+                await db.execute(
+                    text("DELETE FROM menu_metadata WHERE file_name = 'menu.json'")
+                )
+        return write_pragmas, read_pragmas
+
+    write_pragmas, read_pragmas = asyncio.run(run())
+
+    assert write_pragmas == (config.JOURNAL_MODE.lower(), 0)
+    assert read_pragmas == (config.BUSY_TIMEOUT, 1)
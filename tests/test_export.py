@@ -0,0 +1,89 @@
+import asyncio
+import csv
+import io
+import json
+import pathlib
+
+import httpx
+import pytest
+
+from conftest import MENU, api_client, import_menu, write_menu
+from menu import config
+from menu.export import export_products
+from menu.models import PRODUCT_COLUMNS
+
+
+async def collect(chunks) -> list[bytes]:
+    return [chunk async for chunk in chunks]
+
+
+async def batches(rows: list[tuple], size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+@pytest.mark.parametrize("use_snapshot", [True, False], ids=["snapshot", "database"])
+def test_export_formats_hold_the_whole_menu(
+    monkeypatch: pytest.MonkeyPatch, menu_database: pathlib.Path, use_snapshot: bool
+) -> None:
+    monkeypatch.setattr(config, "USE_SNAPSHOT", use_snapshot)
+    write_menu(menu_database, MENU)
+
+    async def send() -> dict[str, httpx.Response]:
+        await import_menu()
+        async with api_client() as client:
+            return {
+                export_format: await client.get(
+                    "/export", params={"format": export_format}
+                )
+                for export_format in ("ndjson", "csv", "json")
+            }
+
+    responses = asyncio.run(send())
+
+    records = [json.loads(line) for line in responses["ndjson"].text.splitlines()]
+    assert responses["ndjson"].headers["content-type"] == "application/x-ndjson"
+    assert [record["name"] for record in records] == [
+        product["name"] for product in MENU
+    ]
+    assert records[4]["unsaturated_fats"] is None
+    assert responses["json"].json() == records
+
+    rows = list(csv.DictReader(io.StringIO(responses["csv"].text)))
+    assert list(rows[0]) == list(PRODUCT_COLUMNS)
+    assert [row["name"] for row in rows] == [product["name"] for product in MENU]
+    assert rows[4]["unsaturated_fats"] == ""
+    assert responses["csv"].headers["content-disposition"] == (
+        'attachment; filename="menu.ua.csv"'
+    )
+
+
+def test_export_rejects_unknown_formats(menu_database: pathlib.Path) -> None:
+    async def send() -> httpx.Response:
+        async with api_client() as client:
+            return await client.get("/export", params={"format": "xml"})
+
+    assert asyncio.run(send()).status_code == 400
+
+
+@pytest.mark.parametrize(
+    # Three batches, plus the CSV header or the JSON brackets.
+    ("export_format", "chunk_count"),
+    [("ndjson", 3), ("csv", 4), ("json", 5)],
+)
+def test_export_sends_one_chunk_per_batch(export_format: str, chunk_count: int) -> None:
+    rows = [
+        (number, "ua", f"Product, {number}", None, *[float(number)] * 8)
+        for number in range(5)
+    ]
+
+    chunks = asyncio.run(collect(export_products(batches(rows, 2), export_format)))
+    body = b"".join(chunks)
+
+    assert len(chunks) == chunk_count
+    if export_format == "json":
+        assert [record["id"] for record in json.loads(body)] == list(range(5))
+    elif export_format == "csv":
+        assert list(csv.reader(io.StringIO(body.decode())))[1][2] == "Product, 0"
+    else:
+        assert len(body.splitlines()) == 5
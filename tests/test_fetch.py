@@ -0,0 +1,95 @@
+import asyncio
+import os
+
+import pytest
+
+import fetch
+from conftest import FIXTURES
+from fetch import HostLimiter, HTTPProductScraper, create_client, parse_product_page
+from items import Product
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+def test_parse_product_page_reads_every_field() -> None:
+    product = parse_product_page(read_fixture("product/big-mac.html"))
+
+    assert product == Product(
+        name="Біг Мак®",
+        description=(
+            "Два яловичі біфштекси, фірмовий соус, салат, сир, маринований огірок "
+            "та цибуля на булочці з кунжутом."
+        ),
+        calories=503.0,
+        fats=25.0,
+        carbs=42.0,
+        proteins=26.0,
+        unsaturated_fats=9.3,
+        sugar=8.7,
+        salt=2.3,
+        portion=214.0,
+    )
+
+
+def test_parse_product_page_leaves_blank_values_to_the_browser() -> None:
+    html = read_fixture("product/mcflurry.html")
+
+    assert parse_product_page(html) is None
+    assert parse_product_page(html.replace("></span>", ">  \n  </span>")) is None
+
+
+def test_blank_values_fall_back_to_selenium(
+    monkeypatch: pytest.MonkeyPatch, fixture_server: str
+) -> None:
+    rendered = []
+
+    class FakeParallelProductScraper:
+        def __init__(self, **kwargs) -> None:
+            self.failures = {}
+
+        def scrape_products(self, urls: list[str]) -> list[Product]:
+            rendered.extend(urls)
+            return [parse_product_page(read_fixture("product/cheeseburger.html"))]
+
+    monkeypatch.setattr(fetch, "ParallelProductScraper", FakeParallelProductScraper)
+    scraper = HTTPProductScraper(base_url=f"{fixture_server}/menu-unrendered.html")
+
+    async def fetch_menu() -> tuple[list[str], list[Product | None]]:
+        async with create_client(timeout=5) as client:
+            return await scraper.fetch_all_products(client, HostLimiter(4))
+
+    urls, products = asyncio.run(fetch_menu())
+    assert products[0].name == "Біг Мак®"
+    assert products[1] is None
+
+    products = scraper.render_missing_products(urls, products)
+    assert rendered == [f"{fixture_server}/product/mcflurry.html"]
+    assert [product.name for product in products] == ["Біг Мак®", "Чізбургер"]
+
+
+def test_market_with_a_failed_fallback_page_is_left_out(
+    monkeypatch: pytest.MonkeyPatch, fixture_server: str
+) -> None:
+    class FakeParallelProductScraper:
+        def __init__(self, **kwargs) -> None:
+            self.failures = {}
+
+        def scrape_products(self, urls: list[str]) -> list[Product | None]:
+            self.failures = {url: "WebDriverException()" for url in urls}
+            return [None] * len(urls)
+
+    monkeypatch.setattr(fetch, "ParallelProductScraper", FakeParallelProductScraper)
+    menus = fetch.scrape_markets(
+        {
+            "ua": HTTPProductScraper(base_url=f"{fixture_server}/menu-unrendered.html"),
+            "pl": HTTPProductScraper(base_url=f"{fixture_server}/menu.html"),
+        },
+        concurrency=4,
+    )
+
+    # A menu without the page that failed would remove its product on import.
+    assert list(menus) == ["pl"]
+    assert len(menus["pl"]) == 3
@@ -0,0 +1,150 @@
+import asyncio
+import copy
+import pathlib
+
+import pytest
+from sqlalchemy import select
+
+from conftest import MENU, api_client, import_menu, write_menu
+from database import initialize
+from menu.models import MenuCheckpoint, MenuVersion
+
+
+def versions_of_the_menu() -> list[list[dict]]:
+    """
+    Builds three versions of the menu: Big Mac changes in the second, McFlurry
+    is removed and Hamburger changes in the third.
+    """
+    second = copy.deepcopy(MENU)
+    second[0]["calories"] = 550.0
+    second[0]["description"] = "Bigger."
+    third = copy.deepcopy(second)
+    third[2]["salt"] = 1.0
+    del third[4]
+    return [MENU, second, third]
+
+
+async def import_versions(directory: pathlib.Path, menus: list[list[dict]]) -> None:
+    for menu in menus:
+        write_menu(directory, menu)
+        await import_menu()
+
+
+async def get_recorded_versions(table) -> list[int]:
+    async with initialize.engine.connect() as conn:
+        versions = await conn.execute(
+            select(table.version).distinct().order_by(table.version)
+        )
+        return list(versions.scalars())
+
+
+def test_history_lists_the_changes_of_a_product(menu_database: pathlib.Path) -> None:
+    async def read() -> tuple:
+        await import_versions(menu_database, versions_of_the_menu())
+        # Importing the same menu again records no version.
+        await import_menu(force=True)
+        async with api_client() as client:
+            return (
+                await client.get("/product/Big Mac/history"),
+                await client.get("/product/McFlurry/history"),
+                await client.get("/product/Big Mak/history"),
+                await get_recorded_versions(MenuVersion),
+            )
+
+    big_mac, mc_flurry, missing, versions = asyncio.run(read())
+
+    assert versions == [1, 2, 3]
+    first, second = big_mac.json()
+    assert first["version"] == 1
+    assert first["changes"] == {
+        field: value for field, value in MENU[0].items() if field != "name"
+    }
+    assert not first["removed"]
+    assert second["version"] == 2
+    assert second["changes"] == {"description": "Bigger.", "calories": 550.0}
+    assert [(version["version"], version["removed"]) for version in mc_flurry.json()] == [
+        (1, False),
+        (3, True),
+    ]
+    assert mc_flurry.json()[1]["changes"] == {}
+    assert missing.status_code == 404
+
+
+@pytest.mark.parametrize("use_snapshot", [True, False])
+def test_reads_as_of_a_past_version(
+    monkeypatch: pytest.MonkeyPatch, menu_database: pathlib.Path, use_snapshot: bool
+) -> None:
+    from menu import config as menu_config
+
+    monkeypatch.setattr(menu_config, "USE_SNAPSHOT", use_snapshot)
+
+    async def read() -> dict:
+        await import_versions(menu_database, versions_of_the_menu())
+        async with api_client() as client:
+            history = (await client.get("/product/Big Mac/history")).json()
+            second_imported_at = history[1]["imported_at"]
+            return {
+                "first": await client.get("/product/Big Mac/", params={"as_of": "1"}),
+                "second": await client.get(
+                    "/product/Big Mac/", params={"as_of": second_imported_at}
+                ),
+                "current": await client.get("/product/Big Mac/"),
+                "menu": await client.get(
+                    "/all_products/", params={"as_of": second_imported_at}
+                ),
+                "removed": await client.get("/product/McFlurry/", params={"as_of": "3"}),
+                "before": await client.get(
+                    "/product/Big Mac/", params={"as_of": "2000-01-01T00:00:00"}
+                ),
+                "unknown": await client.get("/product/Big Mac/", params={"as_of": "9"}),
+                "invalid": await client.get(
+                    "/product/Big Mac/", params={"as_of": "yesterday"}
+                ),
+            }
+
+    responses = asyncio.run(read())
+
+    assert responses["first"].json()["calories"] == 503.0
+    assert responses["first"].json()["description"] == MENU[0]["description"]
+    assert responses["second"].json()["calories"] == 550.0
+    assert responses["current"].json()["calories"] == 550.0
+    assert [product["name"] for product in responses["menu"].json()] == [
+        product["name"] for product in MENU
+    ]
+    assert responses["removed"].status_code == 404
+    assert responses["before"].status_code == 404
+    assert responses["unknown"].status_code == 404
+    assert responses["invalid"].status_code == 400
+
+
+def test_past_versions_are_rebuilt_from_checkpoints(
+    menu_database: pathlib.Path,
+) -> None:
+    # Version 1 has 5 changes, every product changes in version 2, which brings
+    # the pending changes to CHECKPOINT_RATIO times the product count.
+    menus = [copy.deepcopy(MENU) for _ in range(4)]
+    for product in menus[1]:
+        product["portion"] += 1
+    menus[2] = copy.deepcopy(menus[1])
+    menus[2][1]["calories"] = 310.0
+    menus[3] = copy.deepcopy(menus[2])
+    del menus[3][0]
+
+    async def read() -> tuple:
+        await import_versions(menu_database, menus)
+        async with api_client() as client:
+            return await get_recorded_versions(MenuCheckpoint), [
+                (
+                    await client.get("/all_products/", params={"as_of": str(version)})
+                ).json()
+                for version in range(1, 5)
+            ]
+
+    checkpoints, menus_as_of = asyncio.run(read())
+
+    assert initialize.CHECKPOINT_RATIO == 2
+    assert checkpoints == [2]
+    for menu, menu_as_of in zip(menus, menus_as_of):
+        assert [
+            {field: product[field] for field in menu[0]} for product in menu_as_of
+        ] == menu
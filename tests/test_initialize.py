@@ -0,0 +1,47 @@
+import asyncio
+import copy
+import os
+import pathlib
+from typing import Callable
+
+from conftest import MENU, write_menu
+from database.initialize import ImportResult, create_tables, import_market
+
+
+async def import_twice(change: Callable[[], None]) -> tuple[ImportResult, ImportResult]:
+    await create_tables()
+    first = await import_market("ua")
+    change()
+    return first, await import_market("ua")
+
+
+def test_unchanged_menu_file_is_skipped(menu_database: pathlib.Path) -> None:
+    path = write_menu(menu_database, MENU)
+
+    def touch() -> None:
+        os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime + 60))
+
+    first, second = asyncio.run(import_twice(touch))
+
+    assert first == ImportResult(inserted=5, updated=0, removed=0, version=1)
+    # A new modification time alone does not import the same contents again.
+    assert second.skipped
+
+
+def test_changed_menu_file_with_the_same_mtime_is_imported(
+    menu_database: pathlib.Path,
+) -> None:
+    path = write_menu(menu_database, MENU)
+    mtime = os.stat(path).st_mtime_ns
+
+    def rewrite() -> None:
+        menu = copy.deepcopy(MENU)
+        menu[0]["calories"] = 550.0
+        write_menu(menu_database, menu)
+        os.utime(path, ns=(mtime, mtime))
+
+    first, second = asyncio.run(import_twice(rewrite))
+
+    assert os.stat(path).st_mtime_ns == mtime
+    assert not second.skipped
+    assert second == ImportResult(inserted=0, updated=1, removed=0, version=2)
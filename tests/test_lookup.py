@@ -0,0 +1,78 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from conftest import MENU, api_client, import_menu, write_menu
+from menu import schemas
+from menu.lookup import TrigramIndex
+
+PRODUCTS = [
+    schemas.Product(id=position, market="ua", **product)
+    for position, product in enumerate(MENU, start=1)
+]
+
+
+def lookup(query: str, limit: int = 10) -> list[str]:
+    return [product.name for product in TrigramIndex(PRODUCTS).search(query, limit)]
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("Big Mac", "Big Mac"),
+        ("big mac", "Big Mac"),
+        ("  BIG   MAC ", "Big Mac"),
+        ("chee", "Cheeseburger"),
+        ("fries", "French Fries"),
+        ("big mak", "Big Mac"),
+        ("hamburgr", "Hamburger"),
+        ("mcflury", "McFlurry"),
+    ],
+)
+def test_lookup_tolerates_case_prefixes_and_typos(query: str, expected: str) -> None:
+    assert lookup(query)[0] == expected
+
+
+def test_lookup_ranks_exact_names_before_prefixes_and_substrings() -> None:
+    products = [
+        schemas.Product(id=1, market="ua", **{**MENU[0], "name": "Big Mac Menu"}),
+        schemas.Product(id=2, market="ua", **{**MENU[0], "name": "Double Big Mac"}),
+        schemas.Product(id=3, market="ua", **MENU[0]),
+    ]
+
+    results = TrigramIndex(products).search("big mac")
+
+    assert [product.name for product in results] == [
+        "Big Mac",
+        "Big Mac Menu",
+        "Double Big Mac",
+    ]
+
+
+def test_lookup_limits_results_and_ignores_unrelated_text() -> None:
+    assert set(lookup("burger")[:2]) == {"Cheeseburger", "Hamburger"}
+    assert len(lookup("burger", limit=1)) == 1
+    assert lookup("") == []
+    assert lookup("zzzzzz") == []
+
+
+def test_lookup_endpoint_and_suggestions(menu_database: pathlib.Path) -> None:
+    write_menu(menu_database, MENU)
+
+    async def send() -> list:
+        await import_menu()
+        async with api_client() as client:
+            return [
+                await client.get("/products/lookup", params={"q": "cheese"}),
+                await client.get("/products/lookup", params={"q": "a", "limit": 0}),
+                await client.get("/products/lookup", params={"q": "a", "limit": 101}),
+                await client.get("/product/Cheesburger/"),
+            ]
+
+    found, too_few, too_many, missing = asyncio.run(send())
+
+    assert found.json()[0]["name"] == "Cheeseburger"
+    assert too_few.status_code == too_many.status_code == 422
+    assert missing.status_code == 404
+    assert missing.json()["suggestions"][0] == "Cheeseburger"
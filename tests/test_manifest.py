@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+
+import config
+from fetch import HTTPProductScraper
+from items import Product
+from manifest import ScrapeManifest
+from parse import ProductScraper
+from writers import NDJSONFileWriter
+
+
+def scrape(base_url: str, manifest: ScrapeManifest) -> list[Product]:
+    writer = NDJSONFileWriter("menu.partial.ndjson")
+    writer.open()
+    try:
+        return HTTPProductScraper(
+            base_url=base_url, manifest=manifest, writer=writer
+        ).scrape_all_products()
+    finally:
+        writer.close()
+
+
+def test_resumed_pages_stay_in_the_manifest(
+    monkeypatch: pytest.MonkeyPatch, tmp_path, fixture_server: str
+) -> None:
+    monkeypatch.setattr(config, "FILE_PATH", str(tmp_path))
+    path = str(tmp_path / "menu.manifest.json")
+    interrupted = ScrapeManifest(path)
+    scrape(f"{fixture_server}/menu.html", interrupted)
+
+    resumed = ScrapeManifest(path)
+    products = scrape(f"{fixture_server}/menu.html", resumed)
+    resumed.save()
+
+    with open(path, encoding="utf-8") as file:
+        entries = json.load(file)
+    assert len(products) == 3
+    assert entries == interrupted.entries
+    assert sorted(entry["name"] for entry in entries.values()) == sorted(
+        product.name for product in products
+    )
+
+
+def test_resumed_pages_without_entries_keep_the_previous_ones(tmp_path) -> None:
+    previous = {"https://example.com/big-mac": {"fingerprint": "f", "name": "Big Mac"}}
+    manifest = ScrapeManifest(str(tmp_path / "menu.manifest.json"), previous)
+
+    manifest.resume("https://example.com/big-mac", None)
+    manifest.resume("https://example.com/new", None)
+    manifest.save()
+
+    assert not os.path.exists(manifest.path + ".tmp")
+    with open(manifest.path, encoding="utf-8") as file:
+        assert json.load(file) == previous
+
+
+def test_rendered_pages_are_extracted_and_recorded_by_their_fields(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    url = "https://example.com/big-mac"
+
+    class FakeDriver:
+        page_source = "<html>Big Mac</html>"
+
+        def get(self, url: str) -> None:
+            pass
+
+    # The page source is the same as on the previous run, the product is not.
+    fingerprint = ScrapeManifest.fingerprint(FakeDriver.page_source)
+    manifest = ScrapeManifest(
+        "menu.manifest.json",
+        {url: {"fingerprint": fingerprint, "name": "Big Mac"}},
+        {"Big Mac": Product("Big Mac", "Old", *[1.0] * 8)},
+    )
+    scraper = ProductScraper.__new__(ProductScraper)
+    scraper.driver = FakeDriver()
+    scraper.manifest = manifest
+    scraper.profiler = None
+    monkeypatch.setattr(scraper, "_click_detail_product_button", lambda: None)
+    monkeypatch.setattr(scraper, "_wait_for_details", lambda: None)
+    monkeypatch.setattr(scraper, "_get_product_name", lambda: "Big Mac")
+    monkeypatch.setattr(scraper, "_get_product_description", lambda: "New")
+    monkeypatch.setattr(
+        scraper, "_get_product_macronutrients", lambda: ["503", "25", "42", "26"]
+    )
+    monkeypatch.setattr(
+        scraper, "_get_product_dietary_components", lambda: ["9.3", "8.7", "2.3", "214"]
+    )
+
+    product = scraper._scrape_single_product(url)
+
+    assert product.description == "New"
+    assert manifest.get_entry(url) == {
+        "fingerprint": ScrapeManifest.fingerprint_product(product),
+        "name": "Big Mac",
+    }
@@ -0,0 +1,104 @@
+import asyncio
+import pathlib
+import re
+
+import httpx
+import pytest
+
+from conftest import MENU, api_client, import_menu, write_menu
+from monitoring import config
+from monitoring.metrics import Registry
+
+
+def sample(exposition: str, name: str, **labels: str) -> float:
+    for line in exposition.splitlines():
+        metric, _, value = line.rpartition(" ")
+        if not metric.startswith(name + "{") and metric != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', metric))
+        if all(found.get(key) == value for key, value in labels.items()):
+            return float(value)
+    raise KeyError(f"No sample {name} {labels}")
+
+
+def test_histograms_render_cumulative_buckets() -> None:
+    registry = Registry()
+    histogram = registry.histogram(
+        "request_seconds", "Request time.", labels=("route",), buckets=(0.1, 1.0)
+    )
+    histogram.labels('/product/"{name}"/').observe(0.05)
+    histogram.labels('/product/"{name}"/').observe(0.5)
+    histogram.labels('/product/"{name}"/').observe(5.0)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == [
+        "# HELP request_seconds Request time.",
+        "# TYPE request_seconds histogram",
+    ]
+    assert lines[2:] == [
+        r'request_seconds_bucket{route="/product/\"{name}\"/",le="0.1"} 1',
+        r'request_seconds_bucket{route="/product/\"{name}\"/",le="1"} 2',
+        r'request_seconds_bucket{route="/product/\"{name}\"/",le="+Inf"} 3',
+        r'request_seconds_sum{route="/product/\"{name}\"/"} 5.55',
+        r'request_seconds_count{route="/product/\"{name}\"/"} 3',
+    ]
+
+
+def test_counters_gauges_and_callbacks() -> None:
+    registry = Registry()
+    counter = registry.counter("imports_total", "Imports.", labels=("outcome",))
+    counter.labels("ok").inc()
+    counter.labels("ok").inc(2)
+    gauge = registry.gauge("in_flight", "Requests in flight.", labels=("method",))
+    gauge.labels("GET").inc()
+    gauge.labels("GET").dec()
+    registry.gauge("duration_seconds", "Import time.").set(0.25)
+    registry.callback("cache_hits_total", "Hits.", "counter", lambda: 7)
+
+    exposition = registry.render()
+
+    assert registry.counter("imports_total", "Imports.") is counter
+    assert sample(exposition, "imports_total", outcome="ok") == 3
+    assert sample(exposition, "in_flight", method="GET") == 0
+    assert sample(exposition, "duration_seconds") == 0.25
+    assert sample(exposition, "cache_hits_total") == 7
+
+
+def test_metrics_endpoint(menu_database: pathlib.Path) -> None:
+    write_menu(menu_database, MENU)
+
+    async def send() -> httpx.Response:
+        await import_menu()
+        async with api_client() as client:
+            await client.get("/product/Big Mac/")
+            await client.get("/no/such/route")
+            return await client.get("/metrics")
+
+    response = asyncio.run(send())
+    exposition = response.text
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    route = sample(
+        exposition,
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/product/{product_name}/",
+        status="200",
+    )
+    assert route >= 1
+    assert sample(
+        exposition, "http_request_duration_seconds_count", route="<unmatched>"
+    ) >= 1
+    assert sample(exposition, "menu_imports_total", market="ua", outcome="imported") >= 1
+    assert sample(exposition, "db_query_duration_seconds_count", engine="write") >= 1
+
+
+def test_metrics_endpoint_can_be_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "ENABLED", False)
+
+    async def send() -> httpx.Response:
+        async with api_client() as client:
+            return await client.get("/metrics")
+
+    assert asyncio.run(send()).status_code == 404
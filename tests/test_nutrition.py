@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+
+import httpx
+import numpy as np
+import pytest
+
+from benchmarks.common import synthetic_products
+from conftest import MENU, api_client, import_menu, write_menu
+from menu.nutrition import Bound, NutrientMatrix, SearchLimitExceeded
+from menu.search import NUMERIC_FIELDS, Range
+
+BOUNDS = (Bound("calories", maximum=1500), Bound("proteins", minimum=40))
+
+
+def complete_menu(count: int) -> NutrientMatrix:
+    products = synthetic_products(count)
+    return NutrientMatrix(
+        [
+            product
+            for product in products
+            if None not in product.model_dump(include=set(NUMERIC_FIELDS)).values()
+        ]
+    )
+
+
+def test_optimize_matches_brute_force() -> None:
+    nutrients = complete_menu(25)
+    sugars = []
+    for size in range(1, 4):
+        for rows in itertools.combinations(nutrients.names, size):
+            meal, _ = nutrients.get_totals(dict.fromkeys(rows, 1))
+            totals = meal.totals
+            if totals["calories"] <= 1500 and totals["proteins"] >= 40:
+                sugars.append(totals["sugar"])
+
+    meals = nutrients.optimize("sugar", maximize=False, bounds=BOUNDS, max_items=3)
+
+    assert [meal.totals["sugar"] for meal in meals] == pytest.approx(sorted(sugars)[:5])
+
+
+def test_optimize_cuts_unreachable_minimums() -> None:
+    nutrients = complete_menu(200)
+
+    meals = nutrients.optimize(
+        "proteins",
+        bounds=[Bound("calories", minimum=100000)],
+        max_items=6,
+        max_nodes=1,
+    )
+
+    assert meals == []
+
+
+def test_optimize_rejects_searches_over_the_limit() -> None:
+    nutrients = complete_menu(200)
+
+    with pytest.raises(SearchLimitExceeded):
+        nutrients.optimize(
+            "sugar",
+            maximize=False,
+            bounds=[Bound("proteins", minimum=150)],
+            max_items=6,
+            max_nodes=10,
+        )
+
+
+def brute_force_similar(
+    nutrients: NutrientMatrix, name: str, weights: dict[str, float]
+) -> list[tuple[str, float]]:
+    scale = np.array([weights.get(field, 1.0) for field in NUMERIC_FIELDS])
+    query = nutrients.normalized[nutrients.rows[name]]
+    distances = sorted(
+        (float(np.sqrt((scale * (point - query) ** 2).sum())), other)
+        for other, point in zip(nutrients.names, nutrients.normalized)
+        if other != name
+    )
+    return [(other, distance) for distance, other in distances]
+
+
+@pytest.mark.parametrize("weights", [{}, {"sugar": 4.0, "salt": 0.0}])
+def test_similar_matches_brute_force(weights: dict[str, float]) -> None:
+    nutrients = NutrientMatrix(synthetic_products(300))
+    names = nutrients.names[:20]
+
+    neighbours = nutrients.similar(names, limit=5, weights=weights)
+
+    for name, found in zip(names, neighbours):
+        expected = brute_force_similar(nutrients, name, weights)[:5]
+        assert [distance for _, distance in found] == pytest.approx(
+            [distance for _, distance in expected]
+        )
+        assert all(product.name != name for product, _ in found)
+
+
+def test_similar_neighbours_match_the_ranges() -> None:
+    nutrients = NutrientMatrix(synthetic_products(300))
+
+    [found] = nutrients.similar(
+        [nutrients.names[0]], limit=300, ranges=[Range("sugar", maximum=10.0)]
+    )
+
+    assert found
+    assert all(
+        product.sugar is not None and product.sugar <= 10.0 for product, _ in found
+    )
+    assert [distance for _, distance in found] == sorted(
+        distance for _, distance in found
+    )
+
+
+def test_similar_endpoints(menu_database) -> None:
+    write_menu(menu_database, MENU)
+
+    async def send() -> list[httpx.Response]:
+        await import_menu()
+        async with api_client() as client:
+            return [
+                await client.get("/product/Cheeseburger/similar", params={"limit": 2}),
+                await client.get("/product/Whopper/similar"),
+                await client.get("/product/Cheeseburger/similar?weight_weight=2"),
+                await client.post(
+                    "/products/similar",
+                    json={"names": ["Hamburger", "Whopper"], "limit": 1},
+                ),
+            ]
+
+    similar, missing, invalid, batch = asyncio.run(send())
+
+    assert len(similar.json()) == 2
+    assert similar.json()[0]["name"] == "Hamburger"
+    assert similar.json()[0]["distance"] <= similar.json()[1]["distance"]
+    assert missing.status_code == 404
+    assert invalid.status_code == 400
+    assert batch.json()["not_found"] == ["Whopper"]
+    assert [product["name"] for product in batch.json()["similar"]["Hamburger"]] == [
+        "Cheeseburger"
+    ]
@@ -0,0 +1,40 @@
+import base64
+import json
+
+import pytest
+
+from menu.pagination import Cursor
+
+
+def make_token(payload: object) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def test_cursor_round_trip() -> None:
+    cursor = Cursor(order_by="-calories", value=503.0, id=7)
+
+    assert Cursor.decode(cursor.encode()) == cursor
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "not base64!",
+        make_token("abc"),
+        make_token(3),
+        make_token([1, 2, 3]),
+        make_token([["id"], 1, 2]),
+        make_token({"order_by": "id", "value": 1, "id": 2}),
+        make_token(["weight", 1, 2]),
+        make_token(["calories", "503", 2]),
+        make_token(["calories", True, 2]),
+        make_token(["name", 1, 2]),
+        make_token(["id", 1, "2"]),
+        make_token(["id", 1, 2.5]),
+        make_token(["id", 1, False]),
+        base64.urlsafe_b64encode(b'["calories", NaN, 2]').decode(),
+    ],
+)
+def test_cursor_rejects_malformed_tokens(token: str) -> None:
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        Cursor.decode(token)
@@ -0,0 +1,295 @@
+import json
+import shutil
+import threading
+import urllib.request
+
+import pytest
+from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+
+import config
+from fetch import parse_product_detail_urls, parse_product_page
+from items import Product
+import main
+import parse
+from parse import (
+    BLOCKED_URLS,
+    LEAN_ARGUMENTS,
+    ParallelProductScraper,
+    ProductScraper,
+    ScrapeError,
+)
+from profiling import ScrapeProfiler
+from writers import NDJSONFileWriter
+
+EXPECTED_NAMES = ["Біг Мак®", "Чізбургер", "Картопля Фрі середня"]
+
+
+class FakeScraper:
+    """
+    Stands in for a ProductScraper, reading the fixture pages over HTTP instead
+    of rendering them in Chrome.
+    """
+
+    def __init__(self, pool: "FakePool") -> None:
+        self.pool = pool
+        self.closed = 0
+
+    def get_product_detail_urls(self) -> list[str]:
+        with urllib.request.urlopen(f"{self.pool.base_url}/menu.html") as response:
+            return parse_product_detail_urls(
+                response.read().decode("utf-8"), response.url
+            )
+
+    def scrape_product(self, url: str) -> Product:
+        with self.pool.lock:
+            crashes = self.pool.crashes.get(url, 0)
+            self.pool.crashes[url] = max(crashes - 1, 0)
+        if crashes:
+            raise WebDriverException("chrome not reachable")
+        with urllib.request.urlopen(url) as response:
+            product = parse_product_page(response.read().decode("utf-8"))
+        if product is None:
+            raise IndexError("list index out of range")
+        return product
+
+    def close(self) -> None:
+        self.closed += 1
+
+
+class FakePool:
+    """
+    Builds fake workers in place of `ParallelProductScraper._new_scraper`,
+    failing to start some of them.
+    """
+
+    def __init__(self, base_url: str, failed_starts: int = 0) -> None:
+        self.base_url = base_url
+        self.failed_starts = failed_starts
+        self.crashes: dict[str, int] = {}
+        self.started: list[FakeScraper] = []
+        self.lock = threading.Lock()
+
+    def __call__(self) -> FakeScraper:
+        with self.lock:
+            # The initial workers start, replacements fail while any are left.
+            if len(self.started) >= 2 and self.failed_starts:
+                self.failed_starts -= 1
+                raise SessionNotCreatedException("cannot start chrome")
+            scraper = FakeScraper(self)
+            self.started.append(scraper)
+            return scraper
+
+
+def make_scraper(
+    monkeypatch: pytest.MonkeyPatch, pool: FakePool, max_retries: int = 2
+) -> ParallelProductScraper:
+    scraper = ParallelProductScraper(
+        workers=2, max_retries=max_retries, base_url=f"{pool.base_url}/menu.html"
+    )
+    monkeypatch.setattr(scraper, "_new_scraper", pool)
+    return scraper
+
+
+def test_parallel_scraper_returns_products_in_menu_order(
+    monkeypatch: pytest.MonkeyPatch, fixture_server: str
+) -> None:
+    pool = FakePool(fixture_server)
+    products = make_scraper(monkeypatch, pool).scrape_all_products()
+
+    assert [product.name for product in products] == EXPECTED_NAMES
+    assert products[0].calories == 503.0
+    assert products[0].portion == 214.0
+    assert products[2].proteins == 3.4
+
+
+def test_parallel_scraper_replaces_crashed_workers(
+    monkeypatch: pytest.MonkeyPatch, fixture_server: str
+) -> None:
+    pool = FakePool(fixture_server, failed_starts=1)
+    pool.crashes = {
+        f"{fixture_server}/product/big-mac.html": 1,
+        f"{fixture_server}/product/fries.html": 1,
+    }
+    scraper = make_scraper(monkeypatch, pool)
+    products = scraper.scrape_all_products()
+
+    assert [product.name for product in products] == EXPECTED_NAMES
+    assert scraper.failures == {}
+    # Every browser is shut down once, crashed ones as they are replaced.
+    assert all(worker.closed == 1 for worker in pool.started)
+    # The pool never grew beyond its size, even when a replacement failed.
+    assert len(pool.started) <= 2 + len(pool.crashes)
+
+
+def test_parallel_scraper_fails_single_pages(
+    monkeypatch: pytest.MonkeyPatch, fixture_server: str
+) -> None:
+    pool = FakePool(fixture_server)
+    big_mac = f"{fixture_server}/product/big-mac.html"
+    pool.crashes = {big_mac: 10}
+    scraper = make_scraper(monkeypatch, pool, max_retries=1)
+    products = scraper.scrape_products(
+        [big_mac, f"{fixture_server}/menu.html", f"{fixture_server}/product/fries.html"]
+    )
+
+    assert products[0] is None
+    assert products[1] is None
+    assert products[2].name == "Картопля Фрі середня"
+    assert set(scraper.failures) == {big_mac, f"{fixture_server}/menu.html"}
+    assert "WebDriverException" in scraper.failures[big_mac]
+    assert "IndexError" in scraper.failures[f"{fixture_server}/menu.html"]
+    assert all(worker.closed == 1 for worker in pool.started)
+
+
+def test_parallel_scraper_never_returns_a_partial_menu(
+    monkeypatch: pytest.MonkeyPatch, fixture_server: str
+) -> None:
+    pool = FakePool(fixture_server)
+    big_mac = f"{fixture_server}/product/big-mac.html"
+    pool.crashes = {big_mac: 10}
+    scraper = make_scraper(monkeypatch, pool, max_retries=1)
+
+    with pytest.raises(ScrapeError) as error:
+        scraper.scrape_all_products()
+    assert list(error.value.failures) == [big_mac]
+    assert all(worker.closed == 1 for worker in pool.started)
+
+
+class FakeSerialScraper:
+    """
+    Stands in for the ProductScraper of a serial run, scraping every page on a
+    single fake worker.
+    """
+
+    def __init__(self, pool: FakePool) -> None:
+        self.worker = pool()
+
+    def scrape_all_products(self) -> list[Product]:
+        urls = self.worker.get_product_detail_urls()
+        return [self.worker.scrape_product(url) for url in urls]
+
+    def close(self) -> None:
+        self.worker.close()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failed_page_keeps_the_stored_menu(
+    monkeypatch: pytest.MonkeyPatch, fixture_server: str, tmp_path, workers: int
+) -> None:
+    pool = FakePool(fixture_server)
+    monkeypatch.setattr(ParallelProductScraper, "_new_scraper", lambda self: pool())
+    monkeypatch.setattr(main, "ProductScraper", lambda **kwargs: FakeSerialScraper(pool))
+    monkeypatch.setattr(config, "FILE_PATH", str(tmp_path))
+    monkeypatch.setattr(config, "MARKETS", {"ua": f"{fixture_server}/menu.html"})
+    monkeypatch.setattr(config, "WORKERS", workers)
+    monkeypatch.setattr(config, "MAX_RETRIES", 1)
+    menu_path = tmp_path / config.MENU_FILE_NAME.format(market="ua")
+    columns_path = tmp_path / config.COLUMNAR_FILE_NAME.format(market="ua")
+    partial_file_name = config.PARTIAL_FILE_NAME.format(market="ua")
+
+    def scrape() -> None:
+        writer = NDJSONFileWriter(file_name=partial_file_name)
+        writer.open()
+        try:
+            main.scrape_market("ua", writer, None, ScrapeProfiler())
+        finally:
+            writer.close()
+
+    scrape()
+    stored_menu = menu_path.read_bytes()
+    stored_columns = columns_path.read_bytes()
+    assert [product["name"] for product in json.loads(stored_menu)] == EXPECTED_NAMES
+
+    pool.crashes = {f"{fixture_server}/product/big-mac.html": 10}
+    with pytest.raises((ScrapeError, WebDriverException)):
+        scrape()
+
+    # Neither engine saves a partial menu: the stored menu still has the
+    # product that failed, so the next import does not remove it.
+    assert menu_path.read_bytes() == stored_menu
+    assert columns_path.read_bytes() == stored_columns
+
+
+class FakeChrome:
+    """
+    Stands in for `webdriver.Chrome`, remembering the options it was started
+    with and the DevTools commands sent to it.
+    """
+
+    def __init__(self, options) -> None:
+        self.options = options
+        self.commands: list[tuple[str, dict]] = []
+
+    def execute_cdp_cmd(self, command: str, parameters: dict) -> None:
+        self.commands.append((command, parameters))
+
+    def find_element(self, by: str, value: str) -> "FakeChrome":
+        return self
+
+    def get_attribute(self, name: str) -> str:
+        return "true"
+
+
+@pytest.mark.parametrize("lean", [False, True])
+def test_lean_browser_skips_what_scraping_does_not_need(
+    monkeypatch: pytest.MonkeyPatch, lean: bool
+) -> None:
+    monkeypatch.setattr(parse.webdriver, "Chrome", FakeChrome)
+
+    driver = ProductScraper(base_url="https://example.com/menu", lean=lean).driver
+
+    assert "--headless" in driver.options.arguments
+    if lean:
+        assert driver.options.page_load_strategy == "eager"
+        assert set(LEAN_ARGUMENTS) <= set(driver.options.arguments)
+        assert driver.commands == [
+            ("Network.enable", {}),
+            ("Network.setBlockedURLs", {"urls": list(BLOCKED_URLS)}),
+        ]
+    else:
+        assert driver.options.page_load_strategy == "normal"
+        assert not set(LEAN_ARGUMENTS) & set(driver.options.arguments)
+        assert driver.commands == []
+
+
+@pytest.mark.parametrize("lean", [False, True])
+def test_only_regular_browsers_sleep_for_the_details(
+    monkeypatch: pytest.MonkeyPatch, lean: bool
+) -> None:
+    monkeypatch.setattr(parse.webdriver, "Chrome", FakeChrome)
+    sleeps: list[float] = []
+    monkeypatch.setattr(parse.time, "sleep", sleeps.append)
+    scraper = ProductScraper(base_url="https://example.com/menu", lean=lean)
+
+    scraper._wait_for_details()
+
+    assert sleeps == ([] if lean else [ProductScraper.DETAIL_DELAY])
+
+
+def test_parallel_workers_use_lean_browsers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(parse.webdriver, "Chrome", FakeChrome)
+
+    scraper = ParallelProductScraper(
+        workers=2, base_url="https://example.com/menu", lean=True
+    )._new_scraper()
+
+    assert scraper.lean
+    assert scraper.driver.options.page_load_strategy == "eager"
+
+
+@pytest.mark.skipif(
+    not any(
+        shutil.which(browser)
+        for browser in ("google-chrome", "chromium", "chromium-browser", "chrome")
+    ),
+    reason="Chrome is not installed",
+)
+@pytest.mark.parametrize("lean", [False, True])
+def test_parallel_scraper_renders_fixture_pages(fixture_server: str, lean: bool) -> None:
+    products = ParallelProductScraper(
+        workers=2, base_url=f"{fixture_server}/menu.html", lean=lean
+    ).scrape_all_products()
+
+    assert [product.name for product in products] == EXPECTED_NAMES
+    assert products[0].calories == 503.0
+    assert products[0].salt == 2.3
@@ -0,0 +1,118 @@
+import json
+import math
+
+import pytest
+
+import profiling
+from profiling import ScrapeProfiler, percentile
+
+
+class FakeClock:
+    """
+    Stands in for `time.perf_counter`, advancing only when told to.
+    """
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(profiling.time, "perf_counter", clock)
+    return clock
+
+
+def test_percentile_interpolates_between_values() -> None:
+    values = [1.0, 2.0, 3.0, 4.0]
+
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([5.0], 99) == 5.0
+    assert math.isnan(percentile([], 50))
+
+
+def test_phases_and_attempts_are_reported_per_page(clock: FakeClock) -> None:
+    profiler = ScrapeProfiler()
+    big_mac = "https://example.com/big-mac"
+    fries = "https://example.com/fries"
+
+    with profiler.phase("https://example.com/menu", "menu"):
+        clock.advance(1.0)
+    with profiler.phase(big_mac, "load"):
+        clock.advance(2.0)
+    with pytest.raises(TimeoutError):
+        with profiler.phase(big_mac, "macronutrients"):
+            clock.advance(3.0)
+            raise TimeoutError
+    profiler.record_attempt(big_mac, "failed")
+    with profiler.phase(big_mac, "load"):
+        clock.advance(0.5)
+    profiler.record_attempt(big_mac, "scraped")
+    with profiler.phase(fries, "load"):
+        clock.advance(1.5)
+    profiler.record_attempt(fries, "reused")
+
+    report = profiler.report()
+
+    # The menu page counts towards the phases, not the pages.
+    assert report["pages"] == 2
+    assert report["outcomes"] == {"scraped": 1, "reused": 1}
+    assert report["retries"] == 1
+    assert report["wall_seconds"] == 8.0
+    assert report["phases"]["menu"]["count"] == 1
+    assert report["phases"]["load"] == {
+        "count": 3,
+        "total": 4.0,
+        "p50": 1.5,
+        "p90": pytest.approx(1.9),
+        "p99": pytest.approx(1.99),
+        "max": 2.0,
+        "failures": {},
+    }
+    assert report["phases"]["macronutrients"]["failures"] == {"TimeoutError": 1}
+    assert report["slowest"] == [big_mac, fries]
+    assert report["products"][0] == {
+        "url": big_mac,
+        "outcome": "scraped",
+        "attempts": 2,
+        "seconds": 5.5,
+        "phases": {"load": 2.5, "macronutrients": 3.0},
+    }
+
+
+def test_summary_lists_phases_slowest_first(clock: FakeClock) -> None:
+    profiler = ScrapeProfiler()
+    url = "https://example.com/big-mac"
+    with profiler.phase(url, "load"):
+        clock.advance(1.0)
+    with profiler.phase(url, "macronutrients"):
+        clock.advance(2.0)
+    profiler.record_attempt(url, "scraped")
+
+    lines = profiler.summary().splitlines()
+
+    assert lines[0].startswith("1 pages in 3.0s, 0 retries")
+    assert lines[2].startswith("macronutrients")
+    assert lines[3].startswith("load")
+    assert lines[-1] == f"  {url}"
+
+
+def test_report_is_saved_as_json(clock: FakeClock, tmp_path) -> None:
+    profiler = ScrapeProfiler()
+    url = "https://example.com/big-mac"
+    with profiler.phase(url, "load"):
+        clock.advance(1.0)
+    profiler.record_attempt(url, "scraped")
+    path = tmp_path / "mcdonalds.ua.profile.json"
+
+    profiler.save(str(path))
+
+    assert json.loads(path.read_text(encoding="utf-8")) == profiler.report()
@@ -0,0 +1,89 @@
+import asyncio
+import copy
+import pathlib
+
+import httpx
+
+from conftest import MENU, api_client, import_menu, write_menu
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def test_product_responses_carry_etags_and_answer_304(
+    menu_database: pathlib.Path,
+) -> None:
+    write_menu(menu_database, MENU)
+    changed = copy.deepcopy(MENU)
+    changed[0]["calories"] = 550.0
+
+    async def send() -> list[httpx.Response]:
+        await import_menu()
+        async with api_client() as client:
+            first = await client.get("/product/Big Mac/", headers=IDENTITY)
+            etag = first.headers["ETag"]
+            responses = [
+                first,
+                await client.get(
+                    "/product/Big Mac/", headers={**IDENTITY, "If-None-Match": etag}
+                ),
+                await client.get(
+                    "/product/Big Mac/",
+                    headers={**IDENTITY, "If-None-Match": f'"other", W/{etag}'},
+                ),
+            ]
+            write_menu(menu_database, changed)
+            await import_menu()
+            responses.append(
+                await client.get(
+                    "/product/Big Mac/", headers={**IDENTITY, "If-None-Match": etag}
+                )
+            )
+            return responses
+
+    first, not_modified, weak, new_version = asyncio.run(send())
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"].startswith("public, max-age=")
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == first.headers["ETag"]
+    assert weak.status_code == 304
+    # A new menu version is a new body with a new ETag.
+    assert new_version.status_code == 200
+    assert new_version.json()["calories"] == 550.0
+    assert new_version.headers["ETag"] != first.headers["ETag"]
+
+
+def test_menu_variants_vary_on_accept_encoding(menu_database: pathlib.Path) -> None:
+    menu = [
+        {**product, "name": f"{product['name']} {number}"}
+        for number, product in enumerate(MENU * 3)
+    ]
+    write_menu(menu_database, menu)
+
+    async def send() -> list[httpx.Response]:
+        await import_menu()
+        async with api_client() as client:
+            plain = await client.get("/menu", headers=IDENTITY)
+            gzipped = await client.get("/menu", headers={"Accept-Encoding": "gzip"})
+            return [
+                plain,
+                gzipped,
+                await client.get(
+                    "/menu",
+                    headers={
+                        "Accept-Encoding": "gzip",
+                        "If-None-Match": plain.headers["ETag"],
+                    },
+                ),
+            ]
+
+    plain, gzipped, not_modified = asyncio.run(send())
+
+    assert plain.headers["Vary"] == gzipped.headers["Vary"] == "Accept-Encoding"
+    assert "Content-Encoding" not in plain.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    # Every variant has its own strong ETag, and any of them is a match.
+    assert gzipped.headers["ETag"] != plain.headers["ETag"]
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == gzipped.headers["ETag"]
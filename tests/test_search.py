@@ -0,0 +1,71 @@
+import asyncio
+import pathlib
+
+import httpx
+import pytest
+
+from conftest import MENU, api_client, import_menu, write_menu
+from menu import config
+
+
+@pytest.fixture(params=[True, False], ids=["snapshot", "database"])
+def search(
+    request: pytest.FixtureRequest,
+    monkeypatch: pytest.MonkeyPatch,
+    menu_database: pathlib.Path,
+):
+    monkeypatch.setattr(config, "USE_SNAPSHOT", request.param)
+    write_menu(menu_database, MENU)
+    asyncio.run(import_menu())
+
+    def get(params: dict) -> httpx.Response:
+        async def send() -> httpx.Response:
+            async with api_client() as client:
+                return await client.get("/products/search", params=params)
+
+        return asyncio.run(send())
+
+    return get
+
+
+def names(response: httpx.Response) -> list[str]:
+    assert response.status_code == 200, response.text
+    return [product["name"] for product in response.json()]
+
+
+def test_search_filters_by_ranges_in_id_order(search) -> None:
+    response = search({"calories_min": 250, "calories_max": 340})
+
+    assert names(response) == ["Cheeseburger", "Hamburger", "French Fries", "McFlurry"]
+
+
+def test_search_combines_ranges(search) -> None:
+    response = search({"calories_max": 340, "proteins_min": 10})
+
+    assert names(response) == ["Cheeseburger", "Hamburger"]
+
+
+def test_search_returns_the_top_k(search) -> None:
+    response = search({"calories_min": 250, "sort_by": "-calories", "limit": 3})
+
+    assert names(response) == ["Big Mac", "McFlurry", "French Fries"]
+
+
+def test_search_never_matches_nulls_and_sorts_them_last(search) -> None:
+    assert "McFlurry" not in names(search({"unsaturated_fats_min": 0}))
+    assert names(search({"sort_by": "unsaturated_fats"})) == [
+        "French Fries",
+        "Hamburger",
+        "Cheeseburger",
+        "Big Mac",
+        "McFlurry",
+    ]
+    assert names(search({"sort_by": "-unsaturated_fats"}))[-1] == "McFlurry"
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{"calories_min": "a lot"}, {"weight_max": 100}, {"sort_by": "name"}, {"limit": 0}],
+)
+def test_search_rejects_invalid_parameters(search, params: dict) -> None:
+    assert search(params).status_code in (400, 422)
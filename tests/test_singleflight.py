@@ -0,0 +1,121 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from conftest import MENU, api_client, import_menu, write_menu
+from menu import config, singleflight
+from menu.crud import lookups
+from menu.singleflight import SingleFlight
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_concurrent_calls_share_one_flight() -> None:
+    cache = SingleFlight(max_size=8, ttl=5.0)
+    calls = []
+
+    async def query() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "Big Mac"
+
+    async def run() -> list:
+        return await asyncio.gather(*(cache.call("big-mac", query) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["Big Mac"] * 10
+    assert len(calls) == 1
+    assert (cache.stats.misses, cache.stats.coalesced) == (1, 9)
+
+
+def test_results_expire_after_the_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = Clock()
+    monkeypatch.setattr(singleflight.time, "monotonic", clock)
+    cache = SingleFlight(max_size=8, ttl=5.0)
+    calls = []
+
+    async def query() -> int:
+        calls.append(1)
+        return len(calls)
+
+    async def run() -> list[int]:
+        results = [await cache.call("key", query)]
+        clock.now = 4.9
+        results.append(await cache.call("key", query))
+        clock.now = 5.1
+        results.append(await cache.call("key", query))
+        return results
+
+    assert asyncio.run(run()) == [1, 1, 2]
+    assert cache.stats.hits == 1
+
+
+def test_cache_is_bounded_and_skips_errors() -> None:
+    cache = SingleFlight(max_size=2, ttl=60.0)
+    calls = []
+
+    async def query(key: str) -> str:
+        calls.append(key)
+        if key == "error":
+            raise LookupError(key)
+        return key
+
+    async def run() -> None:
+        for key in ("a", "b", "c", "a"):
+            await cache.call(key, lambda: query(key))
+        for _ in range(2):
+            with pytest.raises(LookupError):
+                await cache.call("error", lambda: query("error"))
+
+    asyncio.run(run())
+
+    # "a" was evicted by "c", errors are never cached.
+    assert calls == ["a", "b", "c", "a", "error", "error"]
+
+
+def test_clear_detaches_flights_in_progress() -> None:
+    cache = SingleFlight(max_size=8, ttl=60.0)
+    versions = iter(["old menu", "new menu"])
+
+    async def query() -> str:
+        version = next(versions)
+        await asyncio.sleep(0.01)
+        return version
+
+    async def run() -> list[str]:
+        old = asyncio.create_task(cache.call("key", query))
+        await asyncio.sleep(0)
+        cache.clear()
+        new = await cache.call("key", query)
+        return [await old, new, await cache.call("key", query)]
+
+    assert asyncio.run(run()) == ["old menu", "new menu", "new menu"]
+
+
+def test_database_lookups_are_coalesced(
+    monkeypatch: pytest.MonkeyPatch, menu_database: pathlib.Path
+) -> None:
+    monkeypatch.setattr(config, "USE_SNAPSHOT", False)
+    write_menu(menu_database, MENU)
+
+    stats = lookups["ua"].stats
+
+    async def send() -> list:
+        await import_menu()
+        async with api_client() as client:
+            return await asyncio.gather(
+                *(client.get("/product/Big Mac/") for _ in range(5))
+            )
+
+    misses, hits, coalesced = stats.misses, stats.hits, stats.coalesced
+    responses = asyncio.run(send())
+
+    assert all(response.json()["calories"] == 503.0 for response in responses)
+    assert stats.misses - misses == 1
+    assert stats.hits - hits + stats.coalesced - coalesced == 4
@@ -0,0 +1,118 @@
+import asyncio
+import copy
+import pathlib
+
+import pytest
+
+from conftest import MENU, api_client, import_menu, write_menu
+from menu import config as menu_config, router
+from menu.columns import ColumnarProducts
+from menu.pagination import ORDERABLE_FIELDS
+from menu.snapshot import get_snapshot
+
+
+async def fail(*args, **kwargs) -> None:
+    raise AssertionError("The database was queried")
+
+
+def test_snapshot_serves_reads_without_the_database(
+    monkeypatch: pytest.MonkeyPatch, menu_database: pathlib.Path
+) -> None:
+    write_menu(menu_database, MENU)
+
+    async def read() -> tuple:
+        await import_menu()
+        monkeypatch.setattr(router, "get_all_products", fail)
+        monkeypatch.setattr(router, "coalesced", fail)
+        monkeypatch.setattr(router, "get_menu", fail)
+        async with api_client() as client:
+            return (
+                await client.get("/all_products/", params={"limit": 2}),
+                await client.get("/product/Big Mac/"),
+                await client.get("/product/Big Mak/"),
+            )
+
+    page, product, missing = asyncio.run(read())
+
+    assert [product["name"] for product in page.json()] == ["Big Mac", "Cheeseburger"]
+    assert product.json()["calories"] == 503.0
+    assert missing.status_code == 404
+    assert missing.json()["suggestions"][0] == "Big Mac"
+
+
+def test_refresh_swaps_in_a_new_snapshot(menu_database: pathlib.Path) -> None:
+    write_menu(menu_database, MENU)
+    changed = copy.deepcopy(MENU)
+    changed[0]["calories"] = 550.0
+
+    async def reload() -> tuple:
+        await import_menu()
+        old = get_snapshot("ua")
+        write_menu(menu_database, changed)
+        await import_menu()
+        async with api_client() as client:
+            return old, get_snapshot("ua"), await client.get("/product/Big Mac/")
+
+    old, new, response = asyncio.run(reload())
+
+    assert (old.version, new.version) == (1, 2)
+    # Requests holding the old snapshot keep seeing one consistent menu.
+    assert old.get_single_product("Big Mac").calories == 503.0
+    assert new.get_single_product("Big Mac").calories == 550.0
+    assert response.json()["calories"] == 550.0
+
+
+@pytest.mark.parametrize("mapped", [True, False])
+def test_mapped_snapshot_serves_the_same_menu(
+    monkeypatch: pytest.MonkeyPatch, menu_database: pathlib.Path, mapped: bool
+) -> None:
+    monkeypatch.setattr(menu_config, "MAPPED_SNAPSHOT", mapped)
+    write_menu(menu_database, MENU)
+    changed = copy.deepcopy(MENU)
+    changed[0]["calories"] = 550.0
+
+    async def read() -> tuple:
+        await import_menu()
+        first = get_snapshot("ua")
+        write_menu(menu_database, changed)
+        await import_menu()
+        async with api_client() as client:
+            responses = [
+                (await client.get(url, params=params)).json()
+                for url, params in (
+                    ("/all_products/", {"order_by": "-calories"}),
+                    ("/all_products/", {"order_by": "name", "limit": 2}),
+                    ("/product/Big Mac/", {}),
+                    ("/product/McFlurry/unsaturated_fats/", {}),
+                    ("/products/lookup", {"q": "cheese"}),
+                    ("/menu", {}),
+                )
+            ]
+        return first, get_snapshot("ua"), responses
+
+    first, snapshot, responses = asyncio.run(read())
+
+    # The snapshot was prepared before it was swapped in.
+    assert set(snapshot._orderings) == set(ORDERABLE_FIELDS)
+    assert snapshot._name_index is not None
+    assert snapshot._menu_response is not None
+    assert isinstance(snapshot.products, ColumnarProducts) == mapped
+    snapshot_files = sorted(path.name for path in menu_database.glob("snapshots/*"))
+    if mapped:
+        # The file of the previous version is removed once the new one is mapped.
+        assert snapshot_files == ["ua.v2.columns"]
+        assert first.get_single_product("Big Mac").calories == 503.0
+    else:
+        assert snapshot_files == []
+
+    by_calories, by_name, big_mac, unsaturated_fats, lookup, menu = responses
+    assert [product["name"] for product in by_calories] == [
+        "Big Mac", "McFlurry", "French Fries", "Cheeseburger", "Hamburger"
+    ]
+    assert [product["name"] for product in by_name] == ["Big Mac", "Cheeseburger"]
+    assert big_mac["calories"] == 550.0
+    assert unsaturated_fats == {"unsaturated_fats": None}
+    assert lookup[0]["name"] == "Cheeseburger"
+    assert [
+        {field: product[field] for field in MENU[0]} for product in menu
+    ] == changed